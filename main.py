@@ -6,29 +6,37 @@ TURAN Dressing Table Video Generator - Улучшенная версия с ис
 """
 
 import os
-import json
 import time
 import base64
-import requests
+import hashlib
 import logging
 import random
-from typing import List, Dict, Optional, Union
+import threading
+from typing import TYPE_CHECKING, Callable, Iterator, List, Dict, Optional, Union
+from itertools import islice
 from pathlib import Path
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from enum import Enum
-import mimetypes
-from google.auth import default
-from google.auth.transport.requests import Request
+from turan_logging import setup_logging
+import turan_json
+from turan_transport import HttpTransport
+from turan_scheduler import OperationScheduler, SchedulerSettings, GenerationJob, GeneratorBackend, SystemClock, graceful_shutdown
+from turan_preflight import validate_images, check_image, DEFAULT_MAX_FILE_SIZE, DEFAULT_MIN_DIMENSION
+from turan_campaign import iter_campaign
+from turan_results import iter_results
+
+if TYPE_CHECKING:
+    # Конвейер (multiprocessing), манифест (sqlite3), наблюдение и превью
+    # импортируются в методах, которые их используют: импорт main не замедляет запуск CLI
+    from turan_pipeline import StagedPipeline, PipelineSettings
+    from turan_scanner import ScanManifest
+    from turan_preview import TierSettings
+
+# Форматы входных изображений, которые принимает Veo
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+# Изображений на один пакет проверки и поиска дубликатов при потоковом обходе
+SCREEN_BATCH = 64
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('turan_enhanced_generator.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 class VeoModel(Enum):
@@ -77,26 +85,127 @@ class VideoGenerationConfig:
     cinematic_style: CinematicStyle = CinematicStyle.COMMERCIAL
     lighting_mood: LightingMood = LightingMood.GOLDEN_HOUR
     use_enhanced_prompts: bool = True
+    
+    def with_overrides(self, overrides: Optional[Dict] = None) -> "VideoGenerationConfig":
+        """Копия конфигурации с переопределенными полями (Enum поля принимают строковые значения)"""
+        if not overrides:
+            return self
+        values = {}
+        for name, value in overrides.items():
+            if name not in self.__dataclass_fields__:
+                raise ValueError(f"Неизвестный параметр конфигурации: {name}")
+            current = getattr(self, name)
+            if isinstance(current, Enum) and not isinstance(value, Enum):
+                value = type(current)(value)
+            values[name] = value
+        return replace(self, **values)
+
+@dataclass
+class GenerationContext:
+    """Состояние одного запроса генерации (не разделяется между потоками)"""
+    image_path: str
+    config: Optional[VideoGenerationConfig] = None
+    custom_prompt: Optional[str] = None
+    location: Optional[str] = None
+    scenario_id: Optional[str] = None  # запрошенный закрепленный сценарий
+    scenario: Optional[dict] = None
+    prompt_type: str = "traditional"  # enhanced, custom или traditional
+
+class GenerationStats:
+    """Статистика генерации без общей блокировки на горячем пути
+
+    Каждый поток пишет в собственные счетчики, сумма собирается при чтении.
+    """
+    
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[Dict] = []
+        self._lock = threading.Lock()
+    
+    def _shard(self) -> Dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {
+                "total_generated": 0,
+                "enhanced_prompts_used": 0,
+                "traditional_prompts_used": 0,
+                "scenarios_used": {}
+            }
+            self._local.shard = shard
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+    
+    def record(self, context: GenerationContext):
+        """Учет отправленного запроса в счетчиках текущего потока"""
+        shard = self._shard()
+        shard["total_generated"] += 1
+        if context.prompt_type in ("enhanced", "traditional"):
+            shard[f"{context.prompt_type}_prompts_used"] += 1
+        scenario_id = context.scenario['id']
+        shard["scenarios_used"][scenario_id] = shard["scenarios_used"].get(scenario_id, 0) + 1
+    
+    def snapshot(self) -> Dict:
+        """Сумма счетчиков всех потоков"""
+        total = {
+            "total_generated": 0,
+            "enhanced_prompts_used": 0,
+            "traditional_prompts_used": 0,
+            "scenarios_used": {}
+        }
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            # Копия словаря атомарна под GIL, поток-владелец может писать параллельно
+            scenarios_used = dict(shard["scenarios_used"])
+            for key in ("total_generated", "enhanced_prompts_used", "traditional_prompts_used"):
+                total[key] += shard[key]
+            for scenario_id, count in scenarios_used.items():
+                total["scenarios_used"][scenario_id] = total["scenarios_used"].get(scenario_id, 0) + count
+        return total
 
 class SimpleTuranGenerator:
-    """Улучшенный генератор видео туалетных столиков TURAN с кинематографическими промптами"""
+    """Улучшенный генератор видео туалетных столиков TURAN с кинематографическими промптами
+    
+    Один экземпляр можно использовать из любого числа потоков: состояние запроса
+    хранится в GenerationContext, случайный выбор идет через собственный генератор
+    (seed для воспроизводимости), обновление токена защищено блокировкой.
+    """
     
-    def __init__(self, project_id: str = "turantt", location: str = "us-central1"):
+    def __init__(self, project_id: str = "turantt", location: str = "us-central1", transport=None, seed: Optional[int] = None):
         self.project_id = project_id
         self.location = location
         self.base_url = f"https://{location}-aiplatform.googleapis.com/v1/projects/{project_id}/locations/{location}/publishers/google/models"
         
-        # Настройка аутентификации
+        # Транспорт: прямой, запись или воспроизведение (turan_transport)
+        self.transport = transport or HttpTransport()
+        
+        # Аутентификация откладывается до первого запроса к API
+        # (не нужна для просмотра сценариев, dry-run и воспроизведения кассеты)
         self.credentials = None
-        self._setup_authentication()
+        self._auth_lock = threading.Lock()
         
-        # Статистика для анализа
-        self.generation_stats = {
-            "total_generated": 0,
-            "enhanced_prompts_used": 0,
-            "traditional_prompts_used": 0,
-            "scenarios_used": {}
-        }
+        # Собственный генератор случайных чисел вместо глобального random
+        self.rng = random.Random(seed)
+        
+        # Статистика для анализа (счетчики по потокам)
+        self._stats = GenerationStats()
+        self._scenarios_file_lock = threading.Lock()
+        
+        # Использованные сценарии по id: результаты ссылаются на них, а не копируют
+        self._used_scenarios: Dict[str, dict] = {}
+        
+        # Постоянное хранилище аналитики (turan_analytics.AnalyticsStore), подключается извне
+        self.analytics = None
+        
+        # Постобработка готовых видео (turan_postprocess.PostProcessor), подключается извне
+        self.postprocessor = None
+        
+        # Хранилище видео с дедупликацией и бюджетом диска (turan_media.MediaStore), подключается извне
+        self.media_store = None
+        
+        # Панель прогресса в терминале (turan_progress.ProgressDashboard), подключается извне
+        self.progress = None
         
         # Кинематографические компоненты
         self.camera_setups = {
@@ -246,6 +355,9 @@ class SimpleTuranGenerator:
     
     def _setup_authentication(self):
         """Настройка аутентификации Google Cloud"""
+        from google.auth import default
+        from google.auth.transport.requests import Request
+        
         try:
             credentials, project = default()
             credentials.refresh(Request())
@@ -256,42 +368,77 @@ class SimpleTuranGenerator:
             logger.info("Убедитесь, что выполнена команда: gcloud auth application-default login")
             raise
     
+    def authenticate(self):
+        """Явная аутентификация (для раннего обнаружения ошибок до начала генерации)"""
+        self._get_auth_token()
+    
+    def _base_url_for(self, location: Optional[str] = None) -> str:
+        """Базовый URL моделей для региона"""
+        if not location or location == self.location:
+            return self.base_url
+        return f"https://{location}-aiplatform.googleapis.com/v1/projects/{self.project_id}/locations/{location}/publishers/google/models"
+    
     def _get_auth_token(self) -> str:
-        """Получение токена доступа"""
-        if not self.credentials.valid:
-            self.credentials.refresh(Request())
-        return self.credentials.token
+        """Получение токена доступа (обновляется одним потоком, остальные ждут)"""
+        if not self.transport.requires_auth:
+            return "replay"
+        credentials = self.credentials
+        if credentials is not None and credentials.valid:
+            return credentials.token
+        with self._auth_lock:
+            if self.credentials is None:
+                self._setup_authentication()
+            elif not self.credentials.valid:
+                from google.auth.transport.requests import Request
+                self.credentials.refresh(Request())
+            return self.credentials.token
+    
+    @property
+    def generation_stats(self) -> Dict:
+        """Сводная статистика генерации по всем потокам"""
+        return self._stats.snapshot()
     
     def _encode_image_to_base64(self, image_path: str) -> tuple[str, str]:
         """Кодирование изображения в base64"""
+        from turan_pipeline import encode_image_file
+        
         try:
-            with open(image_path, 'rb') as image_file:
-                encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-            
-            mime_type, _ = mimetypes.guess_type(image_path)
-            if mime_type not in ['image/jpeg', 'image/png']:
-                raise ValueError(f"Неподдерживаемый формат изображения: {mime_type}")
-            
-            return encoded_string, mime_type
+            return encode_image_file(image_path)
         except Exception as e:
             logger.error(f"Ошибка кодирования изображения {image_path}: {e}")
             raise
     
-    def _select_scenario(self, custom_prompt: Optional[str] = None, config: Optional[VideoGenerationConfig] = None) -> dict:
-        """Выбор сценария показа столика с учетом конфигурации"""
-        if custom_prompt:
-            # Создаем кинематографический кастомный сценарий
-            return self._create_enhanced_custom_scenario(custom_prompt, config)
+    def _select_scenario(self, context: GenerationContext) -> dict:
+        """Выбор сценария показа столика с учетом конфигурации (scenario_id закрепляет сценарий)"""
+        custom_prompt = context.custom_prompt
+        config = context.config
         
-        if config and config.use_enhanced_prompts:
+        if context.scenario_id and not custom_prompt:
+            context.scenario = self.get_scenario(context.scenario_id)
+            context.prompt_type = "enhanced"
+            logger.info("Закрепленный сценарий: %s - %s", context.scenario['id'], context.scenario['focus'])
+        elif custom_prompt:
+            # Создаем кинематографический кастомный сценарий
+            context.scenario = self._create_enhanced_custom_scenario(custom_prompt, config)
+            context.prompt_type = "custom"
+        elif config and config.use_enhanced_prompts:
             # Используем улучшенные кинематографические сценарии
-            scenario = random.choice(self.showcase_scenarios)
-            self.generation_stats["enhanced_prompts_used"] += 1
-            logger.info(f"Выбран улучшенный сценарий: {scenario['id']} - {scenario['focus']}")
-            return scenario
+            context.scenario = self.rng.choice(self.showcase_scenarios)
+            context.prompt_type = "enhanced"
+            logger.info("Выбран улучшенный сценарий: %s - %s", context.scenario['id'], context.scenario['focus'])
         else:
             # Fallback к простым сценариям для совместимости
-            return self._create_simple_scenario()
+            context.scenario = self._create_simple_scenario()
+            context.prompt_type = "traditional"
+        self._used_scenarios[context.scenario['id']] = context.scenario
+        return context.scenario
+    
+    def used_scenario(self, scenario_id: str) -> Optional[dict]:
+        """Сценарий, на который ссылаются результаты (в том числе кастомный по своему id)"""
+        scenario = self._used_scenarios.get(scenario_id)
+        if scenario is None:
+            scenario = next((s for s in self.showcase_scenarios if s['id'] == scenario_id), None)
+        return scenario
     
     def _create_enhanced_custom_scenario(self, custom_prompt: str, config: Optional[VideoGenerationConfig] = None) -> dict:
         """Создание улучшенного кастомного сценария"""
@@ -302,18 +449,20 @@ class SimpleTuranGenerator:
         style_enum = CinematicStyle(style)
         lighting_enum = LightingMood(lighting)
         
-        camera_setup = random.choice(self.camera_setups[style_enum])
-        lighting_desc = random.choice(self.lighting_descriptions[lighting_enum])
-        camera_movement = random.choice(self.camera_movements)
-        audio_design = random.choice(self.audio_designs)
-        color_palette = random.choice(self.color_palettes)
+        camera_setup = self.rng.choice(self.camera_setups[style_enum])
+        lighting_desc = self.rng.choice(self.lighting_descriptions[lighting_enum])
+        camera_movement = self.rng.choice(self.camera_movements)
+        audio_design = self.rng.choice(self.audio_designs)
+        color_palette = self.rng.choice(self.color_palettes)
         
         enhanced_prompt = f"""
         {camera_setup}. Keep the TURAN Lux dressing table exactly as shown in image - preserve white glass surface, 4 drawers, LED mirror, and metallic legs unchanged. Add: {custom_prompt}. {lighting_desc}. {camera_movement}. {audio_design}. {color_palette}. Professional commercial cinematography. No subtitles.
         """.strip()
         
+        # id по итоговому промпту: в отчете у каждого кастомного сценария своя запись
+        digest = hashlib.sha256(enhanced_prompt.encode('utf-8')).hexdigest()[:12]
         return {
-            "id": "enhanced_custom",
+            "id": f"enhanced_custom_{digest}",
             "enhanced_prompt": enhanced_prompt,
             "russian_voiceover": "Туалетный столик TURAN Lux - качество и стиль для вашего дома.",
             "focus": "custom_enhanced_scene",
@@ -333,9 +482,7 @@ class SimpleTuranGenerator:
                 "lighting_mood": "natural"      # Строка для совместимости
             }
         ]
-        scenario = random.choice(simple_scenarios)
-        self.generation_stats["traditional_prompts_used"] += 1
-        return scenario
+        return self.rng.choice(simple_scenarios)
     
     def _create_enhanced_negative_prompt(self) -> str:
         """Создание улучшенного негативного промпта"""
@@ -346,29 +493,41 @@ class SimpleTuranGenerator:
         image_path: str, 
         config: VideoGenerationConfig,
         custom_prompt: Optional[str] = None,
-        storage_uri: Optional[str] = None
+        storage_uri: Optional[str] = None,
+        location: Optional[str] = None,
+        scenario_id: Optional[str] = None,
+        encoded_image: Optional[tuple] = None
     ) -> tuple[str, dict]:
-        """Генерация видео показа туалетного столика с улучшенными промптами"""
+        """Генерация видео показа туалетного столика с улучшенными промптами
+        
+        encoded_image - готовая пара (base64, MIME) от стадии кодирования конвейера.
+        """
+        import requests
         
-        logger.info(f"Начало генерации видео показа: {image_path}")
+        logger.info("Начало генерации видео показа: %s", image_path)
         
         # Кодирование изображения
-        image_base64, mime_type = self._encode_image_to_base64(image_path)
+        image_base64, mime_type = encoded_image or self._encode_image_to_base64(image_path)
         
         # Выбор сценария
-        scenario = self._select_scenario(custom_prompt, config)
+        context = GenerationContext(
+            image_path=image_path,
+            config=config,
+            custom_prompt=custom_prompt,
+            location=location,
+            scenario_id=scenario_id
+        )
+        scenario = self._select_scenario(context)
         english_prompt = scenario['enhanced_prompt']
         negative_prompt = self._create_enhanced_negative_prompt()
         
         # Обновляем статистику
-        self.generation_stats["total_generated"] += 1
-        scenario_id = scenario['id']
-        self.generation_stats["scenarios_used"][scenario_id] = self.generation_stats["scenarios_used"].get(scenario_id, 0) + 1
+        self._stats.record(context)
         
-        logger.info(f"Сценарий: {scenario['id']}")
-        logger.info(f"Стиль: {scenario.get('cinematic_style', 'Standard')}")
-        logger.info(f"Английский промпт: {english_prompt[:200]}...")
-        logger.info(f"Русская озвучка: {scenario['russian_voiceover']}")
+        logger.info("Сценарий: %s, стиль: %s", scenario['id'], scenario.get('cinematic_style', 'Standard'))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Английский промпт: %s...", english_prompt[:200])
+            logger.debug("Русская озвучка: %s", scenario['russian_voiceover'])
         
         # Подготовка данных запроса
         request_data = {
@@ -399,23 +558,23 @@ class SimpleTuranGenerator:
             request_data["parameters"]["storageUri"] = storage_uri
         
         # Отправка запроса
-        url = f"{self.base_url}/{config.model.value}:predictLongRunning"
+        url = f"{self._base_url_for(location)}/{config.model.value}:predictLongRunning"
         headers = {
             "Authorization": f"Bearer {self._get_auth_token()}",
             "Content-Type": "application/json"
         }
         
         try:
-            response = requests.post(url, headers=headers, json=request_data, timeout=30)
+            response = self.transport.post(url, headers, request_data, timeout=30)
             response.raise_for_status()
             
-            result = response.json()
+            result = turan_json.loads(response.content)
             operation_name = result.get("name")
             
-            logger.info(f"Операция создана: {operation_name}")
+            logger.info("Операция создана: %s", operation_name)
             
             # Сохраняем информацию о сценарии (ИСПРАВЛЕНО)
-            self._save_scenario_info(image_path, scenario)
+            self._save_scenario_info(context)
             
             return operation_name, scenario
             
@@ -423,15 +582,10 @@ class SimpleTuranGenerator:
             logger.error(f"Ошибка при отправке запроса: {e}")
             raise
     
-    def _save_scenario_info(self, image_path: str, scenario: dict):
+    def _save_scenario_info(self, context: GenerationContext):
         """Сохранение информации о сценарии (ИСПРАВЛЕНО для JSON сериализации)"""
         scenarios_file = Path("generated_showcase_scenarios.json")
-        
-        if scenarios_file.exists():
-            with open(scenarios_file, 'r', encoding='utf-8') as f:
-                scenarios = json.load(f)
-        else:
-            scenarios = {}
+        scenario = context.scenario
         
         # ИСПРАВЛЕНИЕ: Конвертируем все значения в строки для JSON
         scenario_info = {
@@ -442,22 +596,22 @@ class SimpleTuranGenerator:
             "cinematic_style": str(scenario.get('cinematic_style', 'standard')),  # Всегда строка
             "lighting_mood": str(scenario.get('lighting_mood', 'natural')),      # Всегда строка
             "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "prompt_type": "enhanced" if self.generation_stats["enhanced_prompts_used"] > 0 else "traditional"
+            "prompt_type": context.prompt_type
         }
         
-        scenarios[str(Path(image_path).name)] = scenario_info
-        
-        with open(scenarios_file, 'w', encoding='utf-8') as f:
-            json.dump(scenarios, f, ensure_ascii=False, indent=2)
+        # Чтение-изменение-запись общего файла выполняется одним потоком за раз
+        with self._scenarios_file_lock:
+            scenarios = turan_json.load_file(scenarios_file) if scenarios_file.exists() else {}
+            scenarios[str(Path(context.image_path).name)] = scenario_info
+            turan_json.dump_file(scenarios, scenarios_file)
     
-    def poll_operation_status(self, operation_name: str, max_wait_time: int = 600) -> Dict:
-        """Отслеживание статуса операции"""
-        
-        logger.info(f"Отслеживание операции: {operation_name}")
+    def check_operation_status(self, operation_name: str) -> Optional[Dict]:
+        """Однократная проверка статуса операции (None, если еще выполняется)"""
         
         model_id = operation_name.split("/models/")[1].split("/operations/")[0]
+        location = operation_name.split("/locations/")[1].split("/")[0]
         
-        url = f"{self.base_url}/{model_id}:fetchPredictOperation"
+        url = f"{self._base_url_for(location)}/{model_id}:fetchPredictOperation"
         headers = {
             "Authorization": f"Bearer {self._get_auth_token()}",
             "Content-Type": "application/json"
@@ -467,26 +621,52 @@ class SimpleTuranGenerator:
             "operationName": operation_name
         }
         
+        response = self.transport.post(url, headers, request_data, timeout=30)
+        response.raise_for_status()
+        
+        # Ответ завершенной операции может содержать видео в base64 (мегабайты)
+        result = turan_json.loads(response.content)
+        
+        if result.get("done"):
+            logger.info("Операция завершена успешно!")
+            return result
+        return None
+    
+    def cancel_operation(self, operation_name: str):
+        """Отмена долгой операции через LRO API (генерация прекращается)"""
+        location = operation_name.split("/locations/")[1].split("/")[0]
+        url = f"https://{location}-aiplatform.googleapis.com/v1/{operation_name}:cancel"
+        headers = {
+            "Authorization": f"Bearer {self._get_auth_token()}",
+            "Content-Type": "application/json"
+        }
+        
+        response = self.transport.post(url, headers, {}, timeout=30)
+        response.raise_for_status()
+        logger.info("Операция отменена: %s", operation_name)
+    
+    def poll_operation_status(self, operation_name: str, max_wait_time: int = 600) -> Dict:
+        """Отслеживание статуса операции"""
+        import requests
+        
+        logger.info("Отслеживание операции: %s", operation_name)
+        
         start_time = time.time()
         
         while time.time() - start_time < max_wait_time:
             try:
-                response = requests.post(url, headers=headers, json=request_data, timeout=30)
-                response.raise_for_status()
+                result = self.check_operation_status(operation_name)
                 
-                result = response.json()
-                
-                if result.get("done"):
-                    logger.info("Операция завершена успешно!")
+                if result is not None:
                     return result
                 else:
                     elapsed = int(time.time() - start_time)
-                    logger.info(f"Операция в процессе выполнения... ({elapsed}s)")
-                    time.sleep(10)
+                    logger.info("Операция в процессе выполнения... (%ss)", elapsed)
+                    self.transport.sleep(10)
                     
             except requests.exceptions.RequestException as e:
                 logger.error(f"Ошибка при проверке статуса: {e}")
-                time.sleep(5)
+                self.transport.sleep(5)
         
         raise TimeoutError(f"Операция не завершилась за {max_wait_time} секунд")
     
@@ -495,108 +675,564 @@ class SimpleTuranGenerator:
         try:
             import subprocess
             
-            result = subprocess.run(
-                ["gsutil", "cp", gcs_uri, local_path],
-                capture_output=True,
-                text=True,
-                check=True
-            )
+            self.transport.download(gcs_uri, local_path)
             
-            logger.info(f"Видео скачано: {local_path}")
+            logger.info("Видео скачано: %s", local_path)
             return local_path
             
         except subprocess.CalledProcessError as e:
             logger.error(f"Ошибка скачивания видео: {e}")
             raise
     
+    def save_operation_videos(self, job: GenerationJob, operation_result: Dict, timings: Optional[Dict] = None) -> List[Dict]:
+        """Сохранение видео завершенной операции и формирование результатов"""
+        
+        image_file = Path(job.image_path)
+        output_folder = Path(job.output_folder)
+        output_folder.mkdir(parents=True, exist_ok=True)
+        scenario = job.scenario
+        results = []
+        
+        if "error" in operation_result:
+            error = operation_result["error"]
+            logger.error(f"Операция завершилась с ошибкой {image_file.name}: {error}")
+            return [{
+                "source_image": str(image_file),
+                "operation_name": job.operation_name,
+                "status": "error",
+                "error": str(error.get("message", error) if isinstance(error, dict) else error)
+            }]
+        
+        if "response" in operation_result:
+            response_data = operation_result["response"]
+            videos = response_data.get("videos", [])
+            
+            for i, video in enumerate(videos):
+                video_result = {
+                    "source_image": str(image_file),
+                    "operation_name": job.operation_name,
+                    "video_index": i,
+                    "status": "success",
+                    "product": "TURAN Lux Dressing Table",
+                    "scenario_id": scenario['id'],  # Сам сценарий хранится один раз (used_scenario)
+                    "russian_text": scenario['russian_voiceover'],
+                    "cinematic_style": str(scenario.get('cinematic_style', 'standard')),  # ИСПРАВЛЕНО
+                    "lighting_mood": str(scenario.get('lighting_mood', 'natural')),        # ИСПРАВЛЕНО
+                    "prompt_enhancement": "enhanced" if job.config.use_enhanced_prompts else "traditional"
+                }
+                
+                download_started = time.time()
+                
+                if "gcsUri" in video:
+                    gcs_uri = video["gcsUri"]
+                    local_filename = f"turan_{scenario['id']}_{image_file.stem}_v{i}.mp4"
+                    local_path = output_folder / local_filename
+                    
+                    if self.media_store is not None:
+                        # Уже скачанное видео не скачивается повторно, в папку - жесткая ссылка
+                        digest = self.media_store.fetch_gcs(gcs_uri, self.download_video)
+                        self.media_store.materialize(digest, str(local_path))
+                        video_result["sha256"] = digest
+                    else:
+                        partial_path = local_path.with_name(local_path.name + ".part")
+                        self.download_video(gcs_uri, str(partial_path))
+                        os.replace(partial_path, local_path)
+                    video_result["local_path"] = str(local_path)
+                    video_result["gcs_uri"] = gcs_uri
+                    
+                elif "bytesBase64Encoded" in video:
+                    video_data = base64.b64decode(video["bytesBase64Encoded"])
+                    local_filename = f"turan_{scenario['id']}_{image_file.stem}_v{i}.mp4"
+                    local_path = output_folder / local_filename
+                    
+                    if self.media_store is not None:
+                        digest = self.media_store.put_bytes(video_data)
+                        self.media_store.materialize(digest, str(local_path))
+                        video_result["sha256"] = digest
+                    else:
+                        # Атомарная запись: частичный файл никогда не виден под итоговым именем
+                        partial_path = local_path.with_name(local_path.name + ".part")
+                        with open(partial_path, 'wb') as f:
+                            f.write(video_data)
+                        os.replace(partial_path, local_path)
+                    
+                    video_result["local_path"] = str(local_path)
+                
+                if timings is not None:
+                    video_result["timings"] = {
+                        **timings,
+                        "download_seconds": round(time.time() - download_started, 3)
+                    }
+                
+                results.append(video_result)
+        
+        return results
+    
     def process_image_folder(
+        self,
+        folder_path: str,
+        output_folder: str,
+        config: VideoGenerationConfig,
+        *args,
+        on_result: Optional[Callable[[Dict], None]] = None,
+        **kwargs
+    ) -> List[Dict]:
+        """Обработка папки со списком всех результатов в конце
+        
+        Для больших пакетов удобнее iter_process_image_folder: результаты
+        выдаются по мере готовности и не копятся в памяти. on_result вызывается
+        для каждого результата сразу после его получения.
+        """
+        results = []
+        for result in self.iter_process_image_folder(folder_path, output_folder, config, *args, **kwargs):
+            if on_result is not None:
+                on_result(result)
+            results.append(result)
+        return results
+    
+    def iter_process_image_folder(
         self, 
         folder_path: str, 
         output_folder: str,
         config: VideoGenerationConfig,
-        storage_uri: Optional[str] = None
-    ) -> List[Dict]:
-        """Обработка папки с изображениями туалетных столиков"""
+        storage_uri: Optional[str] = None,
+        scheduler_settings: Optional[SchedulerSettings] = None,
+        dedup_radius: Optional[int] = None,
+        hash_index: Optional[str] = "turan_hash_index.db",
+        preflight: bool = True,
+        max_file_size: int = DEFAULT_MAX_FILE_SIZE,
+        min_dimension: int = DEFAULT_MIN_DIMENSION,
+        pipeline_settings: Optional["PipelineSettings"] = None,
+        recursive: bool = True,
+        manifest_path: Optional[str] = None,
+        reprocess: bool = False,
+        trust_directory_mtime: bool = True,
+        match_content: bool = False
+    ) -> Iterator[Dict]:
+        """Обработка папки с изображениями туалетных столиков, результаты по мере готовности
+        
+        Результаты выдаются в порядке готовности и ссылаются на сценарий
+        по scenario_id (см. used_scenario). Обход папки идет в стадии scan
+        turan_pipeline, поэтому первая операция отправляется, не дожидаясь обхода
+        всего каталога; задания проходят стадии (кодирование, отправка и опрос,
+        скачивание) через ограниченные очереди, и память не растет с размером папки.
+        
+        preflight проверяет изображения пакетами до отправки (turan_preflight):
+        поврежденные, слишком большие или не подходящие по ориентации файлы
+        попадают в результаты со статусом rejected.
+        dedup_radius включает пропуск почти одинаковых снимков (turan_dedup):
+        генерируется один представитель группы, остальные попадают в результаты
+        со статусом duplicate. Группы ищутся пакетами: снимок, близкий к уже
+        отправленному, считается его дубликатом.
+        
+        Папка обходится рекурсивно (turan_scanner), видео из вложенных папок
+        сохраняются в такие же подпапки output_folder. С manifest_path (относительный
+        путь - внутри output_folder) обрабатываются только новые, измененные и ранее
+        не завершенные файлы; reprocess обрабатывает все, trust_directory_mtime=False
+        перечитывает и папки, mtime которых не изменился (файлы, перезаписанные на месте),
+        match_content пропускает копии уже обработанных файлов по другим путям.
+        """
+        from turan_scanner import ScanManifest, scan_images
         
+        output_folder = Path(output_folder)
+        output_folder.mkdir(parents=True, exist_ok=True)
         folder = Path(folder_path)
+        
+        manifest = None
+        if manifest_path:
+            manifest = ScanManifest(str(output_folder / manifest_path), match_content=match_content)
+            image_paths = manifest.scan(
+                folder_path, IMAGE_EXTENSIONS, recursive=recursive, reprocess=reprocess,
+                trust_directory_mtime=trust_directory_mtime
+            )
+        else:
+            image_paths = (entry.path for entry in scan_images(folder_path, IMAGE_EXTENSIONS, recursive=recursive))
+        
+        def jobs() -> Iterator[GenerationJob]:
+            """Задания по мере обхода: проверка и поиск дубликатов пакетами по SCREEN_BATCH"""
+            found = 0
+            # Индекс хешей (SQLite) открывается в потоке стадии scan, где и используется
+            duplicate_filter = None
+            if dedup_radius is not None:
+                try:
+                    from turan_dedup import DuplicateFilter
+                except ImportError as e:
+                    logger.warning(f"Поиск дубликатов недоступен (нужны numpy и Pillow): {e}")
+                else:
+                    duplicate_filter = DuplicateFilter(dedup_radius, hash_index)
+            try:
+                while True:
+                    batch = list(islice(image_paths, SCREEN_BATCH))
+                    if not batch:
+                        break
+                    found += len(batch)
+                    if preflight:
+                        batch, rejected = validate_images(
+                            batch,
+                            aspect_ratio=config.aspect_ratio.value,
+                            max_file_size=max_file_size,
+                            min_dimension=min_dimension
+                        )
+                        for check in rejected:
+                            pipeline.report(check.to_result())
+                    if duplicate_filter is not None and batch:
+                        batch, duplicates = duplicate_filter.filter(batch)
+                        for path, representative in duplicates.items():
+                            pipeline.report({"source_image": path, "status": "duplicate", "duplicate_of": representative})
+                    for path in batch:
+                        yield self._folder_job(Path(path), folder, output_folder, config, storage_uri)
+            finally:
+                if duplicate_filter is not None:
+                    duplicate_filter.close()
+                logger.info(f"Найдено {found} изображений туалетных столиков для обработки")
+                if manifest is not None:
+                    logger.info("Манифест каталога: %s", manifest.stats)
+        
+        # Одновременные операции через общий планировщик
+        scheduler = self.create_scheduler(scheduler_settings)
+        pipeline = self.create_pipeline(scheduler, pipeline_settings)
+        
+        # Ctrl-C / SIGTERM: остановка без потери начатых операций и частичных результатов
+        settings = scheduler.settings
+        try:
+            with graceful_shutdown(scheduler, settings.shutdown_mode, settings.drain_timeout):
+                for result in pipeline.run(jobs()):
+                    self._settle_in_manifest(manifest, result)
+                    yield result
+        finally:
+            if manifest is not None:
+                manifest.close()
+    
+    def iter_process_campaign(
+        self,
+        manifest_path: str,
+        output_folder: str,
+        config: VideoGenerationConfig,
+        storage_uri: Optional[str] = None,
+        scheduler_settings: Optional[SchedulerSettings] = None,
+        pipeline_settings: Optional["PipelineSettings"] = None,
+        preflight: bool = True,
+        max_file_size: int = DEFAULT_MAX_FILE_SIZE,
+        min_dimension: int = DEFAULT_MIN_DIMENSION
+    ) -> Iterator[Dict]:
+        """Кампания из манифеста (JSONL/CSV/YAML): у каждой строки свои изображение и настройки
+        
+        config - базовая конфигурация, строка переопределяет ее поля, промпт,
+        сценарий, подпапку вывода и GCS URI. Все строки идут через один
+        конвейер и планировщик: общие соединения, токен и лимит параллелизма.
+        Строки с ошибками и изображения, не прошедшие проверку, выдаются
+        со статусом rejected, остальная кампания продолжается.
+        """
         output_folder = Path(output_folder)
-        output_folder.mkdir(exist_ok=True)
+        output_folder.mkdir(parents=True, exist_ok=True)
         
-        results = []
+        def jobs(pipeline: "StagedPipeline") -> Iterator[GenerationJob]:
+            targets = set()
+            for row in iter_campaign(manifest_path):
+                try:
+                    if row.error:
+                        raise ValueError(row.error)
+                    row_config = config.with_overrides(row.overrides)
+                    if not Path(row.image_path).is_file():
+                        raise ValueError(f"Изображение не найдено: {row.image_path}")
+                except (ValueError, TypeError) as e:
+                    logger.warning(f"Строка {row.number} манифеста пропущена: {e}")
+                    pipeline.report(row.to_result(str(e)))
+                    continue
+                
+                if preflight:
+                    check = check_image(row.image_path, row_config.aspect_ratio.value, max_file_size, min_dimension)
+                    if not check.ok:
+                        logger.warning(f"Предварительная проверка отклонила {row.image_path}: {check.reason}")
+                        pipeline.report({**check.to_result(), "job_id": row.job_id, "campaign_row": row.number})
+                        continue
+                
+                row_output = output_folder / row.output_folder if row.output_folder else output_folder
+                if (row.image_path, row_output) in targets:
+                    # То же изображение с другими настройками не перезаписывает прошлые видео
+                    row_output = row_output / row.job_id
+                targets.add((row.image_path, row_output))
+                yield GenerationJob(
+                    job_id=row.job_id,
+                    image_path=row.image_path,
+                    output_folder=str(row_output),
+                    config=row_config,
+                    custom_prompt=row.custom_prompt,
+                    storage_uri=row.storage_uri or storage_uri,
+                    scenario_id=row.scenario_id
+                )
+        
+        yield from self._run_jobs(jobs, scheduler_settings, pipeline_settings)
+    
+    def iter_generate_previews(
+        self,
+        folder_path: str,
+        output_folder: str,
+        config: VideoGenerationConfig,
+        tier_settings: Optional["TierSettings"] = None,
+        storage_uri: Optional[str] = None,
+        scheduler_settings: Optional[SchedulerSettings] = None,
+        pipeline_settings: Optional["PipelineSettings"] = None,
+        preflight: bool = True,
+        max_file_size: int = DEFAULT_MAX_FILE_SIZE,
+        min_dimension: int = DEFAULT_MIN_DIMENSION,
+        recursive: bool = True
+    ) -> Iterator[Dict]:
+        """Первый уровень: превью 720p без звука для каждого изображения и сценария-кандидата
+        
+        Превью сохраняются в output_folder/previews с той же структурой подпапок.
+        Результаты помечаются tier=preview и seed, по ним iter_promote_previews
+        повторяет генерацию в финальном качестве.
+        """
+        from turan_scanner import scan_images
+        from turan_preview import TierSettings, PREVIEW_FOLDER, preview_overrides, tier_seed, candidate_scenarios
+        
+        settings = tier_settings or TierSettings()
+        folder = Path(folder_path)
+        preview_root = Path(output_folder) / PREVIEW_FOLDER
+        preview_root.mkdir(parents=True, exist_ok=True)
+        preview_config = config.with_overrides(preview_overrides())
+        scenario_ids = [scenario['id'] for scenario in self.showcase_scenarios]
+        for scenario_id in settings.scenarios:
+            self.get_scenario(scenario_id)  # неизвестный id - ошибка до первого вызова API
+        seeds: Dict[str, int] = {}
+        
+        def jobs(pipeline: "StagedPipeline") -> Iterator[GenerationJob]:
+            for entry in scan_images(folder_path, IMAGE_EXTENSIONS, recursive=recursive):
+                if preflight:
+                    check = check_image(entry.path, preview_config.aspect_ratio.value, max_file_size, min_dimension)
+                    if not check.ok:
+                        logger.warning(f"Предварительная проверка отклонила {entry.path}: {check.reason}")
+                        pipeline.report(check.to_result())
+                        continue
+                relative = Path(entry.path).relative_to(folder)
+                for scenario_id in candidate_scenarios(entry.path, scenario_ids, settings):
+                    seed = config.seed if config.seed is not None else tier_seed(entry.path, scenario_id)
+                    job_id = f"{relative}#{scenario_id}"
+                    seeds[job_id] = seed
+                    yield GenerationJob(
+                        job_id=job_id,
+                        image_path=entry.path,
+                        output_folder=str(preview_root / relative.parent),
+                        config=replace(preview_config, seed=seed),
+                        storage_uri=storage_uri,
+                        scenario_id=scenario_id
+                    )
+        
+        for result in self._run_jobs(jobs, scheduler_settings, pipeline_settings):
+            if result.get("job_id") in seeds:
+                result.update(tier="preview", seed=seeds[result["job_id"]])
+            yield result
+    
+    def iter_promote_previews(
+        self,
+        output_folder: str,
+        config: VideoGenerationConfig,
+        tier_settings: Optional["TierSettings"] = None,
+        approval_file: Optional[str] = None,
+        storage_uri: Optional[str] = None,
+        scheduler_settings: Optional[SchedulerSettings] = None,
+        pipeline_settings: Optional["PipelineSettings"] = None
+    ) -> Iterator[Dict]:
+        """Второй уровень: финальные 1080p видео для одобренных превью
         
-        # Поддерживаемые форматы
-        supported_formats = {'.jpg', '.jpeg', '.png'}
+        Превью читаются из отчета output_folder/previews. Одобрение - файл
+        (approval_file или tiered.approval_file в папке превью), иначе функция
+        оценки tiered.scoring_hook. Сценарий и seed берутся из превью,
+        видео сохраняются в output_folder/final.
+        """
+        from turan_preview import (
+            TierSettings, PREVIEW_FOLDER, FINAL_FOLDER, PREVIEW_REPORT, final_overrides,
+            read_approval_file, is_approved, load_scoring_hook, select_by_score
+        )
         
-        image_files = [
-            f for f in folder.iterdir() 
-            if f.is_file() and f.suffix.lower() in supported_formats
+        settings = tier_settings or TierSettings()
+        preview_root = Path(output_folder) / PREVIEW_FOLDER
+        report_path = preview_root / PREVIEW_REPORT
+        if not report_path.is_file():
+            raise FileNotFoundError(f"Отчет превью не найден: {report_path} (сначала запустите генерацию превью)")
+        previews = [
+            result for result in iter_results(str(report_path))
+            if result.get("tier") == "preview" and result.get("status") == "success"
         ]
         
-        logger.info(f"Найдено {len(image_files)} изображений туалетных столиков для обработки")
+        approval_path = Path(approval_file) if approval_file else preview_root / settings.approval_file
+        if approval_path.is_file():
+            approved = read_approval_file(str(approval_path))
+            selected = [preview for preview in previews if is_approved(preview, approved)]
+            logger.info("Одобрено по файлу %s: %s из %s превью", approval_path, len(selected), len(previews))
+        elif settings.scoring_hook:
+            selected = select_by_score(previews, load_scoring_hook(settings.scoring_hook), settings)
+            logger.info("Выбрано по оценке %s: %s из %s превью", settings.scoring_hook, len(selected), len(previews))
+        else:
+            raise FileNotFoundError(f"Нет файла одобрения {approval_path} и не задан tiered.scoring_hook")
         
-        for image_file in image_files:
-            try:
-                logger.info(f"Создание видео показа для: {image_file.name}")
-                
-                # Генерация видео
-                operation_name, scenario = self.generate_video_from_image(
-                    str(image_file), 
-                    config, 
-                    storage_uri=storage_uri
+        final_root = Path(output_folder) / FINAL_FOLDER
+        final_config = config.with_overrides(final_overrides())
+        promoted: Dict[str, Dict] = {}
+        for preview in selected:
+            promoted.setdefault(preview["job_id"], preview)  # несколько видео одного превью - один финал
+        
+        def jobs(pipeline: "StagedPipeline") -> Iterator[GenerationJob]:
+            for job_id, preview in promoted.items():
+                relative_image = Path(job_id.rsplit('#', 1)[0])
+                yield GenerationJob(
+                    job_id=job_id,
+                    image_path=preview["source_image"],
+                    output_folder=str(final_root / relative_image.parent),
+                    config=replace(final_config, seed=preview["seed"]),
+                    storage_uri=storage_uri,
+                    scenario_id=preview["scenario_id"]
                 )
-                
-                # Ожидание завершения
-                operation_result = self.poll_operation_status(operation_name)
-                
-                # Обработка результата
-                if "response" in operation_result:
-                    response_data = operation_result["response"]
-                    videos = response_data.get("videos", [])
-                    
-                    for i, video in enumerate(videos):
-                        video_result = {
-                            "source_image": str(image_file),
-                            "operation_name": operation_name,
-                            "video_index": i,
-                            "status": "success",
-                            "product": "TURAN Lux Dressing Table",
-                            "scenario": scenario,
-                            "russian_text": scenario['russian_voiceover'],
-                            "cinematic_style": str(scenario.get('cinematic_style', 'standard')),  # ИСПРАВЛЕНО
-                            "lighting_mood": str(scenario.get('lighting_mood', 'natural')),        # ИСПРАВЛЕНО
-                            "prompt_enhancement": "enhanced" if config.use_enhanced_prompts else "traditional"
-                        }
-                        
-                        if "gcsUri" in video:
-                            gcs_uri = video["gcsUri"]
-                            local_filename = f"turan_{scenario['id']}_{image_file.stem}_v{i}.mp4"
-                            local_path = output_folder / local_filename
-                            
-                            self.download_video(gcs_uri, str(local_path))
-                            video_result["local_path"] = str(local_path)
-                            video_result["gcs_uri"] = gcs_uri
-                            
-                        elif "bytesBase64Encoded" in video:
-                            video_data = base64.b64decode(video["bytesBase64Encoded"])
-                            local_filename = f"turan_{scenario['id']}_{image_file.stem}_v{i}.mp4"
-                            local_path = output_folder / local_filename
-                            
-                            with open(local_path, 'wb') as f:
-                                f.write(video_data)
-                            
-                            video_result["local_path"] = str(local_path)
-                        
-                        results.append(video_result)
-                
-            except Exception as e:
-                logger.error(f"Ошибка обработки {image_file.name}: {e}")
-                results.append({
-                    "source_image": str(image_file),
-                    "status": "error",
-                    "error": str(e)
-                })
         
-        return results
+        for result in self._run_jobs(jobs, scheduler_settings, pipeline_settings):
+            preview = promoted.get(result.get("job_id"))
+            if preview is not None:
+                result.update(tier="final", seed=preview["seed"], preview_path=preview.get("local_path"))
+            yield result
+    
+    def _run_jobs(
+        self,
+        make_jobs: Callable[["StagedPipeline"], Iterator[GenerationJob]],
+        scheduler_settings: Optional[SchedulerSettings] = None,
+        pipeline_settings: Optional["PipelineSettings"] = None
+    ) -> Iterator[Dict]:
+        """Выполнение заданий через конвейер с обработкой Ctrl-C/SIGTERM"""
+        scheduler = self.create_scheduler(scheduler_settings)
+        pipeline = self.create_pipeline(scheduler, pipeline_settings)
+        settings = scheduler.settings
+        with graceful_shutdown(scheduler, settings.shutdown_mode, settings.drain_timeout):
+            yield from pipeline.run(make_jobs(pipeline))
+    
+    def iter_watch_image_folder(
+        self,
+        folder_path: str,
+        output_folder: str,
+        config: VideoGenerationConfig,
+        storage_uri: Optional[str] = None,
+        scheduler_settings: Optional[SchedulerSettings] = None,
+        pipeline_settings: Optional["PipelineSettings"] = None,
+        preflight: bool = True,
+        max_file_size: int = DEFAULT_MAX_FILE_SIZE,
+        min_dimension: int = DEFAULT_MIN_DIMENSION,
+        manifest_path: str = "turan_scan_manifest.db",
+        recursive: bool = True,
+        settle_seconds: float = 5.0,
+        poll_interval: float = 10.0,
+        use_inotify: bool = True,
+        stop_event: Optional[threading.Event] = None,
+        match_content: bool = False
+    ) -> Iterator[Dict]:
+        """Непрерывная обработка папки: незавершенные изображения, затем новые по мере появления
+        
+        Новые файлы приходят от turan_watch (inotify или опрос) после того, как
+        запись завершилась, и идут через тот же конвейер и планировщик, поэтому
+        соединения и токен авторизации переиспользуются. Работает до Ctrl-C/SIGTERM
+        или stop_event; первый сигнал дорабатывает начатые операции.
+        """
+        from turan_scanner import ScanManifest
+        from turan_watch import create_watcher, watch_images
+        
+        output_folder = Path(output_folder)
+        output_folder.mkdir(parents=True, exist_ok=True)
+        folder = Path(folder_path)
+        stop_event = stop_event or threading.Event()
+        
+        manifest = ScanManifest(str(output_folder / manifest_path), match_content=match_content)
+        # Наблюдение начинается до догоняющего обхода, чтобы не пропустить файлы между ними
+        watcher = create_watcher(folder_path, IMAGE_EXTENSIONS, poll_interval, use_inotify)
+        scheduler = self.create_scheduler(scheduler_settings)
+        pipeline = self.create_pipeline(scheduler, pipeline_settings)
+        
+        def incoming() -> Iterator[str]:
+            yield from manifest.scan(folder_path, IMAGE_EXTENSIONS, recursive=recursive)
+            logger.info("Ожидание новых изображений в %s", folder_path)
+            for path in watch_images(folder_path, stop_event, IMAGE_EXTENSIONS, settle_seconds, watcher=watcher):
+                if manifest.admit(path):
+                    yield path
+        
+        # Догоняющий обход и события могут назвать один файл, пока он в работе;
+        # после исхода повторы отсекает манифест, и запись удаляется
+        queued: Dict[str, tuple] = {}
+        queued_lock = threading.Lock()
+        
+        def jobs() -> Iterator[GenerationJob]:
+            for path in incoming():
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                state = (stat.st_size, stat.st_mtime_ns)
+                with queued_lock:
+                    if queued.get(path) == state:
+                        continue
+                    queued[path] = state
+                if preflight:
+                    check = check_image(path, config.aspect_ratio.value, max_file_size, min_dimension)
+                    if not check.ok:
+                        logger.warning(f"Предварительная проверка отклонила {path}: {check.reason}")
+                        pipeline.report(check.to_result())
+                        continue
+                logger.info("Новое изображение в очереди: %s", path)
+                yield self._folder_job(Path(path), folder, output_folder, config, storage_uri)
+        
+        settings = scheduler.settings
+        try:
+            with graceful_shutdown(scheduler, settings.shutdown_mode, settings.drain_timeout, stop_event=stop_event):
+                for result in pipeline.run(jobs()):
+                    self._settle_in_manifest(manifest, result)
+                    with queued_lock:
+                        queued.pop(result.get("source_image"), None)
+                    yield result
+        finally:
+            stop_event.set()
+            manifest.close()
+    
+    @staticmethod
+    def _folder_job(image_file: Path, folder: Path, output_folder: Path, config: VideoGenerationConfig, storage_uri: Optional[str]) -> GenerationJob:
+        """Задание для изображения из папки: структура подпапок повторяется в output_folder"""
+        return GenerationJob(
+            job_id=str(image_file.relative_to(folder)),
+            image_path=str(image_file),
+            output_folder=str(output_folder / image_file.parent.relative_to(folder)),
+            config=config,
+            storage_uri=storage_uri
+        )
+    
+    @staticmethod
+    def _settle_in_manifest(manifest: Optional["ScanManifest"], result: Dict):
+        """Исход обработки в манифест: готовые и отклоненные файлы не повторяются"""
+        status = {"success": "done", "error": "error", "rejected": "rejected", "duplicate": "duplicate"}.get(result.get("status"))
+        if manifest is not None and status is not None:
+            manifest.mark([result["source_image"]], status)
+    
+    def create_scheduler(self, settings: Optional[SchedulerSettings] = None) -> OperationScheduler:
+        """Планировщик операций поверх генератора с подключенной аналитикой"""
+        # Воспроизведение кассеты идет по своим часам (записанное время, а не реальное)
+        make_clock = getattr(self.transport, "clock", None)
+        clock = make_clock() if make_clock is not None else SystemClock(self.transport.sleep)
+        scheduler = OperationScheduler(
+            GeneratorBackend(self, clock),
+            settings or SchedulerSettings(region_weights={self.location: 1.0}),
+            clock=clock
+        )
+        if self.analytics is not None:
+            scheduler.listeners.append(self.analytics.listener)
+            if scheduler.settings.hedge_enabled:
+                # Порог хеджирования доступен с первого задания
+                scheduler.observe_latencies(self.analytics.recent_timings(limit=500)["generation_times"])
+        if self.progress is not None:
+            scheduler.listeners.append(self.progress.listener)
+        return scheduler
+    
+    def create_pipeline(self, scheduler: OperationScheduler, settings: Optional["PipelineSettings"] = None) -> "StagedPipeline":
+        """Конвейер стадий с постобработкой и панелью прогресса, если они подключены"""
+        from turan_pipeline import StagedPipeline
+        
+        pipeline = StagedPipeline(scheduler, settings, self.postprocessor)
+        if self.progress is not None:
+            self.progress.attach(pipeline)
+        return pipeline
     
     def create_social_media_configs(self) -> List[VideoGenerationConfig]:
         """Создание конфигураций для разных социальных сетей"""
@@ -635,24 +1271,32 @@ class SimpleTuranGenerator:
         """Получить все доступные сценарии показа"""
         return self.showcase_scenarios
     
+    def get_scenario(self, scenario_id: str) -> dict:
+        """Получить сценарий показа по id"""
+        for scenario in self.showcase_scenarios:
+            if scenario['id'] == scenario_id:
+                return scenario
+        raise ValueError(f"Неизвестный сценарий: {scenario_id}")
+    
     def get_scenarios_by_focus(self, focus: str) -> List[dict]:
         """Получить сценарии по фокусу"""
         return [s for s in self.showcase_scenarios if s['focus'] == focus]
     
     def get_generation_analytics(self) -> Dict:
         """Получение аналитики генерации"""
-        total = self.generation_stats["total_generated"]
+        stats = self.generation_stats
+        total = stats["total_generated"]
         if total > 0:
-            enhancement_rate = (self.generation_stats["enhanced_prompts_used"] / total) * 100
+            enhancement_rate = (stats["enhanced_prompts_used"] / total) * 100
         else:
             enhancement_rate = 0
         
         return {
-            **self.generation_stats,
+            **stats,
             "enhancement_usage_percentage": enhancement_rate,
             "traditional_usage_percentage": 100 - enhancement_rate,
             "most_used_scenarios": dict(sorted(
-                self.generation_stats["scenarios_used"].items(), 
+                stats["scenarios_used"].items(), 
                 key=lambda x: x[1], 
                 reverse=True
             )[:5])
@@ -673,6 +1317,8 @@ class SimpleTuranGenerator:
                 "cinematic_styles": len(self.camera_setups),
                 "enhanced_scenarios": len(self.showcase_scenarios)
             },
+            # Время и успешность за все запуски из постоянного хранилища
+            "history": self.analytics.report() if self.analytics is not None else None,
             "recommendations": [
                 "Используйте enhanced_prompts=True для кинематографического качества",
                 "Экспериментируйте с разными cinematic_style и lighting_mood",
@@ -682,13 +1328,14 @@ class SimpleTuranGenerator:
             ]
         }
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(report, f, ensure_ascii=False, indent=2)
+        with open(filename, 'wb') as f:
+            f.write(turan_json.dumps(report, indent=True))
         
         logger.info(f"✅ Отчет о производительности сохранен: {filename}")
 
 def main():
     """Основная функция для демонстрации улучшений"""
+    setup_logging()
     
     # Инициализация улучшенного генератора
     generator = SimpleTuranGenerator()
@@ -738,8 +1385,8 @@ def main():
         
         # Сохранение отчета
         report_path = Path(output_folder) / "enhanced_showcase_generation_report.json"
-        with open(report_path, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        with open(report_path, 'wb') as f:
+            f.write(turan_json.dumps(results, indent=True))
         
         # Экспорт аналитики производительности
         generator.export_performance_report()
@@ -6,14 +6,23 @@ TURAN Simple Dressing Table Video Generator - Enhanced CLI Runner
 """
 
 import argparse
+import math
 import sys
-import yaml
-import json
+import time
+from typing import List, Optional
 from pathlib import Path
-from main import SimpleTuranGenerator, VideoGenerationConfig, VeoModel, AspectRatio, Resolution, CinematicStyle, LightingMood
+from main import SimpleTuranGenerator, VideoGenerationConfig, VeoModel, AspectRatio, Resolution, CinematicStyle, LightingMood, setup_logging, IMAGE_EXTENSIONS
+from turan_scheduler import SchedulerSettings
+from turan_results import JsonlResultWriter, ResultSummary
+from turan_campaign import iter_campaign, CAMPAIGN_FORMATS
+from turan_preview import TierSettings, PREVIEW_FOLDER, FINAL_FOLDER, PREVIEW_REPORT
+
+REPORT_FILENAME = "enhanced_showcase_generation_report.jsonl"
 
 def load_config(config_path: str = "simple_turan_config.yaml") -> dict:
     """Загрузка конфигурации из YAML файла"""
+    import yaml
+    
     try:
         with open(config_path, 'r', encoding='utf-8') as file:
             return yaml.safe_load(file)
@@ -84,6 +93,261 @@ def create_config_from_args(args, config_data: dict) -> VideoGenerationConfig:
         use_enhanced_prompts=not args.disable_enhanced and enhanced_defaults.get('enabled', True)
     )
 
+def create_transport_from_args(args):
+    """Создание транспорта: запись кассеты, воспроизведение или прямой режим"""
+    from turan_transport import HttpTransport, RecordingTransport, ReplayTransport
+    
+    if args.replay:
+        return ReplayTransport(args.replay, time_scale=args.replay_speed)
+    if args.record:
+        return RecordingTransport(args.record)
+    return HttpTransport()
+
+def scheduler_settings_from_args(args, config_data: dict, location: str) -> SchedulerSettings:
+    """Настройки планировщика из конфигурации с переопределениями из командной строки"""
+    settings = SchedulerSettings.from_config(config_data, location)
+    if args.shutdown_mode:
+        settings.shutdown_mode = args.shutdown_mode
+    if args.drain_timeout is not None:
+        settings.drain_timeout = args.drain_timeout
+    return settings
+
+def dedup_options_from_args(args, config_data: dict) -> dict:
+    """Параметры пропуска почти одинаковых изображений для process_image_folder"""
+    dedup = (config_data.get('image_processing', {}) or {}).get('deduplication', {}) or {}
+    if args.keep_duplicates or not dedup.get('enabled', False):
+        return {"dedup_radius": None}
+    return {
+        "dedup_radius": int(dedup.get('hamming_radius', 6)),
+        "hash_index": dedup.get('index_file', 'turan_hash_index.db')
+    }
+
+def scan_options_from_args(args, config_data: dict) -> dict:
+    """Параметры обхода входной папки и манифеста для process_image_folder"""
+    scan = (config_data.get('image_processing', {}) or {}).get('scan', {}) or {}
+    return {
+        "recursive": scan.get('recursive', True),
+        "manifest_path": scan.get('manifest_file', 'turan_scan_manifest.db') if scan.get('manifest', True) else None,
+        "reprocess": args.reprocess,
+        # Перезаписанный на месте файл не меняет mtime папки: --full-rescan читает все папки
+        "trust_directory_mtime": scan.get('trust_directory_mtime', True) and not args.full_rescan,
+        "match_content": scan.get('match_content', False)
+    }
+
+def watch_options_from_args(args, config_data: dict) -> dict:
+    """Параметры режима наблюдения (--watch) для iter_watch_image_folder"""
+    image_processing = config_data.get('image_processing', {}) or {}
+    scan = image_processing.get('scan', {}) or {}
+    watch = image_processing.get('watch', {}) or {}
+    return {
+        "recursive": scan.get('recursive', True),
+        # Манифест обязателен: по нему видно, что уже обработано до перезапуска
+        "manifest_path": scan.get('manifest_file', 'turan_scan_manifest.db'),
+        "match_content": scan.get('match_content', False),
+        "settle_seconds": float(watch.get('settle_seconds', 5)),
+        "poll_interval": float(watch.get('poll_interval', 10)),
+        "use_inotify": watch.get('use_inotify', True)
+    }
+
+def preflight_options_from_args(args, config_data: dict) -> dict:
+    """Параметры предварительной проверки изображений для process_image_folder"""
+    from turan_logging import parse_size
+    
+    image_processing = config_data.get('image_processing', {}) or {}
+    preflight = image_processing.get('preflight', {}) or {}
+    return {
+        "preflight": not args.skip_preflight and preflight.get('enabled', True),
+        "max_file_size": parse_size(image_processing.get('max_file_size', '50MB')),
+        "min_dimension": int(preflight.get('min_dimension', 256))
+    }
+
+def show_preflight_report(args, config_data: dict, config: VideoGenerationConfig, image_paths: List[str]) -> List[str]:
+    """Отчет предварительной проверки для dry-run, возвращает годные изображения"""
+    from turan_preflight import validate_images
+    
+    options = preflight_options_from_args(args, config_data)
+    if not options["preflight"]:
+        return image_paths
+    accepted, rejected = validate_images(
+        image_paths,
+        aspect_ratio=config.aspect_ratio.value,
+        max_file_size=options["max_file_size"],
+        min_dimension=options["min_dimension"]
+    )
+    print(f"\n🛂 ПРЕДВАРИТЕЛЬНАЯ ПРОВЕРКА: {len(accepted)} годных, {len(rejected)} отклонено")
+    for check in rejected[:10]:
+        print(f"   🚫 {Path(check.path).name}: {check.reason}")
+    if len(rejected) > 10:
+        print(f"   ... и еще {len(rejected) - 10}")
+    return accepted
+
+def load_simulation_model(args, config_data: dict, resolution: Optional[str] = None):
+    """Модель симуляции с историей времени: хранилище аналитики, иначе JSON отчеты"""
+    from turan_simulator import SimulationModel, load_history
+    
+    model = SimulationModel.from_config(config_data)
+    history = {"generation_times": [], "download_times": []}
+    
+    analytics_db = (config_data.get('storage', {}) or {}).get('analytics_db', 'turan_analytics.db')
+    if not args.history and Path(analytics_db).exists():
+        from turan_analytics import AnalyticsStore
+        store = AnalyticsStore(analytics_db)
+        history = store.recent_timings(resolution=resolution)
+        store.close()
+    
+    if not history["generation_times"]:
+        history_files = args.history or [
+            str(Path(args.output) / REPORT_FILENAME),
+            str(Path(args.output) / "enhanced_showcase_generation_report.json")  # отчеты до перехода на JSONL
+        ]
+        history = load_history([path for path in history_files if Path(path).exists()])
+    
+    model.generation_times = history["generation_times"]
+    model.download_times = history["download_times"]
+    return model
+
+def format_size(size: int) -> str:
+    """Размер в байтах в читаемом виде"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def show_batch_plan(args, config_data: dict, config: VideoGenerationConfig, image_paths: List[str]):
+    """План пакета для dry-run: время, операции, вызовы API, память и диск"""
+    from turan_planner import build_plan, parse_deadline
+    from turan_pipeline import PipelineSettings
+    
+    deadline = None
+    if args.deadline:
+        try:
+            deadline = parse_deadline(args.deadline)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+    
+    settings = SchedulerSettings.from_config(config_data)
+    model = load_simulation_model(args, config_data, resolution=config.resolution.value)
+    plan = build_plan(
+        image_paths, config, settings, model, args.output,
+        storage_uri=args.storage_uri, deadline=deadline,
+        pipeline=PipelineSettings.from_config(config_data)
+    )
+    
+    print(f"\n📋 ПЛАН ПАКЕТА:")
+    if plan.history_samples:
+        print(f"   📚 По истории: {plan.history_samples} генераций")
+    else:
+        print(f"   📚 История не найдена, модель: медиана {model.generation_median:g}s")
+    print(f"   ⚙️ Параллелизм: {settings.max_concurrent_operations}, регионы: {settings.region_weights}")
+    print(f"   ⏱️ Ожидаемое время: {plan.makespan_seconds / 60:.1f} мин (худший прогон {plan.makespan_worst_seconds / 60:.1f} мин)")
+    print(f"   🏁 Завершение около: {time.strftime('%H:%M', time.localtime(plan.finish_at))}")
+    print(f"   🎬 Операций Veo: {plan.operations}, видео: {plan.videos}")
+    print(f"   📡 Вызовы API: {plan.total_api_calls} {plan.api_calls}")
+    stages = ", ".join(f"{stage} {format_size(size)}" for stage, size in plan.memory_breakdown.items())
+    print(f"   🧠 Пиковая память: {format_size(plan.peak_memory_bytes)} (стадии: {stages})")
+    disk_note = "по готовым видео" if plan.video_size_source == "history" else "оценка"
+    print(f"   💽 Место на диске: {format_size(plan.disk_bytes)} ({disk_note}: {format_size(plan.video_size_bytes)} на видео)")
+    if plan.deadline is not None and plan.fits_deadline:
+        print(f"   ✅ Укладывается в срок {time.strftime('%Y-%m-%d %H:%M', time.localtime(plan.deadline))}")
+    for warning in plan.warnings():
+        print(f"   ⚠️ {warning}")
+
+def run_compositions(args, config_data: dict):
+    """Сборка роликов --compose из клипов отчета в выходной папке, записи дописываются в отчет"""
+    import shutil
+    from turan_compose import compose_products, COMPOSITION_FOLDER
+    from turan_postprocess import PostProcessSettings
+    from turan_results import iter_results
+    from turan_media import MediaStore
+    
+    report_path = Path(args.output) / REPORT_FILENAME
+    if not report_path.exists() and (Path(args.output) / FINAL_FOLDER / REPORT_FILENAME).exists():
+        report_path = Path(args.output) / FINAL_FOLDER / REPORT_FILENAME
+    if not report_path.exists():
+        print(f"❌ Отчет генерации не найден: {report_path}")
+        sys.exit(1)
+    settings = PostProcessSettings.from_config(config_data)
+    for binary in (settings.ffmpeg, settings.ffprobe):
+        if shutil.which(binary) is None:
+            print(f"❌ Не найден {binary} (performance.postprocess)")
+            sys.exit(1)
+    
+    results = list(iter_results(str(report_path)))
+    media_store = MediaStore.from_config(config_data)
+    if media_store is not None:
+        # Вытесненные из хранилища клипы скачиваются заново по gcs_uri
+        from turan_transport import HttpTransport
+        transport = HttpTransport()
+        for result in results:
+            if result.get("status") == "success" and result.get("tier") != "preview":
+                try:
+                    media_store.ensure_local(result, transport.download)
+                except Exception as e:
+                    print(f"  ⚠️ {result.get('local_path')}: не удалось скачать ({e})")
+        media_store.close()
+    with JsonlResultWriter(str(report_path), append=True) as writer:
+        for seconds in args.compose:
+            print(f"🎞️ Сборка роликов {seconds}s из клипов по {math.ceil(seconds / 8)} шт.")
+            for record in compose_products(results, str(Path(report_path).parent), seconds, settings):
+                writer.write_record(record)
+                if record["status"] == "success":
+                    method = "без перекодирования" if record["method"] == "stream_copy" else "с перекодированием"
+                    print(f"  ✅ {record['output']} ({method})")
+                else:
+                    print(f"  ❌ {Path(record['source_image']).name}: {record['error']}")
+    print(f"📄 Сборки записаны в отчет: {report_path} (папка {COMPOSITION_FOLDER})")
+
+def run_simulation(args, config_data: dict):
+    """Симуляция пакета и рекомендации по настройкам планировщика"""
+    from turan_scheduler import SchedulerSettings
+    from turan_simulator import simulate_averaged, recommend
+    from turan_scanner import scan_images
+    
+    images = args.simulate
+    if not images:
+        input_path = Path(args.input)
+        recursive = scan_options_from_args(args, config_data)["recursive"]
+        images = sum(1 for _ in scan_images(str(input_path), IMAGE_EXTENSIONS, recursive=recursive)) if input_path.exists() else 0
+    if images <= 0:
+        print("❌ Нет изображений для симуляции (укажите --simulate N)")
+        sys.exit(1)
+    
+    settings = SchedulerSettings.from_config(config_data)
+    model = load_simulation_model(args, config_data)
+    
+    print(f"🧪 СИМУЛЯЦИЯ: {images} изображений")
+    if model.generation_times:
+        print(f"📚 История: {len(model.generation_times)} генераций")
+    else:
+        print(f"📚 История не найдена, используется модель: медиана {model.generation_median}s")
+    
+    def show(title: str, prediction: dict):
+        print(f"\n{title}")
+        if prediction['adaptive_concurrency']:
+            concurrency = (f"AIMD {prediction['concurrency_min']}..{prediction['concurrency_max']}, "
+                           f"начальное окно {prediction['max_concurrent_operations']}, "
+                           f"максимум в полете {prediction['max_in_flight']}")
+        else:
+            concurrency = str(prediction['max_concurrent_operations'])
+        print(f"   ⚙️ Параллелизм: {concurrency}, опрос: {prediction['poll_interval']:g}s")
+        print(f"   🌍 Регионы: {prediction['region_weights']}")
+        print(f"   ⏱️ Время пакета: {prediction['makespan_seconds'] / 60:.1f} мин")
+        print(f"   🚀 Пропускная способность: {prediction['videos_per_hour']:.1f} видео/час")
+        print(f"   ⌛ Задержка p50/p95: {prediction['latency_p50']:.0f}s / {prediction['latency_p95']:.0f}s")
+        print(f"   📡 Вызовы API: {prediction['total_api_calls']} {prediction['api_calls']}")
+        print(f"   🚦 Ответов 429: {prediction['throttled']}, отклонено по квоте: {prediction['rejected']}")
+    
+    if args.recommend:
+        report = recommend(images, settings, model)
+        show("📊 ТЕКУЩИЕ НАСТРОЙКИ:", report["baseline"])
+        show(f"✅ РЕКОМЕНДУЕМЫЕ НАСТРОЙКИ (проверено {report['candidates_evaluated']} вариантов):", report["recommended"])
+        if report["swept"] == "concurrency_max":
+            print("\n💡 Включен adaptive_concurrency: подобрана верхняя граница окна (veo_api.adaptive_concurrency.max), "
+                  "max_concurrent_operations задает только начальное окно")
+    else:
+        show("📊 ПРОГНОЗ:", simulate_averaged(images, settings, model).to_dict())
+
 def show_showcase_scenarios(generator: SimpleTuranGenerator):
     """Показать все доступные сценарии показа столиков"""
     print("🎥 Доступные кинематографические сценарии показа TURAN Lux:")
@@ -182,8 +446,39 @@ def main():
   python run_simple_turan.py --single-image images/dressing_tables/столик.jpg \\
     -o output/ab_test --ab-test
 
+  # Кампания: у каждой строки манифеста свои изображение, промпт и настройки
+  python run_simple_turan.py --campaign campaigns/spring.csv -o output/spring
+
+  # Превью 720p без звука для нескольких сценариев, затем финал 1080p для одобренных
+  python run_simple_turan.py -i images/dressing_tables -o output/tiered --preview
+  python run_simple_turan.py -o output/tiered --promote output/tiered/previews/approved.txt
+
+  # Ролики 15 и 30 секунд из готовых 8-секундных клипов (склейка без перекодирования)
+  python run_simple_turan.py -o output/videos --compose 15 30
+
+  # Наблюдение за папкой: новые фото получают видео через минуты после загрузки
+  python run_simple_turan.py -i /mnt/uploads -o output/videos --watch
+
+  # Демон: задания через HTTP API и spool папку
+  python run_simple_turan.py --daemon -o output/daemon --spool spool/
+  curl -X POST localhost:8765/jobs -d '{"image_path": "images/dressing_tables/a.jpg", "config": {"aspect_ratio": "9:16"}}'
+
+  # Несколько машин: общая очередь с арендой заданий
+  python run_simple_turan.py -i /mnt/catalog -o /mnt/videos --queue redis://queue-host:6379/0 --enqueue
+  python run_simple_turan.py -o /mnt/videos --queue redis://queue-host:6379/0 --worker
+
+  # План пакета с проверкой срока
+  python run_simple_turan.py -i images/dressing_tables --dry-run --deadline 18:00
+
+  # Прогноз времени пакета и подбор параллелизма без вызовов API
+  python run_simple_turan.py -i images/dressing_tables --simulate --recommend
+
   # Быстрое превью с улучшениями
   python run_simple_turan.py -i images/dressing_tables -o output/preview --hd --enhanced
+
+  # Запись реального запуска и воспроизведение без сети в 10 раз быстрее
+  python run_simple_turan.py -i images/dressing_tables -o output/videos --record cassettes/run1
+  python run_simple_turan.py -i images/dressing_tables -o output/replay --replay cassettes/run1 --replay-speed 0.1
         """
     )
     
@@ -271,32 +566,174 @@ def main():
     parser.add_argument('--verbose', '-v', action='store_true',
                        help='Подробный вывод')
     
+    # Симуляция и подбор настроек
+    parser.add_argument('--simulate', type=int, nargs='?', const=0, metavar='N',
+                       help='Симулировать пакет из N изображений (по умолчанию - из входной папки) без вызовов API')
+    
+    parser.add_argument('--recommend', action='store_true',
+                       help='Вместе с --simulate: подобрать параллелизм, интервал опроса и веса регионов')
+    
+    parser.add_argument('--history', nargs='+', metavar='REPORT',
+                       help='JSON отчеты прошлых запусков для распределения времени генерации')
+    
+    parser.add_argument('--keep-duplicates', action='store_true',
+                       help='Генерировать все изображения, даже почти одинаковые')
+    
+    parser.add_argument('--reprocess', action='store_true',
+                       help='Обработать все изображения папки, включая уже готовые по манифесту')
+    
+    parser.add_argument('--full-rescan', action='store_true',
+                       help='Перечитать все папки каталога, даже с неизмененным mtime (файлы, перезаписанные на месте)')
+    
+    parser.add_argument('--campaign', metavar='FILE',
+                       help='Манифест кампании (JSONL/CSV/YAML): изображение и переопределения настроек в каждой строке')
+    
+    parser.add_argument('--preview', action='store_true',
+                       help='Первый уровень: превью 720p без звука для сценариев-кандидатов (секция tiered)')
+    
+    parser.add_argument('--promote', nargs='?', const='', metavar='APPROVAL_FILE',
+                       help='Второй уровень: финальные 1080p видео для одобренных превью (файл одобрения или tiered.scoring_hook)')
+    
+    parser.add_argument('--compose', type=int, nargs='+', metavar='SEC',
+                       help='Собрать ролики SEC секунд (15, 30) из клипов разных сценариев каждого товара в отчете -o')
+    
+    parser.add_argument('--watch', action='store_true',
+                       help='Не завершаться: обрабатывать новые изображения входной папки по мере появления (до Ctrl-C)')
+    
+    parser.add_argument('--skip-preflight', action='store_true',
+                       help='Не проверять изображения перед отправкой (формат, размер, ориентация)')
+    
+    parser.add_argument('--shutdown-mode', choices=['drain', 'abort'],
+                       help='Поведение при Ctrl-C/SIGTERM: drain - доработать начатые операции, abort - отменить их')
+    
+    parser.add_argument('--drain-timeout', type=float, metavar='SEC',
+                       help='Срок доработки в режиме drain, затем отмена оставшихся операций')
+    
+    parser.add_argument('--deadline', metavar='TIME',
+                       help='Срок для --dry-run: 18:30, "2025-01-31 18:30" или длительность 2h30m')
+    
+    # Запись и воспроизведение обменов с API
+    parser.add_argument('--record', metavar='DIR',
+                       help='Записать обмены с Vertex AI и GCS в кассету (секреты удаляются)')
+    
+    parser.add_argument('--replay', metavar='DIR',
+                       help='Воспроизвести кассету без сети и аутентификации')
+    
+    parser.add_argument('--replay-speed', type=float, default=1.0,
+                       help='Масштаб записанных задержек при воспроизведении (0 - без задержек)')
+    
+    # Резидентный режим
+    parser.add_argument('--daemon', action='store_true',
+                       help='Запустить демон: прием заданий через локальный HTTP API и spool папку')
+    
+    parser.add_argument('--daemon-port', type=int, default=8765,
+                       help='Порт HTTP API демона на 127.0.0.1')
+    
+    parser.add_argument('--daemon-socket', metavar='PATH',
+                       help='Unix socket для HTTP API демона вместо TCP порта')
+    
+    parser.add_argument('--spool', metavar='DIR',
+                       help='Папка, из которой демон забирает *.json задания')
+    
+    # Распределенная обработка
+    parser.add_argument('--queue', metavar='URL',
+                       help='Общая очередь заданий: sqlite:///path/queue.db или redis://host:6379/0')
+    
+    parser.add_argument('--enqueue', action='store_true',
+                       help='Добавить изображения входной папки в очередь --queue')
+    
+    parser.add_argument('--worker', action='store_true',
+                       help='Работать воркером очереди --queue до ее опустошения')
+    
+    parser.add_argument('--worker-id',
+                       help='Идентификатор воркера (по умолчанию hostname + случайный суффикс)')
+    
+    parser.add_argument('--lease-ttl', type=float, default=120.0,
+                       help='Длительность аренды задания в секундах (продлевается heartbeat)')
+    
+    parser.add_argument('--queue-status', action='store_true',
+                       help='Показать состояние очереди --queue')
+    
     args = parser.parse_args()
     
+    if args.campaign:
+        if not Path(args.campaign).is_file():
+            parser.error(f"манифест кампании не найден: {args.campaign}")
+        if Path(args.campaign).suffix.lower() not in CAMPAIGN_FORMATS:
+            parser.error(f"формат манифеста кампании: {', '.join(CAMPAIGN_FORMATS)}")
+    
     # Информационные команды (выполняются без инициализации генератора)
     if args.compare_prompts:
         show_enhancement_comparison()
         return
     
-    # Инициализация генератора
-    try:
-        generator = SimpleTuranGenerator()
-    except Exception as e:
-        if not args.show_scenarios:
-            print(f"❌ Ошибка инициализации: {e}")
-            sys.exit(1)
-        else:
-            print(f"⚠️ Ошибка инициализации, но показываем локальную информацию")
-            generator = None
+    if args.simulate is not None:
+        run_simulation(args, load_config(args.config))
+        return
     
-    # Информационные команды
+    # Операции с очередью, не требующие генератора
+    if args.queue and (args.enqueue or args.queue_status):
+        from turan_workqueue import open_work_queue, job_id_for_image
+        from turan_scanner import scan_images
+        work_queue = open_work_queue(args.queue)
+        
+        if args.enqueue:
+            input_path = Path(args.input)
+            recursive = scan_options_from_args(args, load_config(args.config))["recursive"]
+            images = sorted(Path(entry.path) for entry in scan_images(str(input_path), IMAGE_EXTENSIONS, recursive=recursive))
+            added = 0
+            for image in images:
+                # Подпапки SKU повторяются в выходной папке, как при обработке папки
+                output_folder = Path(args.output) / image.parent.relative_to(input_path)
+                payload = {"image_path": str(image.resolve()), "output_folder": str(output_folder.resolve())}
+                if args.custom_prompt:
+                    payload["custom_prompt"] = args.custom_prompt
+                if args.storage_uri:
+                    payload["storage_uri"] = args.storage_uri
+                added += work_queue.enqueue(job_id_for_image(str(image), str(input_path)), payload)
+            print(f"📥 Добавлено в очередь: {added} (уже были: {len(images) - added})")
+        
+        print(f"📊 Очередь: {work_queue.counts()}")
+        return
+    
+    # Сценарии - локальная информация, аутентификация и сеть не нужны
     if args.show_scenarios:
-        if generator:
-            show_showcase_scenarios(generator)
+        show_showcase_scenarios(SimpleTuranGenerator())
         return
     
-    # Загрузка конфигурации
+    # Загрузка конфигурации и фонового логирования
     config_data = load_config(args.config)
+    logging_config = dict(config_data.get('logging') or {})
+    if args.verbose:
+        logging_config['level'] = 'DEBUG'
+    setup_logging(logging_config)
+    
+    # Сборка длинных роликов из готовых клипов (сеть и генератор не нужны)
+    if args.compose:
+        run_compositions(args, config_data)
+        return
+    
+    # Инициализация генератора (аутентификация откладывается до первого запроса)
+    try:
+        generator = SimpleTuranGenerator(transport=create_transport_from_args(args))
+    except Exception as e:
+        print(f"❌ Ошибка инициализации: {e}")
+        sys.exit(1)
+    
+    # История времени и успешности копится между запусками (кроме воспроизведения кассет)
+    if not args.dry_run and not args.replay:
+        from turan_analytics import AnalyticsStore
+        generator.analytics = AnalyticsStore.from_config(config_data)
+        # Миниатюры и экспорт форматов по мере скачивания видео (нужен ffmpeg)
+        from turan_postprocess import PostProcessor
+        generator.postprocessor = PostProcessor.from_config(config_data)
+        # Видео хранятся один раз, в выходные папки - жесткими ссылками (storage.media_cache)
+        from turan_media import MediaStore
+        generator.media_store = MediaStore.from_config(config_data)
+    # Панель прогресса пакета (monitoring.enable_progress_bar), в подробном режиме - обычный вывод
+    if not args.verbose:
+        from turan_progress import ProgressDashboard
+        generator.progress = ProgressDashboard.from_config(config_data)
     
     print("🪞 TURAN Enhanced Dressing Table Generator")
     print("Кинематографический показ столиков + Готовая русская озвучка")
@@ -317,11 +754,6 @@ def main():
             print(f"💡 Освещение: {args.lighting_mood or 'golden_hour'}")
         print("-" * 65)
     
-    # Проверка инициализации генератора
-    if not generator:
-        print("❌ Генератор не инициализирован")
-        sys.exit(1)
-    
     print("✅ Улучшенный генератор показа туалетных столиков готов")
     
     # Создание конфигурации
@@ -360,16 +792,31 @@ def main():
                 print("🎬 Промпт будет автоматически улучшен до кинематографического уровня!")
             else:
                 scenarios = generator.get_all_scenarios()
-                import random
-                example_scenario = random.choice(scenarios)
+                example_scenario = generator.rng.choice(scenarios)
                 print(f"🎥 Пример сценария: {example_scenario['id']}")
                 print(f"🎬 Стиль: {example_scenario.get('cinematic_style', 'Standard')}")
                 print(f"🔊 Озвучка: {example_scenario['russian_voiceover']}")
             print(f"📸 Столик останется точно как на фото{enhancement_note}")
+            plan_images = [args.single_image]
+        elif args.campaign:
+            rows = list(iter_campaign(args.campaign))
+            invalid = [row for row in rows if row.error]
+            print(f"📋 Строк в манифесте кампании: {len(rows)}")
+            for row in rows[:3]:
+                overrides = ", ".join(f"{key}={value}" for key, value in row.overrides.items()) or "базовые настройки"
+                print(f"  - {row.job_id}: {Path(row.image_path).name} ({overrides})")
+            if len(rows) > 3:
+                print(f"  ... и еще {len(rows) - 3}")
+            for row in invalid:
+                print(f"  ⚠️ строка {row.number}: {row.error}")
+            plan_images = [row.image_path for row in rows if not row.error]
         else:
+            plan_images = []
             input_path = Path(args.input)
             if input_path.exists():
-                images = list(input_path.glob("*.jpg")) + list(input_path.glob("*.png")) + list(input_path.glob("*.jpeg"))
+                from turan_scanner import scan_images
+                scan = scan_options_from_args(args, config_data)
+                images = [Path(entry.path) for entry in scan_images(str(input_path), recursive=scan["recursive"])]
                 print(f"📷 Найдено изображений туалетных столиков: {len(images)}")
                 for img in images[:3]:
                     print(f"  - {img.name}")
@@ -379,9 +826,20 @@ def main():
                 scenarios = generator.get_all_scenarios()
                 print(f"🎥 Каждое изображение получит случайный сценарий из {len(scenarios)} кинематографических")
                 print(f"🎬 Сценарии включают профессиональные камеры, освещение и движения{enhancement_note}")
+                
+                plan_images = [str(img) for img in images]
+                if args.batch_social_media:
+                    # Каждое изображение генерируется для двух платформ
+                    plan_images = plan_images * 2
             else:
                 print(f"❌ Папка {args.input} не найдена")
         
+        if plan_images and not args.single_image and not args.batch_social_media and not args.campaign:
+            plan_images = show_preflight_report(args, config_data, config, plan_images)
+        
+        if plan_images:
+            show_batch_plan(args, config_data, config, plan_images)
+        
         print(f"💾 Результаты будут сохранены в: {args.output}")
         print(f"📄 JSON отчеты: enhanced_showcase_scenarios.json")
         if args.storage_uri:
@@ -390,9 +848,62 @@ def main():
         print("\n▶️ Для выполнения уберите флаг --dry-run")
         return
     
+    # Ранняя проверка аутентификации перед реальной генерацией
+    try:
+        generator.authenticate()
+    except Exception as e:
+        print(f"❌ Ошибка инициализации: {e}")
+        sys.exit(1)
+    
     # Создание выходной папки
     Path(args.output).mkdir(parents=True, exist_ok=True)
     
+    # Воркер распределенной очереди
+    if args.worker:
+        if not args.queue:
+            print("❌ Для --worker укажите --queue")
+            sys.exit(1)
+        from turan_workqueue import open_work_queue, DistributedWorker
+        
+        worker = DistributedWorker(
+            generator,
+            open_work_queue(args.queue),
+            config,
+            scheduler_settings_from_args(args, config_data, generator.location),
+            worker_id=args.worker_id,
+            lease_ttl=args.lease_ttl,
+            output_folder=args.output,
+            max_attempts=config_data.get('veo_api', {}).get('retry_attempts', 3)
+        )
+        stats = worker.run()
+        print(f"✅ Воркер завершен: выполнено {stats['completed']}, ошибок {stats['failed']}, потеряно аренд {stats['lost_leases']}")
+        return
+    
+    # Резидентный режим: генератор, сессии и токены остаются прогретыми
+    if args.daemon:
+        import signal
+        from turan_daemon import JobService, create_server, serve
+        
+        def raise_interrupt(signum, frame):
+            raise KeyboardInterrupt
+        signal.signal(signal.SIGTERM, raise_interrupt)
+        
+        service = JobService(
+            generator,
+            config,
+            scheduler_settings_from_args(args, config_data, generator.location),
+            output_folder=args.output,
+            storage_uri=args.storage_uri
+        )
+        server = create_server(service, port=args.daemon_port, socket_path=args.daemon_socket)
+        print("🛰️ Демон запущен. POST /jobs, GET /jobs/<id>, GET /health")
+        serve(service, server, spool_dir=args.spool)
+        print("⏹️ Демон остановлен")
+        return
+    
+    # Конвейер стадий (multiprocessing) нужен только для генерации
+    from turan_pipeline import PipelineSettings
+    
     try:
         # A/B тестирование
         if args.ab_test and args.single_image:
@@ -458,22 +969,31 @@ def main():
                 print(f"🎬 Стиль: {social_configs[i].cinematic_style.value}")
                 print(f"💡 Освещение: {social_configs[i].lighting_mood.value}")
                 
-                results = generator.process_image_folder(
+                summary = ResultSummary()
+                shown_scenarios = []
+                for result in generator.iter_process_image_folder(
                     args.input,
                     str(platform_output),
                     social_configs[i],
-                    storage_uri=args.storage_uri
-                )
+                    storage_uri=args.storage_uri,
+                    scheduler_settings=scheduler_settings_from_args(args, config_data, generator.location),
+                    pipeline_settings=PipelineSettings.from_config(config_data),
+                    **dedup_options_from_args(args, config_data),
+                    **preflight_options_from_args(args, config_data),
+                    **scan_options_from_args(args, config_data)
+                ):
+                    summary.add(result)
+                    if result.get("status") == "success" and len(shown_scenarios) < 3:
+                        shown_scenarios.append(result["scenario_id"])
                 
-                successful = sum(1 for r in results if r.get("status") == "success")
-                print(f"✅ {platform}: {successful}/{len(results)} успешно")
+                print(f"✅ {platform}: {summary.successful}/{summary.total} успешно")
                 
                 # Показать использованные сценарии
-                if args.verbose and successful > 0:
+                if args.verbose and summary.successful > 0:
                     print("🎥 Использованные кинематографические сценарии:")
-                    for result in results[:3]:  # Показать первые 3
-                        if result.get("status") == "success" and "scenario" in result:
-                            scenario = result["scenario"]
+                    for scenario_id in shown_scenarios:  # Показать первые 3
+                        scenario = generator.used_scenario(scenario_id)
+                        if scenario:
                             print(f"  • {scenario['id']}: {scenario['russian_voiceover'][:60]}...")
                             print(f"    Стиль: {scenario.get('cinematic_style', 'Standard')}")
         
@@ -515,38 +1035,126 @@ def main():
                         
                         print(f"💾 Сохранено: {output_path}")
         
-        # Обработка папки с изображениями
+        # Обработка папки с изображениями или манифеста кампании
         else:
-            print(f"📁 Обработка папки с туалетными столиками: {args.input}")
+            if args.campaign:
+                print(f"📋 Кампания из манифеста: {args.campaign}")
+            elif args.preview:
+                print(f"🎞️ Превью 720p без звука: {args.input}")
+            elif args.promote is not None:
+                print(f"⬆️ Финальные видео для одобренных превью: {Path(args.output) / PREVIEW_FOLDER}")
+            else:
+                print(f"📁 Обработка папки с туалетными столиками: {args.input}")
             enhancement_note = " с кинематографическими улучшениями" if config.use_enhanced_prompts else ""
             print(f"🎬 Режим{enhancement_note}")
             
-            results = generator.process_image_folder(
-                args.input,
-                args.output,
-                config,
-                storage_uri=args.storage_uri
-            )
-            
-            # Сохранение подробного отчета
-            report_path = Path(args.output) / "enhanced_showcase_generation_report.json"
-            with open(report_path, 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
+            # Подробный отчет пишется построчно по мере готовности результатов
+            report_path = Path(args.output) / REPORT_FILENAME
+            summary = ResultSummary()
+            tier_settings = TierSettings.from_config(config_data)
+            if args.preview:
+                report_path = Path(args.output) / PREVIEW_FOLDER / PREVIEW_REPORT
+                results = generator.iter_generate_previews(
+                    args.input,
+                    args.output,
+                    config,
+                    tier_settings=tier_settings,
+                    storage_uri=args.storage_uri,
+                    scheduler_settings=scheduler_settings_from_args(args, config_data, generator.location),
+                    pipeline_settings=PipelineSettings.from_config(config_data),
+                    recursive=scan_options_from_args(args, config_data)["recursive"],
+                    **preflight_options_from_args(args, config_data)
+                )
+            elif args.promote is not None:
+                report_path = Path(args.output) / FINAL_FOLDER / REPORT_FILENAME
+                results = generator.iter_promote_previews(
+                    args.output,
+                    config,
+                    tier_settings=tier_settings,
+                    approval_file=args.promote or None,
+                    storage_uri=args.storage_uri,
+                    scheduler_settings=scheduler_settings_from_args(args, config_data, generator.location),
+                    pipeline_settings=PipelineSettings.from_config(config_data)
+                )
+            elif args.campaign:
+                results = generator.iter_process_campaign(
+                    args.campaign,
+                    args.output,
+                    config,
+                    storage_uri=args.storage_uri,
+                    scheduler_settings=scheduler_settings_from_args(args, config_data, generator.location),
+                    pipeline_settings=PipelineSettings.from_config(config_data),
+                    **preflight_options_from_args(args, config_data)
+                )
+            elif args.watch:
+                print(f"👀 Наблюдение за {args.input}: новые изображения обрабатываются по мере появления (Ctrl-C - остановка)")
+                results = generator.iter_watch_image_folder(
+                    args.input,
+                    args.output,
+                    config,
+                    storage_uri=args.storage_uri,
+                    scheduler_settings=scheduler_settings_from_args(args, config_data, generator.location),
+                    pipeline_settings=PipelineSettings.from_config(config_data),
+                    **preflight_options_from_args(args, config_data),
+                    **watch_options_from_args(args, config_data)
+                )
+            else:
+                results = generator.iter_process_image_folder(
+                    args.input,
+                    args.output,
+                    config,
+                    storage_uri=args.storage_uri,
+                    scheduler_settings=scheduler_settings_from_args(args, config_data, generator.location),
+                    pipeline_settings=PipelineSettings.from_config(config_data),
+                    **dedup_options_from_args(args, config_data),
+                    **preflight_options_from_args(args, config_data),
+                    **scan_options_from_args(args, config_data)
+                )
+            # В режиме наблюдения отчет дописывается: перезапуск не теряет прошлые результаты
+            show = generator.progress.message if generator.progress is not None else print
+            try:
+                with JsonlResultWriter(str(report_path), scenario_lookup=generator.used_scenario, append=args.watch) as writer:
+                    for result in results:
+                        writer.write(result)
+                        summary.add(result)
+                        if args.verbose or args.watch:
+                            show(f"  {'✅' if result.get('status') == 'success' else '⚠️'} {Path(result.get('source_image', '')).name}: {result.get('status')}")
+            finally:
+                if generator.progress is not None:
+                    generator.progress.close()
             
             # Экспорт аналитики если запрошено
             if args.export_analytics:
                 generator.export_performance_report()
             
             # Статистика
-            successful = sum(1 for r in results if r.get("status") == "success")
-            failed = len(results) - successful
+            successful = summary.successful
+            interrupted = summary.interrupted
+            duplicates = summary.duplicates
+            rejected = summary.rejected
+            failed = summary.failed
             
-            print(f"\n🎉 КИНЕМАТОГРАФИЧЕСКАЯ ГЕНЕРАЦИЯ ВИДЕО ЗАВЕРШЕНА!")
+            if interrupted:
+                print(f"\n⏹️ ГЕНЕРАЦИЯ ОСТАНОВЛЕНА, частичные результаты сохранены")
+                print(f"⏭️ Не выполнено (пропущено/отменено): {interrupted}")
+            else:
+                print(f"\n🎉 КИНЕМАТОГРАФИЧЕСКАЯ ГЕНЕРАЦИЯ ВИДЕО ЗАВЕРШЕНА!")
             print(f"✅ Успешно: {successful}")
             print(f"❌ Ошибки: {failed}")
-            print(f"📊 Всего: {len(results)}")
+            if duplicates:
+                print(f"👯 Пропущено почти одинаковых: {duplicates} (--keep-duplicates для генерации всех)")
+            if rejected:
+                print(f"🚫 Отклонено проверкой: {rejected} (причины в отчете)")
+            print(f"📊 Всего: {summary.total}")
             print(f"📄 Отчет: {report_path}")
+            if args.preview:
+                approval_path = Path(args.output) / PREVIEW_FOLDER / tier_settings.approval_file
+                print(f"👍 Впишите одобренные превью (имена файлов или job_id) в {approval_path} и запустите --promote")
             print(f"🎥 Сценарии: generated_showcase_scenarios.json")
+            if generator.media_store is not None:
+                media = generator.media_store.summary()
+                print(f"💾 Хранилище видео: {media['objects']} шт., {media['bytes'] / 1024 ** 2:.1f} МБ "
+                      f"(повторных скачиваний избежано: {media['hits']}, вытеснено: {media['evicted']})")
             
             # Показать статистику улучшений
             if args.verbose:
@@ -555,23 +1163,16 @@ def main():
                 print(f"   🎬 Улучшенных промптов: {analytics['enhancement_usage_percentage']:.1f}%")
                 print(f"   📝 Традиционных промптов: {analytics['traditional_usage_percentage']:.1f}%")
                 
-                scenario_usage = {}
-                for result in results:
-                    if result.get("status") == "success" and "scenario" in result:
-                        scenario_id = result["scenario"]["id"]
-                        scenario_style = result.get("cinematic_style", "Standard")
-                        key = f"{scenario_id} ({scenario_style})"
-                        scenario_usage[key] = scenario_usage.get(key, 0) + 1
-                
                 print(f"\n🎥 Использованные кинематографические сценарии:")
-                for scenario_key, count in sorted(scenario_usage.items())[:5]:
+                for scenario_key, count in sorted(summary.scenario_usage.items())[:5]:
                     print(f"  • {scenario_key}: {count} раз")
             
             if failed > 0:
                 print(f"\n❌ Изображения с ошибками:")
-                for result in results:
-                    if result.get("status") == "error":
-                        print(f"  - {result['source_image']}: {result.get('error', 'Unknown error')}")
+                for source_image, error in summary.errors:
+                    print(f"  - {source_image}: {error}")
+                if failed > len(summary.errors):
+                    print(f"  ... и еще {failed - len(summary.errors)} (см. {report_path})")
     
     except KeyboardInterrupt:
         print("\n⏹️ Операция прервана пользователем")
@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+import stat
+
+import pytest
+
+# Модули проекта лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FAKE_FFMPEG = """
+import json, os, sys
+with open({calls!r}, "a") as log:
+    log.write(json.dumps(sys.argv[1:]) + "\\n")
+output = sys.argv[-1]
+if os.environ.get("FAKE_FFMPEG_FAIL") and os.environ["FAKE_FFMPEG_FAIL"] in output:
+    sys.stderr.write("fake ffmpeg: conversion failed\\n")
+    sys.exit(1)
+with open(output, "wb") as f:
+    f.write(b"media")
+"""
+
+FAKE_FFPROBE = """
+import json, sys
+path = sys.argv[-1]
+width, height = (1080, 1920) if "vertical" in path else (1920, 1080)
+streams = [{"codec_type": "video", "codec_name": "h264", "profile": "High", "width": width, "height": height,
+            "pix_fmt": "yuv420p", "r_frame_rate": "24/1", "time_base": "1/12288"}]
+if "silent" not in path:
+    streams.append({"codec_type": "audio", "codec_name": "aac", "profile": "LC", "sample_rate": "48000",
+                    "channels": 2, "channel_layout": "stereo"})
+print(json.dumps({"streams": streams}))
+"""
+
+
+class FakeFFmpeg:
+    """Исполняемые заглушки ffmpeg/ffprobe: ffmpeg пишет выходной файл и журнал вызовов"""
+
+    def __init__(self, folder):
+        self.calls_path = str(folder / "ffmpeg_calls.jsonl")
+        self.ffmpeg = self._script(folder / "ffmpeg", FAKE_FFMPEG.format(calls=self.calls_path))
+        self.ffprobe = self._script(folder / "ffprobe", FAKE_FFPROBE)
+
+    @staticmethod
+    def _script(path, body):
+        path.write_text(f"#!{sys.executable}\n{body}")
+        path.chmod(path.stat().st_mode | stat.S_IEXEC)
+        return str(path)
+
+    @property
+    def calls(self):
+        if not os.path.exists(self.calls_path):
+            return []
+        with open(self.calls_path) as log:
+            return [json.loads(line) for line in log]
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    folder = tmp_path / "bin"
+    folder.mkdir()
+    return FakeFFmpeg(folder)
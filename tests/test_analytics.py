@@ -0,0 +1,24 @@
+"""Сводки аналитики по сценарию, а не по конфигурации по умолчанию"""
+
+from types import SimpleNamespace
+
+from turan_analytics import AnalyticsStore
+from turan_scheduler import GenerationJob
+
+
+def record(store, scenario, config):
+    job = GenerationJob(job_id="a.jpg", image_path="a.jpg", config=config)
+    job.scenario = scenario
+    job.submitted_at, job.completed_at = 0.0, 60.0
+    store.record_job(job, [{"status": "success"}])
+
+
+def test_style_and_mood_come_from_scenario(tmp_path):
+    store = AnalyticsStore(str(tmp_path / "analytics.db"))
+    config = SimpleNamespace(cinematic_style="commercial", lighting_mood="golden_hour")
+    record(store, {"id": "morning", "cinematic_style": "lifestyle", "lighting_mood": "soft_morning"}, config)
+    record(store, {"id": "custom"}, config)
+
+    rows = store._conn.execute("SELECT scenario_id, cinematic_style, lighting_mood FROM jobs ORDER BY scenario_id").fetchall()
+    assert rows == [("custom", "commercial", "golden_hour"), ("morning", "lifestyle", "soft_morning")]
+    store.close()
@@ -0,0 +1,83 @@
+"""Манифест кампании: разбор JSONL, CSV и YAML, ошибки отдельных строк"""
+
+import json
+import os
+
+import pytest
+
+from turan_campaign import iter_campaign
+
+
+def rows_of(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return list(iter_campaign(str(path)))
+
+
+def test_jsonl_rows_and_errors(tmp_path):
+    lines = [
+        json.dumps({"image": "a.jpg", "job_id": "a", "resolution": "720p", "config": {"seed": 7}}),
+        "# комментарий",
+        "{не json",
+        json.dumps(["a.jpg"]),
+        json.dumps({"job_id": "no-image"}),
+        json.dumps({"image": "b.jpg", "job_id": "a"})
+    ]
+    rows = rows_of(tmp_path, "c.jsonl", "\n".join(lines) + "\n")
+
+    assert [row.number for row in rows] == [1, 3, 4, 5, 6]
+    first = rows[0]
+    assert first.error is None
+    assert first.image_path == os.path.join(str(tmp_path), "a.jpg")
+    assert first.overrides == {"seed": 7, "resolution": "720p"}
+    assert [row.error is not None for row in rows] == [False, True, True, True, True]
+    assert "Повторяющийся job_id" in rows[-1].error
+
+
+def test_csv_cells_and_config_column(tmp_path):
+    text = (
+        "image,job_id,seed,generate_audio,custom_prompt,config\n"
+        "a.jpg,a,42,false,007 крупный план,\n"
+        'b.jpg,b,,,,"{""resolution"": ""720p""}"\n'
+        "c.jpg,c,,,,not json\n"
+        "d.jpg,d,,,,[1]\n"
+    )
+    rows = rows_of(tmp_path, "c.csv", text)
+
+    assert [row.number for row in rows] == [2, 3, 4, 5]
+    assert rows[0].overrides == {"seed": 42, "generate_audio": False}
+    # Поля строки остаются строками, даже если похожи на числа
+    assert rows[0].custom_prompt == "007 крупный план"
+    assert rows[1].error is None and rows[1].overrides == {"resolution": "720p"}
+    # Некорректный config отклоняет только свою строку
+    assert "JSON" in rows[2].error
+    assert rows[3].error == "config должен быть объектом"
+
+
+def test_yaml_defaults_and_string_config(tmp_path):
+    text = (
+        "defaults:\n"
+        "  resolution: 720p\n"
+        "  output_folder: campaign\n"
+        "rows:\n"
+        "  - image: a.jpg\n"
+        "    resolution: 1080p\n"
+        "  - image: b.jpg\n"
+        "    config: '{\"seed\": 3}'\n"
+        "  - image: c.jpg\n"
+        "    config: seed=3\n"
+        "  - just a string\n"
+    )
+    rows = rows_of(tmp_path, "c.yaml", text)
+
+    assert rows[0].overrides == {"resolution": "1080p"}
+    assert rows[0].output_folder == "campaign"
+    assert rows[1].error is None and rows[1].overrides == {"seed": 3, "resolution": "720p"}
+    assert rows[2].error is not None
+    assert rows[3].error == "Строка должна быть объектом"
+    assert [row.job_id for row in rows] == ["row-1", "row-2", "row-3", "row-4"]
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        rows_of(tmp_path, "c.txt", "")
@@ -0,0 +1,68 @@
+"""Сборка роликов: выбор клипов товара и склейка без перекодирования"""
+
+from turan_compose import compose_clips, compose_products, plan_compositions
+from turan_postprocess import PostProcessSettings
+
+
+def clip(folder, name, image, scenario, **extra):
+    path = folder / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"clip")
+    return {"status": "success", "source_image": image, "scenario_id": scenario, "local_path": str(path), **extra}
+
+
+def test_plan_takes_distinct_scenarios_per_product(tmp_path):
+    results = [
+        clip(tmp_path, "a1.mp4", "a.jpg", "reveal"),
+        clip(tmp_path, "a2.mp4", "a.jpg", "reveal"),
+        clip(tmp_path, "a3.mp4", "a.jpg", "detail", tier="preview"),
+        clip(tmp_path, "a4.mp4", "a.jpg", "evening"),
+        clip(tmp_path, "b1.mp4", "b.jpg", "reveal"),
+        {"status": "error", "source_image": "c.jpg", "scenario_id": "reveal"}
+    ]
+
+    ready, missing = plan_compositions(results, 15)
+
+    assert [item["local_path"] for item in ready["a.jpg"]] == [str(tmp_path / "a1.mp4"), str(tmp_path / "a4.mp4")]
+    assert missing == {"b.jpg": 1}
+
+
+def test_matching_clips_joined_by_stream_copy(tmp_path, fake_ffmpeg):
+    settings = PostProcessSettings(ffmpeg=fake_ffmpeg.ffmpeg, ffprobe=fake_ffmpeg.ffprobe)
+    paths = [clip(tmp_path, name, "a.jpg", name)["local_path"] for name in ("a1.mp4", "a2.mp4")]
+
+    record = compose_clips(paths, str(tmp_path / "out" / "a_15s.mp4"), 15, settings)
+
+    assert record["method"] == "stream_copy" and record["duration_seconds"] == 15
+    [args] = fake_ffmpeg.calls
+    assert args[args.index("-c") + 1] == "copy" and args[args.index("-t") + 1] == "15"
+    assert (tmp_path / "out" / "a_15s.mp4").exists()
+
+
+def test_mismatched_clips_reencoded_once(tmp_path, fake_ffmpeg):
+    settings = PostProcessSettings(ffmpeg=fake_ffmpeg.ffmpeg, ffprobe=fake_ffmpeg.ffprobe)
+    paths = [clip(tmp_path, name, "a.jpg", name)["local_path"] for name in ("a1.mp4", "a2_vertical_silent.mp4")]
+
+    record = compose_clips(paths, str(tmp_path / "a_15s.mp4"), 15, settings)
+
+    assert record["method"] == "reencode"
+    [args] = fake_ffmpeg.calls
+    filters = args[args.index("-filter_complex") + 1]
+    # Кадр приводится к размеру первого клипа, звук есть не во всех клипах
+    assert "scale=1920:1080" in filters and "a=0" in filters
+
+
+def test_products_keep_sku_folders(tmp_path, fake_ffmpeg):
+    settings = PostProcessSettings(ffmpeg=fake_ffmpeg.ffmpeg, ffprobe=fake_ffmpeg.ffprobe)
+    output = tmp_path / "out"
+    results = [
+        clip(output / sku, f"{scenario}.mp4", f"in/{sku}/front.jpg", scenario)
+        for sku in ("sku1", "sku2") for scenario in ("reveal", "detail")
+    ]
+
+    records = list(compose_products(results, str(output), 15, settings))
+
+    assert [record["status"] for record in records] == ["success", "success"]
+    assert sorted(record["output"] for record in records) == [
+        str(output / "compositions" / sku / "front_15s.mp4") for sku in ("sku1", "sku2")
+    ]
@@ -0,0 +1,141 @@
+"""Прием заданий демона: HTTP API, spool папка и итоговые статусы"""
+
+import json
+import threading
+import http.client
+from dataclasses import dataclass, replace
+
+import pytest
+
+from turan_daemon import JobService, SpoolWatcher, create_server
+from turan_scheduler import OperationScheduler, SchedulerSettings, VirtualClock
+
+
+@dataclass
+class StubConfig:
+    resolution: str = "1080p"
+
+    def with_overrides(self, overrides=None):
+        return replace(self, **overrides) if overrides else self
+
+
+class StubGenerator:
+    def create_scheduler(self, settings=None):
+        return OperationScheduler(backend=None, settings=settings or SchedulerSettings(), clock=VirtualClock(), verbose=False)
+
+    def used_scenario(self, scenario_id):
+        return None
+
+
+@pytest.fixture
+def service(tmp_path):
+    return JobService(StubGenerator(), StubConfig(), output_folder=str(tmp_path / "out"))
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "a.jpg"
+    path.write_bytes(b"jpg")
+    return str(path)
+
+
+def test_submit_rejects_non_object(service):
+    for spec in ([], "x", 1):
+        with pytest.raises(ValueError):
+            service.submit(spec)
+
+
+def test_shutdown_events_settle_job_status(service, image):
+    job_id = service.submit({"image_path": image})
+    job = service.inbox.get_nowait()
+    service.scheduler.skip(job)
+    assert service.status(job_id)["status"] == "skipped"
+    assert service.status(job_id)["results"][0]["status"] == "skipped"
+
+
+def test_spool_waits_for_complete_file_and_survives_bad_specs(service, image, tmp_path):
+    spool = tmp_path / "spool"
+    watcher = SpoolWatcher(service, str(spool), settle_seconds=2.0)
+    (spool / "list.json").write_text("[]")
+    (spool / "good.json").write_text(json.dumps({"image_path": image}))
+
+    # Новые файлы только отмечаются: запись могла еще не завершиться
+    assert watcher.scan_once(now=0.0) == 0
+    assert watcher.scan_once(now=1.0) == 0
+    assert watcher.scan_once(now=3.5) == 1
+
+    assert (spool / "rejected" / "list.json").exists()
+    assert (spool / "accepted" / "good.json").exists()
+    assert service.status("good")["status"] == "queued"
+
+
+def test_http_post_non_object_is_client_error(service, image):
+    server = create_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        host, port = server.server_address[:2]
+        for body, expected in (("[]", 400), ('"x"', 400), ('{"image_path": "%s", "config": {"nope": 1}}' % image, 400),
+                               ('{"image_path": "%s", "config": []}' % image, 400),
+                               ('{"image_path": "%s"}' % image, 202)):
+            connection = http.client.HTTPConnection(host, port, timeout=5)
+            connection.request("POST", "/jobs", body=body, headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            connection.close()
+            assert response.status == expected, body
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class GatedBackend:
+    """Операции завершаются только после release"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.submitted = threading.Event()
+
+    def submit(self, job):
+        job.operation_name = f"op-{job.job_id}"
+        self.submitted.set()
+
+    def poll(self, job):
+        return {"response": {}} if self.release.is_set() else None
+
+    def complete(self, job, operation_result):
+        return [{"job_id": job.job_id, "source_image": job.image_path, "status": "success"}]
+
+    def fail(self, job, error):
+        return {"job_id": job.job_id, "source_image": job.image_path, "status": "error", "error": str(error)}
+
+    def cancel(self, job):
+        pass
+
+
+class GatedGenerator(StubGenerator):
+    def __init__(self):
+        self.backend = GatedBackend()
+
+    def create_scheduler(self, settings=None):
+        return OperationScheduler(self.backend, settings, verbose=False)
+
+
+@pytest.mark.parametrize("mode, expected", [("drain", "done"), ("abort", "cancelled")])
+def test_stop_follows_shutdown_settings(tmp_path, image, mode, expected):
+    generator = GatedGenerator()
+    settings = SchedulerSettings(
+        max_concurrent_operations=1, poll_interval=0.01, initial_poll_delay=0.01,
+        region_weights={"us-central1": 1.0}, shutdown_mode=mode, drain_timeout=30.0
+    )
+    service = JobService(generator, StubConfig(), settings, output_folder=str(tmp_path / "out"))
+    job_ids = [service.submit({"image_path": image, "job_id": f"j{index}"}) for index in range(3)]
+    service.start()
+    assert generator.backend.submitted.wait(5)
+
+    # Начатая операция завершается (drain) или отменяется (abort), принятые в очереди не отправляются
+    threading.Timer(0.2, generator.backend.release.set).start()
+    service.stop(timeout=10)
+
+    assert not service._worker.is_alive()
+    assert [service.status(job_id)["status"] for job_id in job_ids] == [expected, "skipped", "skipped"]
@@ -0,0 +1,56 @@
+"""Поиск дубликатов в потоке изображений пакетами"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+
+from turan_dedup import DuplicateFilter, select_representatives
+
+
+def make_image(path, seed, size=(64, 48)):
+    rng = np.random.default_rng(seed)
+    pixels = (rng.random((8, 8)) * 255).astype("uint8")
+    Image.fromarray(pixels).resize(size).save(path)
+    return str(path)
+
+
+def test_duplicates_found_across_batches(tmp_path):
+    first = [make_image(tmp_path / f"a{seed}.png", seed) for seed in range(3)]
+    # Те же снимки в другом размере - почти одинаковые
+    second = [make_image(tmp_path / f"b{seed}.png", seed, (128, 96)) for seed in range(3)]
+    second.append(make_image(tmp_path / "new.png", 99))
+
+    duplicate_filter = DuplicateFilter(radius=6, index_path=str(tmp_path / "index.db"))
+    try:
+        kept, duplicates = duplicate_filter.filter(first)
+        assert kept == first and duplicates == {}
+        kept, duplicates = duplicate_filter.filter(second)
+    finally:
+        duplicate_filter.close()
+
+    assert kept == [str(tmp_path / "new.png")]
+    assert duplicates == {second[seed]: first[seed] for seed in range(3)}
+
+    # Один пакет со всеми файлами дает те же группы
+    representatives, all_duplicates = select_representatives(first + second, radius=6, index_path=None)
+    assert len(representatives) == 4 and len(all_duplicates) == 3
+
+
+def test_large_jpeg_decoded_at_reduced_size(tmp_path, monkeypatch):
+    import turan_dedup
+
+    path = tmp_path / "large.jpg"
+    Image.fromarray((np.random.default_rng(0).random((8, 8)) * 255).astype("uint8")).resize((2048, 1536)).save(path)
+    decoded = []
+    exif_transpose = turan_dedup.ImageOps.exif_transpose
+
+    def record_size(image):
+        decoded.append(image.size)
+        return exif_transpose(image)
+
+    monkeypatch.setattr(turan_dedup.ImageOps, "exif_transpose", record_size)
+
+    assert turan_dedup._load_gray(str(path)).shape == (32, 32)
+    # draft до exif_transpose: JPEG декодируется в уменьшенном масштабе, а не 2048x1536
+    assert decoded and max(decoded[0]) <= 256
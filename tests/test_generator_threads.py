@@ -0,0 +1,59 @@
+"""Общий генератор из нескольких потоков: статистика и файл сценариев без потерь"""
+
+import threading
+
+from main import GenerationContext, GenerationStats, SimpleTuranGenerator, VideoGenerationConfig
+from turan_json import load_file
+
+THREADS = 8
+
+
+def run_threads(target):
+    threads = [threading.Thread(target=target, args=(index,)) for index in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_stats_summed_across_threads():
+    stats = GenerationStats()
+
+    def work(index):
+        for number in range(500):
+            prompt_type = "enhanced" if number % 2 else "traditional"
+            stats.record(GenerationContext(image_path="a.jpg", scenario={"id": f"s{number % 5}"}, prompt_type=prompt_type))
+
+    run_threads(work)
+    snapshot = stats.snapshot()
+
+    assert snapshot["total_generated"] == THREADS * 500
+    assert snapshot["enhanced_prompts_used"] == snapshot["traditional_prompts_used"] == THREADS * 250
+    assert snapshot["scenarios_used"] == {f"s{index}": THREADS * 100 for index in range(5)}
+
+
+def test_scenario_file_keeps_every_image(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    generator = SimpleTuranGenerator(seed=3)
+    config = VideoGenerationConfig()
+
+    def work(index):
+        for number in range(10):
+            context = GenerationContext(image_path=f"in/{index}_{number}.jpg", config=config)
+            generator._select_scenario(context)
+            generator._save_scenario_info(context)
+
+    run_threads(work)
+
+    saved = load_file(tmp_path / "generated_showcase_scenarios.json")
+    assert len(saved) == THREADS * 10
+
+
+def test_seed_makes_scenario_choice_reproducible():
+    config = VideoGenerationConfig()
+
+    def choices(seed):
+        generator = SimpleTuranGenerator(seed=seed)
+        return [generator._select_scenario(GenerationContext(image_path="a.jpg", config=config))["id"] for _ in range(20)]
+
+    assert choices(7) == choices(7)
@@ -0,0 +1,54 @@
+"""JSON слой: одинаковый результат у всех доступных бэкендов"""
+
+import datetime
+
+import pytest
+
+import turan_json
+from turan_json import BACKENDS, _select_backend
+
+AVAILABLE = [name for name in BACKENDS if _select_backend(name)[0] == name]
+
+
+@pytest.fixture(params=AVAILABLE)
+def backend(request, monkeypatch):
+    name, dumps, loads = _select_backend(request.param)
+    monkeypatch.setattr(turan_json, "_dumps", dumps)
+    monkeypatch.setattr(turan_json, "_loads", loads)
+    return name
+
+
+def test_round_trip_keeps_cyrillic_unescaped(backend):
+    record = {"russian_text": "Элегантность в деталях", "timings": {"generate_seconds": 95.2}, "big": 2 ** 70}
+    encoded = turan_json.dumps(record)
+
+    assert isinstance(encoded, bytes)
+    assert "Элегантность".encode("utf-8") in encoded
+    assert turan_json.loads(encoded) == record
+    assert turan_json.loads(memoryview(encoded)) == record
+    assert turan_json.loads(encoded.decode("utf-8")) == record
+
+
+def test_dumps_line_is_compact_jsonl_with_default(backend):
+    line = turan_json.dumps_line({"at": datetime.date(2025, 1, 31)})
+
+    assert line.endswith(b"\n") and line.count(b"\n") == 1
+    assert turan_json.loads(line) == {"at": "2025-01-31"}
+
+
+def test_invalid_json_raises_value_error(backend):
+    with pytest.raises(ValueError):
+        turan_json.loads(b"{not json")
+
+
+def test_dump_file_replaces_atomically(tmp_path):
+    path = tmp_path / "scenarios.json"
+    turan_json.dump_file({"a": 1}, path)
+    turan_json.dump_file({"a": 2}, path)
+
+    assert turan_json.load_file(path) == {"a": 2}
+    assert [item.name for item in tmp_path.iterdir()] == ["scenarios.json"]
+
+
+def test_unknown_backend_falls_back():
+    assert _select_backend("simplejson")[0] in BACKENDS
@@ -0,0 +1,46 @@
+"""Логирование через очередь: JSON записи и ротация файла"""
+
+import json
+import logging
+
+import pytest
+
+import turan_logging
+from turan_logging import parse_size, setup_logging, shutdown_logging
+
+
+@pytest.fixture
+def restore_root_logger():
+    root = logging.getLogger()
+    level, handlers = root.level, list(root.handlers)
+    yield
+    shutdown_logging()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+def test_parse_size():
+    assert parse_size("10MB") == 10 * 1024 ** 2
+    assert parse_size("512kb") == 512 * 1024
+    assert parse_size("1.5 GB") == int(1.5 * 1024 ** 3)
+    assert parse_size(4096) == 4096
+    with pytest.raises(ValueError):
+        parse_size("ten megabytes")
+
+
+def test_json_records_written_with_rotation(tmp_path, restore_root_logger):
+    log_file = tmp_path / "turan.log"
+    setup_logging({"file": str(log_file), "json": True, "console": False, "max_file_size": "1KB", "backup_count": 2})
+    assert turan_logging.console_handler() is None
+
+    logger = logging.getLogger("turan.test")
+    for index in range(40):
+        logger.info("Видео %s сохранено", index)
+    shutdown_logging()
+
+    records = [json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines()]
+    assert records[-1]["message"] == "Видео 39 сохранено"
+    assert records[-1]["level"] == "INFO" and records[-1]["logger"] == "turan.test"
+    # Ротация: текущий файл и не больше backup_count копий
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["turan.log", "turan.log.1", "turan.log.2"]
+    assert log_file.stat().st_size <= 1024
@@ -0,0 +1,63 @@
+"""Хранилище видео: одно содержимое - один объект, вытеснение по LRU с копией в GCS"""
+
+import itertools
+import os
+
+import pytest
+
+import turan_media
+from turan_media import MediaStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Строгий порядок обращений без зависимости от разрешения часов
+    ticks = itertools.count(1)
+    monkeypatch.setattr(turan_media.time, "time", lambda: float(next(ticks)))
+    media_store = MediaStore(str(tmp_path / "cache"), max_bytes=350)
+    yield media_store
+    media_store.close()
+
+
+def fake_download(downloads):
+    def download(gcs_uri, path):
+        downloads.append(gcs_uri)
+        with open(path, "wb") as f:
+            f.write(gcs_uri.encode().ljust(100, b"."))
+    return download
+
+
+def test_same_video_stored_once_and_linked(store, tmp_path):
+    first = store.materialize(store.put_bytes(b"video"), str(tmp_path / "out1" / "a.mp4"))
+    second = store.materialize(store.put_bytes(b"video"), str(tmp_path / "out2" / "a.mp4"))
+
+    assert os.path.samefile(first, second)
+    assert store.summary()["objects"] == 1 and store.stats["stored"] == 1
+
+
+def test_gcs_video_downloaded_once(store, tmp_path):
+    downloads = []
+    sha256 = store.fetch_gcs("gs://b/a.mp4", fake_download(downloads))
+
+    assert store.fetch_gcs("gs://b/a.mp4", fake_download(downloads)) == sha256
+    assert downloads == ["gs://b/a.mp4"] and store.stats["hits"] == 1
+
+
+def test_least_recently_used_gcs_video_evicted_and_restored(store, tmp_path):
+    downloads = []
+    download = fake_download(downloads)
+    local = store.materialize(store.put_bytes(b"x" * 100), str(tmp_path / "out" / "local.mp4"))
+    results = []
+    for name in ("a", "b"):
+        path = store.materialize(store.fetch_gcs(f"gs://b/{name}.mp4", download), str(tmp_path / "out" / f"{name}.mp4"))
+        results.append({"local_path": path, "gcs_uri": f"gs://b/{name}.mp4"})
+
+    # Третий объект превышает бюджет: вытесняется давнее видео с копией в GCS, без копии - остается
+    store.materialize(store.fetch_gcs("gs://b/c.mp4", download), str(tmp_path / "out" / "c.mp4"))
+    assert not os.path.exists(results[0]["local_path"])
+    assert os.path.exists(results[1]["local_path"]) and os.path.exists(local)
+    assert store.stats["evicted"] == 1 and store.total_bytes() <= 350
+
+    assert store.ensure_local(results[0], download) == results[0]["local_path"]
+    assert os.path.exists(results[0]["local_path"])
+    assert downloads.count("gs://b/a.mp4") == 2
@@ -0,0 +1,110 @@
+"""Конвейер стадий: обратное давление на источник и остановка"""
+
+import threading
+import time
+
+from turan_pipeline import PipelineSettings, StagedPipeline
+from turan_scheduler import GenerationJob, OperationScheduler, SchedulerSettings
+
+
+class GatedBackend:
+    """Операции завершаются только после release"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.submitted = []
+
+    def submit(self, job):
+        self.submitted.append(job.job_id)
+        job.operation_name = f"op-{job.job_id}"
+
+    def poll(self, job):
+        return {"response": {}} if self.release.is_set() else None
+
+    def complete(self, job, operation_result):
+        return [{"job_id": job.job_id, "source_image": job.image_path, "status": "success"}]
+
+    def fail(self, job, error):
+        return {"job_id": job.job_id, "source_image": job.image_path, "status": "error", "error": str(error)}
+
+    def cancel(self, job):
+        pass
+
+
+class Source:
+    """Ленивый источник заданий с учетом прочитанных и закрытия"""
+
+    def __init__(self, count):
+        self.count = count
+        self.pulled = 0
+        self.closed = False
+
+    def __iter__(self):
+        try:
+            for index in range(self.count):
+                self.pulled += 1
+                yield GenerationJob(job_id=f"j{index}", image_path=f"{index}.jpg")
+        finally:
+            self.closed = True
+
+
+def make_pipeline(queue_size=2):
+    backend = GatedBackend()
+    settings = SchedulerSettings(
+        max_concurrent_operations=1,
+        poll_interval=0.01,
+        initial_poll_delay=0.01,
+        region_weights={"us-central1": 1.0},
+        adaptive_concurrency=False
+    )
+    scheduler = OperationScheduler(backend, settings, verbose=False)
+    pipeline = StagedPipeline(scheduler, PipelineSettings(encode_workers=0, download_workers=1, queue_size=queue_size))
+    return pipeline, scheduler, backend
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_bounded_queues_hold_back_source():
+    pipeline, scheduler, backend = make_pipeline(queue_size=2)
+    source = Source(1000)
+    results = []
+    consumer = threading.Thread(target=lambda: results.extend(pipeline.run(iter(source))))
+    consumer.start()
+
+    wait_for(lambda: backend.submitted)
+    time.sleep(0.3)
+    # В работе 1 операция, остальное - ограниченные очереди стадий
+    assert source.pulled <= 12
+
+    backend.release.set()
+    scheduler.settings.max_concurrent_operations = 50
+    consumer.join(timeout=30)
+    assert len(results) == 1000
+    assert source.closed
+
+
+def test_drain_reports_read_jobs_and_stops_reading_source():
+    pipeline, scheduler, backend = make_pipeline()
+    source = Source(1000)
+
+    def drain_on_submit(event, job, **data):
+        if event == "submitted":
+            scheduler.shutdown("drain")
+            backend.release.set()
+
+    scheduler.listeners.append(drain_on_submit)
+    results = list(pipeline.run(iter(source)))
+
+    statuses = [result["status"] for result in results]
+    assert statuses.count("success") == 1
+    # Каждое прочитанное задание в отчете ровно один раз, остальной источник не перебирается
+    assert len(results) == source.pulled
+    assert sorted(result["job_id"] for result in results) == sorted(f"j{index}" for index in range(source.pulled))
+    assert source.pulled < 20
+    assert source.closed
+    assert not pipeline.scan_complete
@@ -0,0 +1,40 @@
+"""План пакета: пиковая память по очередям конвейера"""
+
+from turan_pipeline import PipelineSettings
+from turan_planner import build_plan, estimate_pipeline_memory
+from turan_scheduler import SchedulerSettings
+from turan_simulator import SimulationModel
+
+MB = 1024 ** 2
+
+
+def test_memory_grows_with_pipeline_queues():
+    small = estimate_pipeline_memory(3 * MB, 6 * MB, PipelineSettings(encode_workers=2, download_workers=4, queue_size=8))
+    large = estimate_pipeline_memory(3 * MB, 6 * MB, PipelineSettings(encode_workers=8, download_workers=16, queue_size=64))
+
+    # Окно кодирования 2 * 2 плюс очередь encoded и отложенные задания планировщика по 8
+    assert small["encode"] == 20 * 4 * MB
+    assert large["encode"] > small["encode"] and large["download"] > small["download"]
+
+
+def test_inline_encoding_and_streaming_downloads_hold_no_queues():
+    memory = estimate_pipeline_memory(3 * MB, 6 * MB, PipelineSettings(encode_workers=0, download_workers=4), streaming_downloads=True)
+
+    assert memory["encode"] == 0 and memory["download"] == 0
+    assert memory["submit"] > 0
+
+
+def test_plan_peak_memory_includes_every_stage(tmp_path):
+    image = tmp_path / "a.jpg"
+    image.write_bytes(b"x" * MB)
+    pipeline = PipelineSettings(encode_workers=4, download_workers=8, queue_size=32)
+
+    plan = build_plan(
+        [str(image)], None, SchedulerSettings(region_weights={"us-central1": 1.0}), SimulationModel(),
+        str(tmp_path / "out"), runs=1, pipeline=pipeline
+    )
+
+    assert set(plan.memory_breakdown) == {"encode", "submit", "download"}
+    assert plan.peak_memory_bytes >= sum(plan.memory_breakdown.values())
+    # Одного запроса в памяти недостаточно: очереди стадий держат десятки изображений
+    assert plan.memory_breakdown["encode"] > 50 * MB
@@ -0,0 +1,61 @@
+"""Постобработка: миниатюры, постеры и экспорт через ffmpeg"""
+
+import threading
+
+from turan_postprocess import PostProcessor, PostProcessSettings, postprocess_video
+
+
+def make_settings(fake_ffmpeg, **kwargs):
+    return PostProcessSettings(ffmpeg=fake_ffmpeg.ffmpeg, ffprobe=fake_ffmpeg.ffprobe, **kwargs)
+
+
+def test_outputs_created_once(tmp_path, fake_ffmpeg):
+    video = tmp_path / "turan_a.mp4"
+    video.write_bytes(b"video")
+    settings = make_settings(fake_ffmpeg, formats=["MOV"])
+
+    record = postprocess_video(str(video), settings)
+
+    assert record == {
+        "thumbnail": str(tmp_path / "turan_a_thumb.jpg"),
+        "poster": str(tmp_path / "turan_a_poster.jpg"),
+        "exports": {"MOV": str(tmp_path / "turan_a.mov")}
+    }
+    assert len(fake_ffmpeg.calls) == 3
+    # Повторный запуск: производные файлы новее видео, ffmpeg не вызывается
+    assert postprocess_video(str(video), settings) == record
+    assert len(fake_ffmpeg.calls) == 3
+    assert not list(tmp_path.glob("*.part*"))
+
+
+def test_failed_output_reported_without_stopping_others(tmp_path, fake_ffmpeg, monkeypatch):
+    monkeypatch.setenv("FAKE_FFMPEG_FAIL", "_poster")
+    video = tmp_path / "turan_a.mp4"
+    video.write_bytes(b"video")
+
+    record = postprocess_video(str(video), make_settings(fake_ffmpeg))
+
+    assert record["thumbnail"] == str(tmp_path / "turan_a_thumb.jpg")
+    assert "conversion failed" in record["postprocess_errors"]["poster"]
+    assert not list(tmp_path.glob("*.part*"))
+
+
+def test_processor_delivers_updated_result(tmp_path, fake_ffmpeg):
+    video = tmp_path / "turan_a.mp4"
+    video.write_bytes(b"video")
+    processor = PostProcessor(make_settings(fake_ffmpeg, posters=False))
+    delivered = []
+    done = threading.Event()
+    result = {"status": "success", "local_path": str(video)}
+
+    def deliver(item):
+        delivered.append(item)
+        done.set()
+
+    assert processor.wants(result) and not processor.wants({"status": "error"})
+    processor.submit(result, deliver)
+    assert done.wait(10)
+    processor.close()
+
+    assert delivered == [result] and result["thumbnail"].endswith("_thumb.jpg")
+    assert processor.active == 0
@@ -0,0 +1,70 @@
+"""Предварительная проверка: заголовки JPEG/PNG без декодирования пикселей"""
+
+import struct
+
+from turan_preflight import check_image, validate_images
+
+
+def png(width, height):
+    ihdr = struct.pack(">II", width, height) + b"\x08\x02\x00\x00\x00"
+    return (b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + ihdr + b"\x00" * 4
+            + b"\x00" * 4 + b"IEND" + b"\xaeB`\x82")
+
+
+def jpeg(width, height, orientation=None, end=True):
+    data = b"\xff\xd8"
+    if orientation is not None:
+        # APP1 Exif: TIFF little-endian, одна запись IFD0 с тегом Orientation
+        tiff = b"II*\x00" + struct.pack("<I", 8) + struct.pack("<H", 1) + struct.pack("<HHIHH", 0x0112, 3, 1, orientation, 0)
+        segment = b"Exif\x00\x00" + tiff
+        data += b"\xff\xe1" + struct.pack(">H", len(segment) + 2) + segment
+    data += b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00"
+    data += b"\xff\xda" + struct.pack(">H", 2) + b"\x00" * 64
+    return data + (b"\xff\xd9" if end else b"")
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_valid_images_report_dimensions(tmp_path):
+    photo = check_image(write(tmp_path, "a.jpg", jpeg(1920, 1080)), "16:9")
+    scan = check_image(write(tmp_path, "b.png", png(1280, 720)), "16:9")
+
+    assert photo.ok and (photo.mime_type, photo.width, photo.height) == ("image/jpeg", 1920, 1080)
+    assert scan.ok and (scan.mime_type, scan.width, scan.height) == ("image/png", 1280, 720)
+
+
+def test_exif_rotation_checked_against_aspect_ratio(tmp_path):
+    # Кадр 1920x1080 с ориентацией 6 отображается вертикально
+    check = check_image(write(tmp_path, "a.jpg", jpeg(1920, 1080, orientation=6)), "16:9")
+
+    assert not check.ok
+    assert (check.width, check.height, check.orientation) == (1080, 1920, 6)
+    assert check_image(check.path, "9:16").ok
+
+
+def test_rejections(tmp_path):
+    cases = {
+        "truncated.jpg": (jpeg(1920, 1080, end=False), "обрезан"),
+        "small.png": (png(100, 100), "маленькое"),
+        "renamed.png": (jpeg(1920, 1080), "не совпадает"),
+        "empty.jpg": (b"", "Пустой"),
+        "text.jpg": (b"not an image at all", "неизвестная сигнатура")
+    }
+    for name, (data, reason) in cases.items():
+        check = check_image(write(tmp_path, name, data), "16:9")
+        assert not check.ok and reason in check.reason, name
+        assert check.to_result()["status"] == "rejected"
+    assert "лимита" in check_image(write(tmp_path, "big.jpg", jpeg(1920, 1080)), max_file_size=10).reason
+
+
+def test_validate_images_keeps_order(tmp_path):
+    paths = [write(tmp_path, f"{index}.png", png(1280, 720) if index % 2 else png(10, 10)) for index in range(6)]
+
+    accepted, rejected = validate_images(paths, "16:9", workers=3)
+
+    assert accepted == paths[1::2]
+    assert [check.path for check in rejected] == paths[0::2]
@@ -0,0 +1,53 @@
+"""Двухуровневая генерация: кандидаты, одобрение превью и выбор по оценке"""
+
+import pytest
+
+from turan_preview import (
+    TierSettings, candidate_scenarios, is_approved, load_scoring_hook, read_approval_file, select_by_score, tier_seed
+)
+
+SCENARIOS = [f"scenario_{index}" for index in range(10)]
+
+
+def test_candidates_stable_between_runs():
+    settings = TierSettings(candidates=3)
+    first = candidate_scenarios("in/sku1/a.jpg", SCENARIOS, settings)
+
+    assert len(first) == 3 and set(first) <= set(SCENARIOS)
+    assert candidate_scenarios("in/sku1/a.jpg", SCENARIOS, settings) == first
+    assert candidate_scenarios("a.jpg", SCENARIOS, TierSettings(candidates=0)) == SCENARIOS
+    assert candidate_scenarios("a.jpg", SCENARIOS, TierSettings(scenarios=["x"])) == ["x"]
+    # Превью и финал одного сценария рендерятся с одним seed
+    assert tier_seed("in/a.jpg", "scenario_1") == tier_seed("a.jpg", "scenario_1")
+    assert tier_seed("a.jpg", "scenario_1") != tier_seed("a.jpg", "scenario_2")
+
+
+def test_approval_file_matches_job_id_and_file_name(tmp_path):
+    approval = tmp_path / "approved.txt"
+    approval.write_text("# одобрено\nprev-1\npreviews/sku1/turan_reveal_a_v0.mp4  # лучший свет\n\n", encoding="utf-8")
+    approved = read_approval_file(str(approval))
+
+    assert is_approved({"job_id": "prev-1"}, approved)
+    assert is_approved({"job_id": "prev-2", "local_path": "/out/previews/sku1/turan_reveal_a_v0.mp4"}, approved)
+    assert not is_approved({"job_id": "prev-3", "local_path": "/out/previews/turan_other.mp4"}, approved)
+
+
+def test_select_best_scores_per_image():
+    previews = [
+        {"job_id": "a1", "source_image": "a.jpg", "quality": 0.4},
+        {"job_id": "a2", "source_image": "a.jpg", "quality": 0.9},
+        {"job_id": "b1", "source_image": "b.jpg", "quality": 0.1},
+        {"job_id": "b2", "source_image": "b.jpg"}
+    ]
+
+    selected = select_by_score(previews, lambda preview: preview["quality"], TierSettings(auto_select=1, min_score=0.2))
+
+    # Превью ниже порога и с ошибкой оценки не выбираются
+    assert [preview["job_id"] for preview in selected] == ["a2"]
+    assert previews[0]["score"] == 0.4
+
+
+def test_scoring_hook_spec():
+    assert load_scoring_hook("os.path:basename")("/a/b.mp4") == "b.mp4"
+    with pytest.raises(ValueError):
+        load_scoring_hook("os.path.basename")
@@ -0,0 +1,89 @@
+"""Панель прогресса: учет событий планировщика, скорость и оценка времени"""
+
+import io
+
+import pytest
+
+import turan_progress
+from turan_progress import ProgressDashboard, format_duration
+from turan_scheduler import GenerationJob
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakePipeline:
+    scanned = 10
+    scan_complete = True
+
+    def depths(self):
+        return {"scan": 3, "encode": 1, "submit": 2, "in_flight": 2, "download": 0, "postprocess": 0}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(turan_progress.time, "monotonic", fake)
+    return fake
+
+
+def job(job_id, region="us-central1", is_hedge=False):
+    return GenerationJob(job_id=job_id, image_path=f"{job_id}.jpg", region=region, is_hedge=is_hedge)
+
+
+def test_operations_counts_and_eta(clock):
+    stream = io.StringIO()
+    dashboard = ProgressDashboard(stream=stream, plain_interval=3600)
+    dashboard.attach(FakePipeline())
+    try:
+        first, second = job("a"), job("b")
+        dashboard.listener("submitted", first)
+        clock.now += 30
+        dashboard.listener("submitted", second)
+        dashboard.listener("hedge_submitted", job("b", region="europe-west4", is_hedge=True))
+        clock.now += 30
+        dashboard.listener("completed", first, results=[{"status": "success"}, {"status": "success"}])
+        dashboard.listener("retry", second)
+
+        snapshot = dashboard.snapshot()
+        assert snapshot["counts"]["done"] == 1 and snapshot["counts"]["videos"] == 2
+        assert snapshot["counts"]["retries"] == 1
+        [operation] = snapshot["operations"]
+        assert operation["job_id"] == "b" and operation["hedged"] and operation["region"] == "us-central1"
+        assert operation["age"] == 30
+        # Одно задание за 60 секунд, осталось девять
+        assert snapshot["eta"] == pytest.approx(540)
+        assert snapshot["videos_per_hour"] == pytest.approx(120)
+
+        lines = dashboard.render(snapshot)
+        assert "готово 1/10" in lines[0] and "осталось 9:00" in lines[0]
+        assert "scan 3" in lines[1] and "генерация 2" in lines[1]
+        assert lines[-1].endswith("b +дубликат")
+    finally:
+        dashboard.close()
+    # Вне терминала при закрытии пишется итоговая строка
+    assert stream.getvalue().startswith("Прогресс: готово 1/10")
+
+
+def test_interrupted_and_failed_jobs_leave_in_flight(clock):
+    dashboard = ProgressDashboard(stream=io.StringIO())
+    for name in ("a", "b"):
+        dashboard.listener("submitted", job(name))
+    dashboard.listener("failed", job("a"))
+    dashboard.listener("cancelled", job("b"), result={"status": "cancelled"})
+
+    snapshot = dashboard.snapshot()
+    assert snapshot["operations"] == []
+    assert snapshot["counts"]["failed"] == 1 and snapshot["counts"]["interrupted"] == 1
+    assert snapshot["total"] is None and snapshot["eta"] is None
+
+
+def test_format_duration():
+    assert format_duration(None) == "--:--"
+    assert format_duration(75) == "1:15"
+    assert format_duration(3725) == "1:02:05"
@@ -0,0 +1,45 @@
+"""Воспроизведение кассеты: скорость задается time_scale, а не реальными часами"""
+
+import base64
+import json
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+
+from main import SimpleTuranGenerator, VideoGenerationConfig
+from turan_transport import ReplayTransport
+
+OPERATION = "projects/p/locations/us-central1/publishers/google/models/veo-3.0-generate-001/operations/1"
+
+
+def write_cassette(folder):
+    video = base64.b64encode(b"video").decode("ascii")
+    exchanges = [
+        {"kind": "http", "endpoint": "predictLongRunning", "request": {}, "status": 200,
+         "response": {"name": OPERATION}, "latency": 0.5},
+        {"kind": "http", "endpoint": "fetchPredictOperation", "request": {"operationName": OPERATION}, "status": 200,
+         "response": {"done": False}, "latency": 0.5},
+        {"kind": "http", "endpoint": "fetchPredictOperation", "request": {"operationName": OPERATION}, "status": 200,
+         "response": {"done": True, "response": {"videos": [{"bytesBase64Encoded": video}]}}, "latency": 0.5}
+    ]
+    folder.mkdir()
+    (folder / "exchanges.jsonl").write_text("\n".join(json.dumps(entry) for entry in exchanges) + "\n")
+
+
+def test_replay_speed_zero_skips_poll_waits(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_cassette(tmp_path / "cassette")
+    (tmp_path / "in").mkdir()
+    (tmp_path / "in" / "a.png").write_bytes(b"\x89PNG\r\n\x1a\n")
+    generator = SimpleTuranGenerator(transport=ReplayTransport(str(tmp_path / "cassette"), time_scale=0))
+
+    started = time.monotonic()
+    results = list(generator.iter_process_image_folder(
+        str(tmp_path / "in"), str(tmp_path / "out"), VideoGenerationConfig(), preflight=False
+    ))
+
+    assert [result["status"] for result in results] == ["success"]
+    # Без масштаба времени опрос ждал бы initial_poll_delay и poll_interval в реальном времени
+    assert time.monotonic() - started < 5.0
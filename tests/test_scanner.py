@@ -0,0 +1,105 @@
+"""Манифест каталога: повторный обход выдает только новые и измененные файлы"""
+
+import os
+
+from turan_scanner import ScanManifest, scan_images
+
+
+def write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+
+def scan(manifest, root, **kwargs):
+    return sorted(os.path.relpath(path, root) for path in manifest.scan(str(root), **kwargs))
+
+
+def settle(manifest, root, status="done"):
+    paths = list(manifest.scan(str(root), trust_directory_mtime=False))
+    manifest.mark(paths, status)
+
+
+def test_nested_folders_streamed_and_hidden_skipped(tmp_path):
+    write(tmp_path / "sku1" / "a.jpg", b"a")
+    write(tmp_path / "sku2" / "deep" / "b.PNG", b"b")
+    write(tmp_path / ".cache" / "c.jpg", b"c")
+    write(tmp_path / "notes.txt", b"x")
+
+    found = sorted(os.path.relpath(entry.path, tmp_path) for entry in scan_images(str(tmp_path)))
+    assert found == [os.path.join("sku1", "a.jpg"), os.path.join("sku2", "deep", "b.PNG")]
+    assert [entry.path for entry in scan_images(str(tmp_path), recursive=False)] == []
+
+
+def test_rescan_yields_only_new_and_unfinished(tmp_path):
+    root = tmp_path / "in"
+    write(root / "a.jpg", b"a")
+    write(root / "b.jpg", b"b")
+    manifest = ScanManifest(str(tmp_path / "m.db"))
+
+    assert scan(manifest, root) == ["a.jpg", "b.jpg"]
+    manifest.mark([str(root / "a.jpg")], "done")
+    manifest.mark([str(root / "b.jpg")], "error")
+    write(root / "c.jpg", b"c")
+
+    # Ошибка повторяется, готовый файл нет
+    assert scan(manifest, root) == ["b.jpg", "c.jpg"]
+    assert scan(manifest, root, reprocess=True) == ["a.jpg", "b.jpg", "c.jpg"]
+    manifest.close()
+
+
+def test_touch_keeps_status_but_copy_in_other_sku_is_processed(tmp_path):
+    root = tmp_path / "in"
+    photo = write(root / "sku1" / "front.jpg", b"photo")
+    manifest = ScanManifest(str(tmp_path / "m.db"))
+    settle(manifest, root)
+
+    # touch: то же содержимое по тому же пути
+    os.utime(photo, (1, 1))
+    write(root / "sku2" / "front.jpg", b"photo")
+
+    assert scan(manifest, root, trust_directory_mtime=False) == [os.path.join("sku2", "front.jpg")]
+    manifest.close()
+
+
+def test_match_content_skips_copies_under_other_paths(tmp_path):
+    root = tmp_path / "in"
+    write(root / "sku1" / "front.jpg", b"photo")
+    manifest = ScanManifest(str(tmp_path / "m.db"), match_content=True)
+    settle(manifest, root)
+    write(root / "sku2" / "front.jpg", b"photo")
+
+    assert scan(manifest, root) == []
+    manifest.close()
+
+
+def test_in_place_overwrite_needs_full_rescan(tmp_path):
+    root = tmp_path / "in"
+    photo = write(root / "a.jpg", b"old")
+    manifest = ScanManifest(str(tmp_path / "m.db"))
+    settle(manifest, root)
+
+    directory_times = os.stat(root)
+    write(root / "a.jpg", b"new content")
+    os.utime(root, ns=(directory_times.st_atime_ns, directory_times.st_mtime_ns))
+
+    # mtime папки не изменился: быстрый обход файл не видит, полный - видит
+    assert scan(manifest, root) == []
+    assert scan(manifest, root, trust_directory_mtime=False) == ["a.jpg"]
+    assert manifest.stats["directories_cached"] == 1
+    assert os.path.exists(photo)
+    manifest.close()
+
+
+def test_admit_in_watch_mode(tmp_path):
+    root = tmp_path / "in"
+    manifest = ScanManifest(str(tmp_path / "m.db"))
+    photo = write(root / "sku1" / "a.jpg", b"photo")
+
+    assert manifest.admit(photo)
+    manifest.mark([photo], "done")
+    assert not manifest.admit(photo)
+    os.utime(photo, (1, 1))
+    assert not manifest.admit(photo)
+    assert manifest.admit(write(root / "sku2" / "a.jpg", b"photo"))
+    manifest.close()
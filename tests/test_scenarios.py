@@ -0,0 +1,25 @@
+"""Кастомные сценарии: у каждого промпта своя запись в отчете"""
+
+from main import GenerationContext, SimpleTuranGenerator, VideoGenerationConfig
+from turan_results import JsonlResultWriter, load_scenarios
+
+
+def test_custom_prompts_get_distinct_scenarios_in_report(tmp_path):
+    generator = SimpleTuranGenerator(seed=1)
+    config = VideoGenerationConfig()
+    scenarios = [
+        generator._select_scenario(GenerationContext(image_path="a.jpg", config=config, custom_prompt=prompt))
+        for prompt in ("утренний свет", "вечерний интерьер")
+    ]
+    assert scenarios[0]["id"] != scenarios[1]["id"]
+
+    report = tmp_path / "report.jsonl"
+    with JsonlResultWriter(str(report), scenario_lookup=generator.used_scenario) as writer:
+        for index, scenario in enumerate(scenarios):
+            writer.write({"job_id": f"j{index}", "status": "success", "scenario_id": scenario["id"]})
+
+    written = load_scenarios(str(report))
+    assert [written[scenario["id"]]["enhanced_prompt"] for scenario in scenarios] == [
+        scenario["enhanced_prompt"] for scenario in scenarios
+    ]
+    assert "утренний свет" in written[scenarios[0]["id"]]["enhanced_prompt"]
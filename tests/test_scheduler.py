@@ -0,0 +1,197 @@
+"""Планировщик на виртуальном времени: хеджирование и остановка"""
+
+import queue
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from turan_scheduler import GenerationJob, OperationScheduler, SchedulerSettings, VirtualClock
+
+
+class ScriptedBackend:
+    """Бэкенд с заданной длительностью операций: durations[(job_id, is_hedge)]
+
+    failures - копии, которые завершаются ошибкой операции.
+    """
+
+    def __init__(self, clock, durations, failures=()):
+        self.clock = clock
+        self.durations = durations
+        self.failures = set(failures)
+        self.cancelled = []
+        self._count = 0
+
+    def submit(self, job):
+        self._count += 1
+        job.operation_name = f"op-{self._count}"
+        job.scenario = {"id": "s1"}
+
+    def poll(self, job):
+        if self.clock.now() - job.submitted_at < self.durations[(job.job_id, job.is_hedge)]:
+            return None
+        if (job.job_id, job.is_hedge) in self.failures:
+            return {"error": {"message": "operation failed"}}
+        return {"response": {"videos": [{}]}}
+
+    def complete(self, job, operation_result):
+        if "error" in operation_result:
+            return [{"job_id": job.job_id, "status": "error", "hedge": job.is_hedge}]
+        return [{"job_id": job.job_id, "status": "success", "hedge": job.is_hedge}]
+
+    def fail(self, job, error):
+        return {"job_id": job.job_id, "status": "error", "error": str(error)}
+
+    def cancel(self, job):
+        self.cancelled.append((job.job_id, job.is_hedge))
+
+
+def make_scheduler(durations, failures=()):
+    clock = VirtualClock()
+    settings = SchedulerSettings(
+        max_concurrent_operations=4,
+        poll_interval=1.0,
+        initial_poll_delay=1.0,
+        region_weights={"us-central1": 1.0, "europe-west4": 1.0},
+        seed=1,
+        hedge_enabled=True,
+        hedge_min_samples=5,
+        hedge_max_fraction=1.0
+    )
+    backend = ScriptedBackend(clock, durations, failures)
+    scheduler = OperationScheduler(backend, settings, clock=clock, verbose=False)
+    # Порог хеджирования 10 секунд с первого задания
+    scheduler.observe_latencies([10.0] * 10)
+    events = []
+    scheduler.listeners.append(lambda event, job, **data: events.append((event, job.job_id, job.is_hedge)))
+    return scheduler, backend, events
+
+
+def test_abort_with_hedge_in_flight_yields_one_result():
+    scheduler, backend, events = make_scheduler({("j1", False): 100.0, ("j1", True): 100.0})
+
+    def abort_on_hedge(event, job, **data):
+        if event == "hedge_submitted":
+            scheduler.shutdown("abort")
+
+    scheduler.listeners.append(abort_on_hedge)
+    results = list(scheduler.run([GenerationJob(job_id="j1", image_path="a.jpg")]))
+
+    assert [(r["job_id"], r["status"]) for r in results] == [("j1", "cancelled")]
+    assert scheduler.stats["aborted"] == 1
+    assert sorted(backend.cancelled) == [("j1", False), ("j1", True)]
+    terminal = Counter(event for event, _, _ in events if event in ("completed", "failed", "skipped", "cancelled"))
+    assert terminal == {"cancelled": 1}
+    assert Counter(event for event, _, _ in events)["operation_cancelled"] == 2
+
+
+def run_one(durations, failures=()):
+    scheduler, backend, events = make_scheduler(durations, failures)
+    results = list(scheduler.run([GenerationJob(job_id="j1", image_path="a.jpg")]))
+    return scheduler, backend, events, results
+
+
+def test_hedge_wins_and_primary_is_cancelled():
+    scheduler, backend, events, results = run_one({("j1", False): 100.0, ("j1", True): 5.0})
+
+    assert [(r["status"], r["hedge"]) for r in results] == [("success", True)]
+    assert scheduler.stats["hedged"] == 1
+    assert scheduler.stats["hedge_wins"] == 1
+    assert backend.cancelled == [("j1", False)]
+    assert ("hedge_submitted", "j1", True) in events
+
+
+def test_primary_wins_and_hedge_is_cancelled():
+    scheduler, backend, events, results = run_one({("j1", False): 13.0, ("j1", True): 100.0})
+
+    assert [(r["status"], r["hedge"]) for r in results] == [("success", False)]
+    assert scheduler.stats["hedged"] == 1
+    assert scheduler.stats["hedge_wins"] == 0
+    assert backend.cancelled == [("j1", True)]
+
+
+def test_failed_copy_leaves_result_to_partner():
+    # Основная операция падает, пока дубликат еще работает: результат дает дубликат
+    scheduler, backend, events, results = run_one(
+        {("j1", False): 14.0, ("j1", True): 10.0}, failures={("j1", False)}
+    )
+
+    assert [(r["status"], r["hedge"]) for r in results] == [("success", True)]
+    assert backend.cancelled == []
+
+
+def test_failed_hedge_leaves_result_to_primary():
+    scheduler, backend, events, results = run_one(
+        {("j1", False): 20.0, ("j1", True): 2.0}, failures={("j1", True)}
+    )
+
+    assert [(r["status"], r["hedge"]) for r in results] == [("success", False)]
+    assert backend.cancelled == []
+
+
+def test_no_hedge_below_threshold():
+    scheduler, backend, events, results = run_one({("j1", False): 5.0})
+
+    assert [r["status"] for r in results] == ["success"]
+    assert scheduler.stats["hedged"] == 0
+
+
+def test_drain_finishes_started_and_skips_pending():
+    scheduler, backend, events = make_scheduler({("j1", False): 5.0, ("j2", False): 5.0})
+    scheduler.settings.hedge_enabled = False
+    scheduler.settings.max_concurrent_operations = 1
+
+    def drain_on_submit(event, job, **data):
+        if event == "submitted":
+            scheduler.shutdown("drain")
+
+    scheduler.listeners.append(drain_on_submit)
+    jobs = [GenerationJob(job_id="j1", image_path="a.jpg"), GenerationJob(job_id="j2", image_path="b.jpg")]
+    results = list(scheduler.run(jobs))
+
+    assert sorted((r["job_id"], r["status"]) for r in results) == [("j1", "success"), ("j2", "skipped")]
+    assert backend.cancelled == []
+
+
+
+@pytest.mark.parametrize("mode, timeout", [("abort", None), ("drain", 5.0)])
+def test_abort_with_only_hedge_left_reports_job(mode, timeout):
+    # Основная падает на 14 с, дубликат еще работает, остановка на 16 с
+    # (drain с истекшим сроком доработки переходит в abort тем же путем)
+    scheduler, backend, events = make_scheduler(
+        {("j1", False): 14.0, ("j1", True): 100.0}, failures={("j1", False)}
+    )
+    poll = backend.poll
+
+    def poll_and_stop(job):
+        if scheduler.clock.now() >= 16.0 and scheduler.shutdown_mode is None:
+            scheduler.shutdown(mode, timeout)
+        return poll(job)
+
+    backend.poll = poll_and_stop
+    results = list(scheduler.run([GenerationJob(job_id="j1", image_path="a.jpg")]))
+
+    assert [(r["job_id"], r["status"]) for r in results] == [("j1", "cancelled")]
+    assert scheduler.stats["aborted"] == 1
+    assert backend.cancelled == [("j1", True)]
+
+
+def test_virtual_clock_with_inbox_advances_without_real_waits():
+    # Воспроизведение кассеты: часы идут по записанному времени, реальные паузы - через sleep_func
+    sleeps = []
+    clock = VirtualClock(sleep_func=sleeps.append)
+    scheduler, backend, events = make_scheduler({("j1", False): 30.0})
+    scheduler.settings.hedge_enabled = False
+    scheduler.clock = backend.clock = clock
+    inbox, stop_event = queue.Queue(), threading.Event()
+    inbox.put(GenerationJob(job_id="j1", image_path="a.jpg"))
+    stop_event.set()
+
+    started = time.monotonic()
+    results = list(scheduler.run(inbox=inbox, stop_event=stop_event))
+
+    assert [r["status"] for r in results] == ["success"]
+    assert clock.now() >= 30.0
+    assert sum(sleeps) == clock.now()
+    assert time.monotonic() - started < 2.0
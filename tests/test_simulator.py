@@ -0,0 +1,35 @@
+"""Симулятор: рекомендации учитывают границы адаптивного окна"""
+
+from turan_scheduler import SchedulerSettings
+from turan_simulator import SimulationModel, recommend
+
+
+def test_recommend_with_aimd_sweeps_window_ceiling():
+    model = SimulationModel(generation_median=60.0, quota_concurrent_per_region=16, quota_requests_per_minute=600)
+    settings = SchedulerSettings(
+        max_concurrent_operations=4,
+        adaptive_concurrency=True,
+        concurrency_min=2,
+        concurrency_max=4,
+        region_weights={"us-central1": 1.0}
+    )
+
+    report = recommend(24, settings, model, concurrency_options=[1, 4, 8], poll_options=[10.0])
+    recommended = report["recommended"]
+
+    # Без перебора верхней границы окно AIMD не выходит за 4
+    assert report["swept"] == "concurrency_max"
+    assert recommended["concurrency_max"] == 8
+    assert recommended["max_in_flight"] > 4
+    assert recommended["max_concurrent_operations"] <= recommended["concurrency_max"]
+
+
+def test_recommend_without_aimd_sweeps_fixed_limit():
+    model = SimulationModel(generation_median=60.0, quota_concurrent_per_region=16, quota_requests_per_minute=600)
+    settings = SchedulerSettings(max_concurrent_operations=2, region_weights={"us-central1": 1.0})
+
+    report = recommend(24, settings, model, concurrency_options=[1, 8], poll_options=[10.0])
+
+    assert report["swept"] == "max_concurrent_operations"
+    assert report["recommended"]["max_concurrent_operations"] == 8
+    assert report["recommended"]["max_in_flight"] == 8
@@ -0,0 +1,163 @@
+"""Распределенная очередь: аренды, выход воркера и предел попыток"""
+
+import time
+from collections import defaultdict
+
+import pytest
+
+from turan_scheduler import OperationScheduler, SchedulerSettings
+from turan_workqueue import DistributedWorker, RedisWorkQueue, SQLiteWorkQueue, job_id_for_image
+
+
+class FakeRedis:
+    """Заглушка с подмножеством команд Redis, которое использует RedisWorkQueue"""
+
+    def __init__(self):
+        self.hashes = defaultdict(dict)
+        self.lists = defaultdict(list)
+        self.zsets = defaultdict(dict)
+
+    def hsetnx(self, key, field, value):
+        if field in self.hashes[key]:
+            return 0
+        self.hashes[key][field] = value
+        return 1
+
+    def hget(self, key, field):
+        return self.hashes[key].get(field)
+
+    def hset(self, key, field, value):
+        self.hashes[key][field] = value
+
+    def hdel(self, key, field):
+        return int(self.hashes[key].pop(field, None) is not None)
+
+    def hlen(self, key):
+        return len(self.hashes[key])
+
+    def hincrby(self, key, field, amount):
+        self.hashes[key][field] = int(self.hashes[key].get(field, 0)) + amount
+        return self.hashes[key][field]
+
+    def lpush(self, key, value):
+        self.lists[key].insert(0, value)
+
+    def rpop(self, key):
+        return self.lists[key].pop() if self.lists[key] else None
+
+    def llen(self, key):
+        return len(self.lists[key])
+
+    def zadd(self, key, mapping):
+        self.zsets[key].update(mapping)
+
+    def zrem(self, key, member):
+        return int(self.zsets[key].pop(member, None) is not None)
+
+    def zcard(self, key):
+        return len(self.zsets[key])
+
+    def zrangebyscore(self, key, low, high):
+        return [member for member, score in sorted(self.zsets[key].items(), key=lambda item: item[1]) if score <= high]
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def work_queue(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteWorkQueue(str(tmp_path / "queue.db"))
+    return RedisWorkQueue(FakeRedis())
+
+
+class InstantBackend:
+    def submit(self, job):
+        job.operation_name = f"op-{job.job_id}"
+
+    def poll(self, job):
+        return {"response": {}}
+
+    def complete(self, job, operation_result):
+        return [{"job_id": job.job_id, "source_image": job.image_path, "status": "success"}]
+
+    def fail(self, job, error):
+        return {"job_id": job.job_id, "source_image": job.image_path, "status": "error", "error": str(error)}
+
+
+class FakeConfig:
+    use_enhanced_prompts = False
+
+    def with_overrides(self, overrides=None):
+        return self
+
+
+class FakeGenerator:
+    location = "us-central1"
+
+    def create_scheduler(self, settings):
+        return OperationScheduler(InstantBackend(), settings, verbose=False)
+
+
+def make_worker(work_queue, tmp_path, **kwargs):
+    settings = SchedulerSettings(poll_interval=0.01, initial_poll_delay=0.01, region_weights={"us-central1": 1.0})
+    return DistributedWorker(
+        FakeGenerator(), work_queue, FakeConfig(), settings,
+        worker_id="w1", output_folder=str(tmp_path / "out"), idle_timeout=0.2, **kwargs
+    )
+
+
+def test_worker_waits_for_lease_of_crashed_worker(tmp_path):
+    work_queue = SQLiteWorkQueue(str(tmp_path / "queue.db"))
+    work_queue.enqueue("a", {"image_path": "a.jpg"})
+    assert work_queue.lease("crashed", ttl=1.0) is not None
+
+    started = time.monotonic()
+    stats = make_worker(work_queue, tmp_path).run()
+
+    # Воркер не уходит, пока чужая аренда не истекла, и доделывает задание
+    assert time.monotonic() - started >= 1.0
+    assert stats["completed"] == 1
+    assert work_queue.counts() == {"pending": 0, "leased": 0, "done": 1, "failed": 0}
+
+
+def test_idle_worker_exits_on_empty_queue(tmp_path):
+    work_queue = SQLiteWorkQueue(str(tmp_path / "queue.db"))
+    work_queue.enqueue("a", {"image_path": "a.jpg"})
+
+    stats = make_worker(work_queue, tmp_path).run()
+
+    assert stats == {"leased": 1, "completed": 1, "failed": 0, "lost_leases": 0}
+
+
+def test_expired_lease_returns_to_queue(work_queue):
+    work_queue.enqueue("a", {"image_path": "a.jpg"})
+    first = work_queue.lease("w1", ttl=0.05)
+    time.sleep(0.1)
+
+    second = work_queue.lease("w2", ttl=60)
+    assert second.job_id == "a" and second.attempts == 2
+    # Старый арендатор не может зафиксировать результат
+    assert not work_queue.complete(first, [])
+    assert work_queue.complete(second, [{"status": "success"}])
+
+
+def test_expired_lease_past_max_attempts_fails(work_queue):
+    # Задание роняет воркер при каждой попытке: аренда истекает без результата
+    work_queue.enqueue("a", {"image_path": "a.jpg"})
+    for attempt in (1, 2):
+        lease = work_queue.lease("w1", ttl=0.01, max_attempts=2)
+        assert lease.attempts == attempt
+        time.sleep(0.02)
+
+    assert work_queue.lease("w1", ttl=0.01, max_attempts=2) is None
+    assert work_queue.counts() == {"pending": 0, "leased": 0, "done": 0, "failed": 1}
+
+
+def test_same_image_in_two_sku_folders_gets_two_ids(tmp_path):
+    for sku in ("sku1", "sku2"):
+        (tmp_path / sku).mkdir()
+        (tmp_path / sku / "front.jpg").write_bytes(b"same image")
+
+    first = job_id_for_image(str(tmp_path / "sku1" / "front.jpg"), str(tmp_path))
+    second = job_id_for_image(str(tmp_path / "sku2" / "front.jpg"), str(tmp_path))
+
+    assert first != second
+    assert first == job_id_for_image(str(tmp_path / "sku1" / "front.jpg"), str(tmp_path))
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN Analytics - постоянное хранилище аналитики генерации
+Каждое задание (параметры, сценарий, регион, время, исход) записывается в SQLite,
+сводные гистограммы обновляются инкрементально, поэтому перцентили по стилю,
+разрешению и сценарию за все запуски считаются без повторного чтения истории.
+"""
+
+import math
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Логарифмические корзины: относительная ошибка перцентиля не больше ~2.5%
+BUCKET_GROWTH = 1.05
+BUCKET_MIN_SECONDS = 0.01
+
+# Измерения, по которым ведутся сводки
+DIMENSIONS = ("all", "style", "resolution", "scenario", "region")
+METRICS = ("generation", "download")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    job_id TEXT,
+    image_path TEXT,
+    recorded_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    region TEXT,
+    attempts INTEGER,
+    operation_name TEXT,
+    scenario_id TEXT,
+    cinematic_style TEXT,
+    lighting_mood TEXT,
+    resolution TEXT,
+    aspect_ratio TEXT,
+    model TEXT,
+    generate_audio INTEGER,
+    sample_count INTEGER,
+    videos INTEGER,
+    generation_seconds REAL,
+    download_seconds REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_recorded_at ON jobs (recorded_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_run ON jobs (run_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_scenario ON jobs (scenario_id, status);
+CREATE INDEX IF NOT EXISTS idx_jobs_style_resolution ON jobs (cinematic_style, resolution, status);
+
+CREATE TABLE IF NOT EXISTS rollup_counts (
+    dimension TEXT NOT NULL,
+    key TEXT NOT NULL,
+    jobs INTEGER NOT NULL DEFAULT 0,
+    succeeded INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimension, key)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_histogram (
+    dimension TEXT NOT NULL,
+    key TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (dimension, key, metric, bucket)
+);
+"""
+
+
+def bucket_of(seconds: float) -> int:
+    """Номер логарифмической корзины для значения времени"""
+    return max(0, math.ceil(math.log(max(seconds, BUCKET_MIN_SECONDS) / BUCKET_MIN_SECONDS, BUCKET_GROWTH)))
+
+
+def bucket_value(bucket: int) -> float:
+    """Представитель корзины (среднее геометрическое ее границ)"""
+    if bucket <= 0:
+        return BUCKET_MIN_SECONDS
+    return BUCKET_MIN_SECONDS * BUCKET_GROWTH ** (bucket - 0.5)
+
+
+def histogram_percentiles(buckets: List[tuple], quantiles=(50, 95, 99)) -> Dict[str, float]:
+    """Перцентили по отсортированным парам (корзина, количество)"""
+    total = sum(count for _, count in buckets)
+    result = {"count": total}
+    for q in quantiles:
+        if not total:
+            result[f"p{q}"] = None
+            continue
+        rank = max(1, math.ceil(total * q / 100.0))
+        seen = 0
+        for bucket, count in buckets:
+            seen += count
+            if seen >= rank:
+                result[f"p{q}"] = round(bucket_value(bucket), 2)
+                break
+    return result
+
+
+def _enum_value(value) -> Optional[str]:
+    if value is None:
+        return None
+    return str(getattr(value, "value", value))
+
+
+class AnalyticsStore:
+    """Индексированное хранилище заданий со сводками для отчетов
+
+    listener подключается к OperationScheduler и записывает завершенные
+    и проваленные задания. Запись из нескольких потоков сериализуется.
+    """
+
+    def __init__(self, path: str = "turan_analytics.db", run_id: Optional[str] = None):
+        self.path = path
+        self.run_id = run_id or time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_config(cls, config_data: dict) -> Optional["AnalyticsStore"]:
+        """Хранилище, если в learning.performance_tuning включен сбор времени или успешности"""
+        tuning = (config_data.get('learning', {}) or {}).get('performance_tuning', {}) or {}
+        if not (tuning.get('monitor_generation_times') or tuning.get('track_success_rates')):
+            return None
+        storage = config_data.get('storage', {}) or {}
+        return cls(storage.get('analytics_db', 'turan_analytics.db'))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def listener(self, event: str, job, **data):
+        """Слушатель событий планировщика"""
+        if event == "completed":
+            self.record_job(job, data.get("results", []))
+        elif event == "failed":
+            self.record_job(job, [data.get("result") or {}], error=data.get("error"))
+
+    def record_job(self, job, results: List[Dict], error: Optional[Exception] = None):
+        """Запись одного задания и инкрементальное обновление сводок"""
+        config = job.config
+        scenario = job.scenario or {}
+        succeeded = error is None and bool(results) and all(r.get("status") == "success" for r in results)
+        if error is None:
+            error = next((r.get("error") for r in results if r.get("status") == "error"), None)
+
+        generation_seconds = None
+        if job.submitted_at is not None and job.completed_at is not None:
+            generation_seconds = job.completed_at - job.submitted_at
+        downloads = [r["timings"]["download_seconds"] for r in results if "download_seconds" in (r.get("timings") or {})]
+        download_seconds = sum(downloads) if downloads else None
+
+        row = {
+            "run_id": self.run_id,
+            "job_id": job.job_id,
+            "image_path": job.image_path,
+            "recorded_at": time.time(),
+            "status": "success" if succeeded else "error",
+            "error": str(error) if error is not None else None,
+            "region": job.region,
+            "attempts": job.attempts,
+            "operation_name": job.operation_name,
+            "scenario_id": scenario.get("id") or job.scenario_id,
+            # Стиль и свет задает сценарий, конфигурация - только если сценария нет
+            "cinematic_style": _enum_value(scenario.get("cinematic_style") or getattr(config, "cinematic_style", None)),
+            "lighting_mood": _enum_value(scenario.get("lighting_mood") or getattr(config, "lighting_mood", None)),
+            "resolution": _enum_value(getattr(config, "resolution", None)),
+            "aspect_ratio": _enum_value(getattr(config, "aspect_ratio", None)),
+            "model": _enum_value(getattr(config, "model", None)),
+            "generate_audio": int(bool(getattr(config, "generate_audio", False))),
+            "sample_count": getattr(config, "sample_count", None),
+            "videos": sum(1 for r in results if r.get("status") == "success"),
+            "generation_seconds": generation_seconds,
+            "download_seconds": download_seconds
+        }
+
+        keys = {
+            "all": "all",
+            "style": row["cinematic_style"],
+            "resolution": row["resolution"],
+            "scenario": row["scenario_id"],
+            "region": row["region"]
+        }
+        metrics = {"generation": generation_seconds if succeeded else None, "download": download_seconds}
+
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN")
+                self._conn.execute(
+                    f"INSERT INTO jobs ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                    list(row.values())
+                )
+                for dimension, key in keys.items():
+                    if key is None:
+                        continue
+                    self._conn.execute(
+                        "INSERT INTO rollup_counts (dimension, key, jobs, succeeded, failed, attempts) VALUES (?, ?, 1, ?, ?, ?) "
+                        "ON CONFLICT (dimension, key) DO UPDATE SET jobs = jobs + 1, succeeded = succeeded + excluded.succeeded, "
+                        "failed = failed + excluded.failed, attempts = attempts + excluded.attempts",
+                        (dimension, key, int(succeeded), int(not succeeded), job.attempts or 0)
+                    )
+                    for metric, value in metrics.items():
+                        if value is None:
+                            continue
+                        self._conn.execute(
+                            "INSERT INTO rollup_histogram (dimension, key, metric, bucket, count) VALUES (?, ?, ?, ?, 1) "
+                            "ON CONFLICT (dimension, key, metric, bucket) DO UPDATE SET count = count + 1",
+                            (dimension, key, metric, bucket_of(value))
+                        )
+                self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                self._conn.execute("ROLLBACK")
+                logger.error(f"Ошибка записи аналитики {job.job_id}: {e}")
+
+    def percentiles(self, dimension: str = "all", metric: str = "generation") -> Dict[str, Dict]:
+        """p50/p95/p99 из сводных гистограмм: {ключ: {count, p50, p95, p99}}"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, bucket, count FROM rollup_histogram WHERE dimension = ? AND metric = ? ORDER BY key, bucket",
+                (dimension, metric)
+            ).fetchall()
+        grouped: Dict[str, List[tuple]] = {}
+        for key, bucket, count in rows:
+            grouped.setdefault(key, []).append((bucket, count))
+        return {key: histogram_percentiles(buckets) for key, buckets in grouped.items()}
+
+    def success_rates(self, dimension: str = "all") -> Dict[str, Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, jobs, succeeded, failed, attempts FROM rollup_counts WHERE dimension = ? ORDER BY key",
+                (dimension,)
+            ).fetchall()
+        return {
+            key: {
+                "jobs": jobs,
+                "succeeded": succeeded,
+                "failed": failed,
+                "success_rate": round(succeeded / jobs * 100, 1) if jobs else 0.0,
+                "avg_attempts": round(attempts / jobs, 2) if jobs else 0.0
+            }
+            for key, jobs, succeeded, failed, attempts in rows
+        }
+
+    def recent_timings(self, limit: int = 1000, resolution: Optional[str] = None) -> Dict[str, List[float]]:
+        """Последние успешные значения времени (эмпирическая история для симулятора)"""
+        query = "SELECT generation_seconds, download_seconds FROM jobs WHERE status = 'success' AND generation_seconds IS NOT NULL"
+        params: list = []
+        if resolution:
+            query += " AND resolution = ?"
+            params.append(resolution)
+        query += " ORDER BY recorded_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return {
+            "generation_times": [generation for generation, _ in rows],
+            "download_times": [download for _, download in rows if download is not None]
+        }
+
+    def report(self) -> Dict:
+        """Сводка за все запуски для отчета о производительности"""
+        with self._lock:
+            runs = self._conn.execute("SELECT COUNT(DISTINCT run_id) FROM jobs").fetchone()[0]
+        return {
+            "database": self.path,
+            "runs": runs,
+            "success_rates": {dimension: self.success_rates(dimension) for dimension in DIMENSIONS},
+            "generation_seconds": {dimension: self.percentiles(dimension, "generation") for dimension in DIMENSIONS},
+            "download_seconds": {dimension: self.percentiles(dimension, "download") for dimension in DIMENSIONS}
+        }
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN Campaign - манифест кампании с настройками для каждого изображения
+Строка манифеста указывает изображение и может переопределить любое поле
+VideoGenerationConfig, а также custom_prompt, scenario_id, output_folder
+и storage_uri. Форматы: JSONL (объект в строке), CSV (столбцы) и YAML
+(список строк или {defaults: ..., rows: [...]}). JSONL и CSV читаются
+потоково, поэтому размер кампании не ограничен памятью.
+"""
+
+import csv
+import json
+import logging
+import os
+from typing import Dict, Iterator, Optional, Tuple
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+CAMPAIGN_FORMATS = ('.jsonl', '.csv', '.yaml', '.yml')
+IMAGE_KEYS = ("image", "image_path")
+# Поля строки, которые не являются параметрами VideoGenerationConfig
+ROW_KEYS = ("job_id", "custom_prompt", "scenario_id", "output_folder", "storage_uri", "config") + IMAGE_KEYS
+
+
+@dataclass
+class CampaignRow:
+    """Строка манифеста кампании (error - строка не может быть выполнена)"""
+    number: int
+    job_id: str
+    image_path: str = ""
+    overrides: Dict = field(default_factory=dict)
+    custom_prompt: Optional[str] = None
+    scenario_id: Optional[str] = None
+    output_folder: Optional[str] = None
+    storage_uri: Optional[str] = None
+    error: Optional[str] = None
+
+    def to_result(self, error: Optional[str] = None) -> Dict:
+        """Запись для отчета генерации (статус rejected)"""
+        return {
+            "job_id": self.job_id,
+            "source_image": self.image_path,
+            "status": "rejected",
+            "error": error or self.error,
+            "campaign_row": self.number
+        }
+
+
+def _cell(value: str):
+    """Значение ячейки CSV: true/false и целые числа приводятся к типу"""
+    text = value.strip()
+    if text.lower() in ("true", "yes"):
+        return True
+    if text.lower() in ("false", "no"):
+        return False
+    if text.lstrip('-').isdigit():
+        return int(text)
+    return text
+
+
+def _raw_rows(path: str) -> Iterator[Tuple[int, Dict, Dict]]:
+    """(номер строки, значения, общие значения по умолчанию) в порядке файла"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in CAMPAIGN_FORMATS:
+        raise ValueError(f"Неподдерживаемый формат манифеста {extension}, ожидается {', '.join(CAMPAIGN_FORMATS)}")
+
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if extension == '.jsonl':
+            for number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    row = {"_error": f"Некорректный JSON: {e}"}
+                yield number, row if isinstance(row, dict) else {"_error": "Строка должна быть объектом"}, {}
+        elif extension == '.csv':
+            # Номер строки файла: заголовок - строка 1
+            for number, row in enumerate(csv.DictReader(f), 2):
+                yield number, {
+                    key.strip(): value if key.strip() in ROW_KEYS else _cell(value)
+                    for key, value in row.items()
+                    if key and value is not None and value.strip() != ""
+                }, {}
+        else:
+            import yaml
+
+            data = yaml.safe_load(f) or []
+            defaults = {}
+            if isinstance(data, dict):
+                defaults = data.get("defaults") or {}
+                data = data.get("rows") or []
+            for number, row in enumerate(data, 1):
+                yield number, row if isinstance(row, dict) else {"_error": "Строка должна быть объектом"}, defaults
+
+
+def _config_overrides(value) -> Tuple[Dict, Optional[str]]:
+    """Вложенный config строки: объект или JSON строка (столбец CSV); (параметры, ошибка)"""
+    if isinstance(value, str):
+        if not value.strip():
+            return {}, None
+        try:
+            value = json.loads(value)
+        except ValueError as e:
+            return {}, f"Некорректный JSON в config: {e}"
+    if value is None:
+        return {}, None
+    if not isinstance(value, dict):
+        return {}, "config должен быть объектом"
+    return dict(value), None
+
+
+def _parse_row(number: int, raw: Dict, defaults: Dict, base_dir: str) -> CampaignRow:
+    values = {**defaults, **raw}
+    image = next((values[key] for key in IMAGE_KEYS if values.get(key)), "")
+    image_path = str(image)
+    if image_path and not os.path.isabs(image_path):
+        # Относительные пути считаются от папки манифеста
+        image_path = os.path.normpath(os.path.join(base_dir, image_path))
+    row = CampaignRow(
+        number=number,
+        job_id=str(values.get("job_id") or f"row-{number}"),
+        image_path=image_path,
+        custom_prompt=values.get("custom_prompt"),
+        scenario_id=values.get("scenario_id"),
+        output_folder=values.get("output_folder"),
+        storage_uri=values.get("storage_uri")
+    )
+    # Параметры генерации: вложенный объект config и/или поля верхнего уровня
+    overrides, config_error = _config_overrides(values.get("config"))
+    if "_error" in raw:
+        row.error = raw["_error"]
+    elif not image:
+        row.error = "Не указано изображение (image)"
+    elif config_error:
+        row.error = config_error
+
+    for key, value in values.items():
+        if key not in ROW_KEYS and not key.startswith('_'):
+            overrides[key] = value
+    row.overrides = overrides
+    return row
+
+
+def iter_campaign(path: str) -> Iterator[CampaignRow]:
+    """Строки манифеста кампании по порядку; ошибки строки - в CampaignRow.error
+
+    Поля, начинающиеся с '_', игнорируются (заметки, комментарии в CSV).
+    """
+    base_dir = os.path.dirname(os.path.abspath(path))
+    job_ids = set()
+    for number, raw, defaults in _raw_rows(path):
+        row = _parse_row(number, raw, defaults, base_dir)
+        if row.job_id in job_ids and not row.error:
+            row.error = f"Повторяющийся job_id: {row.job_id}"
+        job_ids.add(row.job_id)
+        yield row
+
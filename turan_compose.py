@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN Compose - сборка 15/30-секундных роликов из 8-секундных клипов Veo
+Клипы одного товара (разные сценарии) склеиваются без перекодирования
+(concat demuxer, -c copy), если у всех совпадают кодеки и параметры потоков
+по ffprobe. Иначе выполняется одно перекодирование через фильтр concat
+со всеми потоками процессора. Разные товары собираются параллельно.
+"""
+
+import os
+import json
+import math
+import logging
+import tempfile
+import subprocess
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+from turan_postprocess import PostProcessSettings, run_ffmpeg
+from turan_results import COMPOSITION_RECORD
+
+logger = logging.getLogger(__name__)
+
+CLIP_SECONDS = 8
+COMPOSITION_FOLDER = "compositions"
+# Параметры потоков, которые должны совпадать для склейки без перекодирования
+VIDEO_KEYS = ("codec_name", "profile", "width", "height", "pix_fmt", "r_frame_rate", "time_base")
+AUDIO_KEYS = ("codec_name", "profile", "sample_rate", "channels", "channel_layout")
+
+
+def probe_streams(path: str, ffprobe: str = "ffprobe", timeout: float = 60.0) -> Dict:
+    """Сигнатура клипа: параметры видео и аудио потоков (аудио None, если его нет)"""
+    completed = subprocess.run(
+        [ffprobe, "-v", "error", "-show_streams", "-of", "json", path],
+        capture_output=True, text=True, timeout=timeout
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"ffprobe {path}: {completed.stderr.strip() or completed.returncode}")
+    streams = json.loads(completed.stdout or "{}").get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    if video is None:
+        raise RuntimeError(f"В {path} нет видео потока")
+    return {
+        "video": tuple(video.get(key) for key in VIDEO_KEYS),
+        "audio": tuple(audio.get(key) for key in AUDIO_KEYS) if audio else None,
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "frame_rate": video.get("r_frame_rate", "24/1")
+    }
+
+
+def _concat_list(paths: List[str]) -> str:
+    """Файл списка для concat demuxer (кавычки в путях экранируются)"""
+    handle, list_path = tempfile.mkstemp(prefix="turan_concat_", suffix=".txt")
+    with os.fdopen(handle, 'w', encoding='utf-8') as f:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    return list_path
+
+
+def _reencode_args(paths: List[str], signatures: List[Dict], duration: Optional[float]) -> List[str]:
+    """Аргументы одного перекодирования: приведение к размеру и fps первого клипа"""
+    width, height = signatures[0]["width"], signatures[0]["height"]
+    frame_rate = signatures[0]["frame_rate"]
+    with_audio = all(signature["audio"] is not None for signature in signatures)
+    if not with_audio:
+        logger.warning("Не во всех клипах есть звук, ролик собирается без звука")
+
+    args: List[str] = []
+    for path in paths:
+        args += ["-i", path]
+    filters, inputs = [], ""
+    for index in range(len(paths)):
+        filters.append(
+            f"[{index}:v]scale={width}:{height}:force_original_aspect_ratio=decrease,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={frame_rate}[v{index}]"
+        )
+        inputs += f"[v{index}]" + (f"[{index}:a]" if with_audio else "")
+    filters.append(f"{inputs}concat=n={len(paths)}:v=1:a={1 if with_audio else 0}[v]" + ("[a]" if with_audio else ""))
+    args += ["-filter_complex", ";".join(filters), "-map", "[v]"]
+    if with_audio:
+        args += ["-map", "[a]", "-c:a", "aac", "-b:a", "192k"]
+    args += ["-c:v", "libx264", "-preset", "medium", "-crf", "18", "-pix_fmt", "yuv420p", "-threads", "0"]
+    if duration:
+        args += ["-t", str(duration)]
+    return args + ["-movflags", "+faststart"]
+
+
+def compose_clips(
+    paths: List[str],
+    output_path: str,
+    duration: Optional[float] = None,
+    settings: Optional[PostProcessSettings] = None
+) -> Dict:
+    """Склейка клипов в один ролик, запись о сборке для отчета
+
+    duration обрезает ролик до точной длины (2 клипа по 8 с -> 15 с).
+    Обрезка конца не требует ключевого кадра, поэтому возможна и при -c copy.
+    """
+    settings = settings or PostProcessSettings()
+    signatures = [probe_streams(path, settings.ffprobe) for path in paths]
+    reference = (signatures[0]["video"], signatures[0]["audio"])
+    compatible = all((signature["video"], signature["audio"]) == reference for signature in signatures)
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    if compatible:
+        list_path = _concat_list(paths)
+        try:
+            args = ["-f", "concat", "-safe", "0", "-i", list_path, "-map", "0", "-c", "copy"]
+            if duration:
+                args += ["-t", str(duration)]
+            run_ffmpeg(settings.ffmpeg, args + ["-movflags", "+faststart"], output_path, settings.timeout)
+        finally:
+            os.remove(list_path)
+        method = "stream_copy"
+    else:
+        logger.info("Параметры клипов различаются, перекодирование: %s", output_path)
+        run_ffmpeg(settings.ffmpeg, _reencode_args(paths, signatures, duration), output_path, settings.timeout)
+        method = "reencode"
+
+    return {
+        "output": output_path,
+        "clips": list(paths),
+        "method": method,
+        "duration_seconds": duration or CLIP_SECONDS * len(paths)
+    }
+
+
+def plan_compositions(results: Iterable[Dict], seconds: int) -> Tuple[Dict[str, List[Dict]], Dict[str, int]]:
+    """Клипы для роликов длиной seconds: по товару (исходному изображению) разные сценарии
+
+    Возвращает ({изображение: клипы}, {изображение: сколько клипов не хватает}).
+    """
+    needed = max(1, math.ceil(seconds / CLIP_SECONDS))
+    clips: Dict[str, List[Dict]] = {}
+    for result in results:
+        if result.get("status") != "success" or result.get("tier") == "preview":
+            continue
+        local_path = result.get("local_path")
+        if not local_path or not os.path.isfile(local_path):
+            continue
+        chosen = clips.setdefault(result["source_image"], [])
+        if len(chosen) < needed and all(clip.get("scenario_id") != result.get("scenario_id") for clip in chosen):
+            chosen.append(result)
+    ready = {image: chosen for image, chosen in clips.items() if len(chosen) == needed}
+    missing = {image: needed - len(chosen) for image, chosen in clips.items() if len(chosen) < needed}
+    return ready, missing
+
+
+def compose_products(
+    results: Iterable[Dict],
+    output_folder: str,
+    seconds: int,
+    settings: Optional[PostProcessSettings] = None
+) -> Iterator[Dict]:
+    """Ролики seconds секунд для всех товаров с достаточным числом клипов (параллельно)"""
+    settings = settings or PostProcessSettings()
+    ready, missing = plan_compositions(results, seconds)
+    for image, count in missing.items():
+        logger.warning(f"Для {image} не хватает {count} клипов с другими сценариями, ролик {seconds}s не собран")
+
+    def compose(item: Tuple[str, List[Dict]]) -> Dict:
+        image, clips = item
+        # Подпапки товаров повторяются: одинаковые имена файлов в разных SKU не конфликтуют
+        clip_folder = os.path.relpath(os.path.dirname(clips[0]["local_path"]), output_folder)
+        if clip_folder.startswith(os.pardir):
+            clip_folder = ""
+        name = f"{os.path.splitext(os.path.basename(image))[0]}_{seconds}s.mp4"
+        output_path = os.path.normpath(os.path.join(output_folder, COMPOSITION_FOLDER, clip_folder, name))
+        record = {
+            "record": COMPOSITION_RECORD,
+            "source_image": image,
+            "scenario_ids": [clip.get("scenario_id") for clip in clips],
+            "target_seconds": seconds
+        }
+        try:
+            record.update(compose_clips([clip["local_path"] for clip in clips], output_path, seconds, settings))
+            record["status"] = "success"
+        except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired) as e:
+            logger.error(f"Сборка ролика для {image} не удалась: {e}")
+            record.update(status="error", error=str(e))
+        return record
+
+    with ThreadPoolExecutor(max_workers=settings.workers, thread_name_prefix="turan-compose") as pool:
+        yield from pool.map(compose, ready.items())
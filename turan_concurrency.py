@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN Concurrency - адаптивный лимит одновременных операций Veo (AIMD)
+Окно растет аддитивно, пока отправка проходит быстро и без ошибок,
+и сокращается мультипликативно на 429/5xx, оставаясь в границах из конфигурации.
+"""
+
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AIMDController:
+    """Окно одновременных операций по схеме additive increase / multiplicative decrease
+
+    Каждая успешная быстрая отправка добавляет increase / window, то есть окно
+    растет примерно на increase за каждое окно успешных отправок. Сигнал перегрузки
+    умножает окно на decrease не чаще одного раза за cooldown секунд, чтобы серия
+    429 от одной перегрузки не обрушила окно до минимума.
+    """
+
+    def __init__(
+        self,
+        initial: float = 2,
+        minimum: int = 1,
+        maximum: int = 8,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_threshold: Optional[float] = 5.0,
+        cooldown: float = 5.0,
+        verbose: bool = True
+    ):
+        if minimum < 1 or maximum < minimum:
+            raise ValueError(f"Некорректные границы окна: {minimum}..{maximum}")
+        if not 0 < decrease < 1:
+            raise ValueError(f"Коэффициент сокращения должен быть в (0, 1): {decrease}")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_threshold = latency_threshold
+        self.cooldown = cooldown
+        self.verbose = verbose
+        self.window = float(min(max(initial, minimum), maximum))
+        self._last_decrease: Optional[float] = None
+        self.stats = {"increases": 0, "decreases": 0, "slow_submits": 0, "congestion_signals": 0}
+
+    @classmethod
+    def from_settings(cls, settings, verbose: bool = True) -> "AIMDController":
+        """Контроллер из SchedulerSettings (max_concurrent_operations - начальное окно)"""
+        return cls(
+            initial=settings.max_concurrent_operations,
+            minimum=settings.concurrency_min,
+            maximum=settings.concurrency_max,
+            increase=settings.concurrency_increase,
+            decrease=settings.concurrency_decrease,
+            latency_threshold=settings.submit_latency_threshold,
+            cooldown=settings.retry_delay,
+            verbose=verbose
+        )
+
+    @property
+    def limit(self) -> int:
+        """Текущий лимит одновременных операций"""
+        return max(self.minimum, min(self.maximum, int(self.window)))
+
+    def on_success(self, latency: float):
+        """Успешная отправка: рост окна, если задержка в норме"""
+        if self.latency_threshold is not None and latency > self.latency_threshold:
+            self.stats["slow_submits"] += 1
+            return
+        if self.window < self.maximum:
+            previous = self.limit
+            self.window = min(float(self.maximum), self.window + self.increase / max(self.window, 1.0))
+            self.stats["increases"] += 1
+            if self.limit != previous and self.verbose:
+                logger.info("Окно параллелизма увеличено: %s -> %s", previous, self.limit)
+
+    def on_congestion(self, now: float):
+        """429/5xx: мультипликативное сокращение окна"""
+        self.stats["congestion_signals"] += 1
+        if self._last_decrease is not None and now - self._last_decrease < self.cooldown:
+            return
+        previous = self.limit
+        self.window = max(float(self.minimum), self.window * self.decrease)
+        self._last_decrease = now
+        self.stats["decreases"] += 1
+        if self.verbose:
+            logger.warning("Перегрузка API, окно параллелизма сокращено: %s -> %s", previous, self.limit)
+
+    def metrics(self) -> Dict:
+        return {
+            "window": round(self.window, 2),
+            "limit": self.limit,
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            **self.stats
+        }
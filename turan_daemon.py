@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN Daemon - резидентный режим генератора
+Задания принимаются через локальный HTTP API (TCP или Unix socket) и из spool папки
+и выполняются общим планировщиком с прогретыми сессиями и токенами.
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import logging
+import threading
+import socketserver
+from typing import Dict, List, Optional
+from pathlib import Path
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from turan_scheduler import SchedulerSettings, GenerationJob
+from turan_results import JsonlResultWriter
+from turan_watch import FileSettler
+
+logger = logging.getLogger(__name__)
+
+
+class JobService:
+    """Очередь заданий поверх одного генератора и одного планировщика"""
+
+    def __init__(
+        self,
+        generator,
+        base_config,
+        settings: Optional[SchedulerSettings] = None,
+        output_folder: str = "output/daemon",
+        storage_uri: Optional[str] = None,
+        max_history: int = 10000
+    ):
+        self.generator = generator
+        self.base_config = base_config
+        self.output_folder = output_folder
+        self.storage_uri = storage_uri
+        self.max_history = max_history
+
+        self.inbox: queue.Queue = queue.Queue()
+        self.stop_event = threading.Event()
+        self.scheduler = generator.create_scheduler(settings)
+        self.scheduler.listeners.append(self._on_event)
+
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self.started_at = time.time()
+
+    def submit(self, spec: Dict) -> str:
+        """Постановка задания: image_path, output_folder, custom_prompt, storage_uri, config"""
+        if not isinstance(spec, dict):
+            raise ValueError("Спецификация задания должна быть JSON объектом")
+        if spec.get("config") is not None and not isinstance(spec["config"], dict):
+            raise ValueError("config должен быть JSON объектом")
+        image_path = spec.get("image_path")
+        if not image_path:
+            raise ValueError("Не указан image_path")
+        if not Path(image_path).is_file():
+            raise ValueError(f"Изображение не найдено: {image_path}")
+
+        job_id = spec.get("job_id") or uuid.uuid4().hex[:12]
+        output_folder = spec.get("output_folder") or self.output_folder
+        Path(output_folder).mkdir(parents=True, exist_ok=True)
+
+        job = GenerationJob(
+            job_id=job_id,
+            image_path=str(image_path),
+            output_folder=str(output_folder),
+            config=self.base_config.with_overrides(spec.get("config")),
+            custom_prompt=spec.get("custom_prompt"),
+            storage_uri=spec.get("storage_uri") or self.storage_uri
+        )
+
+        with self._lock:
+            if job_id in self._jobs:
+                raise ValueError(f"Задание уже существует: {job_id}")
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "image_path": job.image_path,
+                "status": "queued",
+                "accepted_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "results": []
+            }
+            self._trim_history()
+
+        self.inbox.put(job)
+        logger.info("Задание принято: %s (%s)", job_id, image_path)
+        return job_id
+
+    def _trim_history(self):
+        while len(self._jobs) > self.max_history:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest["status"] not in ("done", "failed", "skipped", "cancelled"):
+                break
+            del self._jobs[oldest_id]
+
+    def _on_event(self, event: str, job: GenerationJob, **data):
+        with self._lock:
+            entry = self._jobs.get(job.job_id)
+            if entry is None:
+                return
+            if event == "submitted":
+                entry["status"] = "running"
+                entry["operation_name"] = job.operation_name
+                entry["region"] = job.region
+            elif event == "retry":
+                entry["status"] = "queued"
+            elif event == "completed":
+                entry["results"].extend(data.get("results", []))
+                failed = any(r.get("status") == "error" for r in entry["results"])
+                entry["status"] = "failed" if failed else "done"
+            elif event == "failed":
+                entry["results"].append(data.get("result"))
+                entry["status"] = "failed"
+            elif event in ("skipped", "cancelled"):
+                # Остановка демона до отправки или с отменой операции
+                entry["results"].append(data.get("result"))
+                entry["status"] = event
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            return json.loads(json.dumps(entry, default=str)) if entry else None
+
+    def list_jobs(self) -> List[Dict]:
+        with self._lock:
+            return [
+                {key: entry[key] for key in ("job_id", "image_path", "status", "accepted_at")}
+                for entry in self._jobs.values()
+            ]
+
+    def health(self) -> Dict:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for entry in self._jobs.values():
+                counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return {
+            "status": "stopping" if self.stop_event.is_set() else "ok",
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "jobs": counts,
+            "scheduler": dict(self.scheduler.stats),
+            "concurrency": self.scheduler.controller.metrics() if self.scheduler.controller else None
+        }
+
+    def _run(self):
+        results_path = Path(self.output_folder) / "daemon_results.jsonl"
+        with JsonlResultWriter(str(results_path), scenario_lookup=self.generator.used_scenario, append=True) as writer:
+            for result in self.scheduler.run(inbox=self.inbox, stop_event=self.stop_event):
+                writer.write(result)
+            # Принятые, но не забранные планировщиком до остановки
+            while True:
+                try:
+                    job = self.inbox.get_nowait()
+                except queue.Empty:
+                    break
+                writer.write(self.scheduler.skip(job))
+
+    def start(self):
+        self._worker = threading.Thread(target=self._run, name="turan-scheduler", daemon=True)
+        self._worker.start()
+
+    def stop(self, timeout: Optional[float] = None, mode: Optional[str] = None):
+        """Прекращение приема заданий и остановка планировщика
+
+        Режим и срок доработки - из performance.shutdown (как у graceful_shutdown
+        в CLI): drain дорабатывает начатые операции, а не весь принятый список,
+        abort отменяет их. Повторный Ctrl-C во время ожидания переводит остановку в abort.
+        """
+        settings = self.scheduler.settings
+        self.stop_event.set()
+        self.scheduler.shutdown(mode or settings.shutdown_mode, settings.drain_timeout)
+        if self._worker is None:
+            return
+        try:
+            self._worker.join(timeout)
+        except KeyboardInterrupt:
+            self.scheduler.shutdown("abort")
+            self._worker.join(timeout)
+
+
+class SpoolWatcher(threading.Thread):
+    """Прием заданий из spool папки: *.json файлы со спецификацией задания
+
+    Файл читается, когда его размер и mtime не меняются settle_seconds
+    (запись завершена). Принятые файлы переносятся в accepted/, некорректные - в rejected/.
+    """
+
+    def __init__(self, service: JobService, spool_dir: str, interval: float = 2.0, settle_seconds: float = 2.0):
+        super().__init__(name="turan-spool", daemon=True)
+        self.service = service
+        self.spool_dir = Path(spool_dir)
+        self.interval = interval
+        self.settler = FileSettler(settle_seconds)
+        for name in ("accepted", "rejected"):
+            (self.spool_dir / name).mkdir(parents=True, exist_ok=True)
+
+    def _move(self, path: Path, folder: str):
+        try:
+            os.replace(path, self.spool_dir / folder / path.name)
+        except OSError as e:
+            logger.error(f"Не удалось перенести {path.name} в {folder}/: {e}")
+
+    def scan_once(self, now: Optional[float] = None) -> int:
+        for path in self.spool_dir.glob("*.json"):
+            if str(path) not in self.settler:
+                self.settler.touch(str(path), now)
+        accepted = 0
+        for name in self.settler.ready(now):
+            path = Path(name)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    spec = json.load(f)
+                if not isinstance(spec, dict):
+                    raise ValueError("Спецификация задания должна быть JSON объектом")
+                spec.setdefault("job_id", path.stem)
+                self.service.submit(spec)
+            except Exception as e:
+                # Ошибка одного файла не останавливает прием остальных
+                logger.error(f"Задание из spool отклонено {path.name}: {e}")
+                self._move(path, "rejected")
+                continue
+            self._move(path, "accepted")
+            accepted += 1
+        return accepted
+
+    def run(self):
+        while not self.service.stop_event.is_set():
+            self.scan_once()
+            self.service.stop_event.wait(self.interval)
+
+
+def _make_handler(service: JobService):
+    class JobRequestHandler(BaseHTTPRequestHandler):
+        """POST /jobs, GET /jobs, GET /jobs/<id>, GET /health"""
+
+        def _send(self, code: int, payload):
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, service.health())
+            elif self.path == "/jobs":
+                self._send(200, service.list_jobs())
+            elif self.path.startswith("/jobs/"):
+                entry = service.status(self.path[len("/jobs/"):])
+                if entry:
+                    self._send(200, entry)
+                else:
+                    self._send(404, {"error": "Задание не найдено"})
+            else:
+                self._send(404, {"error": "Неизвестный путь"})
+
+        def do_POST(self):
+            if self.path != "/jobs":
+                self._send(404, {"error": "Неизвестный путь"})
+                return
+            if service.stop_event.is_set():
+                self._send(503, {"error": "Демон останавливается"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                spec = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(spec, dict):
+                    raise ValueError("Тело запроса должно быть JSON объектом")
+                job_id = service.submit(spec)
+            except (ValueError, TypeError, AttributeError) as e:
+                # Некорректные поля config (with_overrides) - тоже ошибка клиента
+                self._send(400, {"error": str(e)})
+                return
+            self._send(202, {"job_id": job_id, "status": "queued"})
+
+        def address_string(self):
+            return str(self.client_address or "unix")
+
+        def log_message(self, format, *args):
+            logger.debug("HTTP %s - %s", self.address_string(), format % args)
+
+    return JobRequestHandler
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP сервер на Unix socket"""
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, "unix"
+
+
+def create_server(service: JobService, host: str = "127.0.0.1", port: int = 8765, socket_path: Optional[str] = None):
+    """HTTP сервер API: Unix socket, если указан socket_path, иначе локальный TCP порт"""
+    handler = _make_handler(service)
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = ThreadingUnixHTTPServer(socket_path, handler)
+        os.chmod(socket_path, 0o600)
+        logger.info("API демона: unix://%s", socket_path)
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        logger.info("API демона: http://%s:%s", host, port)
+    return server
+
+
+def serve(service: JobService, server, spool_dir: Optional[str] = None):
+    """Запуск демона до прерывания (Ctrl-C / SIGTERM)"""
+    service.start()
+    watcher = None
+    if spool_dir:
+        watcher = SpoolWatcher(service, spool_dir)
+        watcher.start()
+        logger.info("Spool папка: %s", spool_dir)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Остановка демона: %s", service.scheduler.settings.shutdown_mode)
+    finally:
+        server.server_close()
+        if isinstance(server, ThreadingUnixHTTPServer):
+            try:
+                os.unlink(server.server_address)
+            except OSError:
+                pass
+        service.stop()
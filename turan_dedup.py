@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN Dedup - поиск почти одинаковых входных изображений
+Перцептивные хеши (DCT pHash) считаются векторно в NumPy пакетами в пуле процессов,
+сохраняются в SQLite индексе между запусками и ищутся по расстоянию Хэмминга в BK-дереве.
+От каждой группы почти одинаковых снимков генерируется только один представитель.
+
+Требует numpy и Pillow (опциональные зависимости).
+"""
+
+import os
+import math
+import sqlite3
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8          # 8x8 низкочастотных коэффициентов -> 64 бита
+SAMPLE_SIZE = 32       # изображение сжимается до 32x32 перед DCT
+BATCH_SIZE = 64        # изображений на одну задачу пула процессов
+DEFAULT_RADIUS = 6     # порог расстояния Хэмминга для "почти одинаковых"
+DEFAULT_INDEX = "turan_hash_index.db"
+
+_DCT_MATRIX = None
+
+
+def _dct_matrix(n: int):
+    """Матрица DCT-II (ортонормированная) размера n x n"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * math.sqrt(2.0 / n)
+    matrix[0] /= math.sqrt(2.0)
+    return matrix.astype(np.float32)
+
+
+def _load_gray(path: str):
+    """Изображение в оттенках серого SAMPLE_SIZE x SAMPLE_SIZE с учетом EXIF ориентации"""
+    with Image.open(path) as image:
+        # draft работает только до декодирования: после exif_transpose это уже копия пикселей
+        image.draft("L", (SAMPLE_SIZE * 4, SAMPLE_SIZE * 4))  # быстрое JPEG уменьшение при чтении
+        image = ImageOps.exif_transpose(image)
+        gray = image.convert("L").resize((SAMPLE_SIZE, SAMPLE_SIZE), Image.LANCZOS)
+        return np.asarray(gray, dtype=np.float32)
+
+
+def phash_batch(pixels) -> List[int]:
+    """pHash для пакета (B, 32, 32): 2D DCT одним einsum, порог по медиане"""
+    global _DCT_MATRIX
+    if _DCT_MATRIX is None:
+        _DCT_MATRIX = _dct_matrix(SAMPLE_SIZE)
+    dct = _DCT_MATRIX
+
+    coefficients = np.einsum("ij,bjk,lk->bil", dct, pixels, dct, optimize=True)
+    low = coefficients[:, :HASH_SIZE, :HASH_SIZE].reshape(len(pixels), -1)
+    # Медиана без постоянной составляющей (DC), как в классическом pHash
+    medians = np.median(low[:, 1:], axis=1, keepdims=True)
+    bits = np.packbits(low > medians, axis=1)
+    return [int.from_bytes(row.tobytes(), "big") for row in bits]
+
+
+def _hash_files(paths: List[str]) -> List[Tuple[str, Optional[int]]]:
+    """Задача пула: чтение пакета изображений и векторный расчет хешей"""
+    loaded, failed = [], []
+    for path in paths:
+        try:
+            loaded.append((path, _load_gray(path)))
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать изображение для хеша {path}: {e}")
+            failed.append((path, None))
+    if not loaded:
+        return failed
+    hashes = phash_batch(np.stack([pixels for _, pixels in loaded]))
+    return [(path, value) for (path, _), value in zip(loaded, hashes)] + failed
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """BK-дерево по расстоянию Хэмминга для поиска в радиусе"""
+
+    def __init__(self):
+        self._root: Optional[list] = None  # [hash, items, {distance: child}]
+        self.size = 0
+
+    def add(self, value: int, item):
+        self.size += 1
+        if self._root is None:
+            self._root = [value, [item], {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value: int, radius: int) -> List[Tuple[int, object]]:
+        """Все элементы на расстоянии не больше radius: [(расстояние, элемент)]"""
+        found = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= radius:
+                found.extend((distance, item) for item in node[1])
+            for edge, child in node[2].items():
+                if distance - radius <= edge <= distance + radius:
+                    stack.append(child)
+        return found
+
+
+class HashIndex:
+    """Постоянный индекс хешей: пересчитываются только новые и измененные файлы"""
+
+    def __init__(self, path: str = DEFAULT_INDEX):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS image_hashes (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                phash INTEGER NOT NULL
+            )
+        """)
+
+    @staticmethod
+    def _to_signed(value: int) -> int:
+        return value - (1 << 64) if value >= 1 << 63 else value
+
+    @staticmethod
+    def _to_unsigned(value: int) -> int:
+        return value + (1 << 64) if value < 0 else value
+
+    def lookup(self, paths: Iterable[str]) -> Tuple[Dict[str, int], List[str]]:
+        """Хеши из индекса для неизмененных файлов и список файлов для пересчета"""
+        known, missing = {}, []
+        for path in paths:
+            stat = os.stat(path)
+            row = self._conn.execute(
+                "SELECT phash FROM image_hashes WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns)
+            ).fetchone()
+            if row is None:
+                missing.append(path)
+            else:
+                known[path] = self._to_unsigned(row[0])
+        return known, missing
+
+    def store(self, hashes: Dict[str, int]):
+        rows = []
+        for path, value in hashes.items():
+            stat = os.stat(path)
+            rows.append((str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns, self._to_signed(value)))
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO image_hashes (path, size, mtime_ns, phash) VALUES (?, ?, ?, ?)",
+                rows
+            )
+
+    def close(self):
+        self._conn.close()
+
+
+def compute_hashes(paths: List[str], index: Optional[HashIndex] = None, workers: Optional[int] = None) -> Dict[str, int]:
+    """Хеши изображений: из индекса или пакетами в пуле процессов"""
+    known, missing = index.lookup(paths) if index is not None else ({}, list(paths))
+    if not missing:
+        return known
+
+    batches = [missing[i:i + BATCH_SIZE] for i in range(0, len(missing), BATCH_SIZE)]
+    computed: Dict[str, int] = {}
+    if len(batches) == 1 or workers == 1:
+        results = map(_hash_files, batches)
+        for batch in results:
+            computed.update((path, value) for path, value in batch if value is not None)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for batch in pool.map(_hash_files, batches):
+                computed.update((path, value) for path, value in batch if value is not None)
+
+    if index is not None and computed:
+        index.store(computed)
+    logger.info("Перцептивные хеши: %s из индекса, %s рассчитано", len(known), len(computed))
+    return {**known, **computed}
+
+
+def cluster_duplicates(hashes: Dict[str, int], radius: int = DEFAULT_RADIUS) -> List[List[str]]:
+    """Группы почти одинаковых изображений (связность по радиусу), представитель первым
+
+    Представитель - самый большой файл группы (обычно исходник с лучшим качеством).
+    """
+    tree = BKTree()
+    for path, value in hashes.items():
+        tree.add(value, path)
+
+    parent = {path: path for path in hashes}
+
+    def find(path: str) -> str:
+        while parent[path] != path:
+            parent[path] = parent[parent[path]]
+            path = parent[path]
+        return path
+
+    for path, value in hashes.items():
+        for _, other in tree.search(value, radius):
+            root_a, root_b = find(path), find(other)
+            if root_a != root_b:
+                parent[root_b] = root_a
+
+    groups: Dict[str, List[str]] = {}
+    for path in hashes:
+        groups.setdefault(find(path), []).append(path)
+
+    def quality(path: str):
+        return (-os.path.getsize(path), path)
+
+    return sorted((sorted(group, key=quality) for group in groups.values()), key=lambda group: group[0])
+
+
+def select_representatives(
+    paths: List[str],
+    radius: int = DEFAULT_RADIUS,
+    index_path: Optional[str] = DEFAULT_INDEX,
+    workers: Optional[int] = None
+) -> Tuple[List[str], Dict[str, str]]:
+    """Представители групп и карта дубликат -> представитель
+
+    Файлы, которые не удалось прочитать, остаются представителями сами себя.
+    """
+    index = HashIndex(index_path) if index_path else None
+    try:
+        hashes = compute_hashes(paths, index, workers)
+    finally:
+        if index is not None:
+            index.close()
+
+    duplicates: Dict[str, str] = {}
+    for group in cluster_duplicates(hashes, radius):
+        for path in group[1:]:
+            duplicates[path] = group[0]
+
+    representatives = [path for path in paths if path not in duplicates]
+    if duplicates:
+        logger.info("Найдено почти одинаковых изображений: %s, к генерации: %s", len(duplicates), len(representatives))
+    return representatives, duplicates
+
+
+class DuplicateFilter:
+    """Поиск дубликатов в потоке изображений, пакет за пакетом
+
+    Внутри пакета представитель группы - самый большой файл (как select_representatives),
+    изображение, близкое к уже выданному представителю прошлого пакета, считается
+    его дубликатом. В памяти хранятся только хеши представителей.
+    """
+
+    def __init__(self, radius: int = DEFAULT_RADIUS, index_path: Optional[str] = DEFAULT_INDEX, workers: Optional[int] = None):
+        self.radius = radius
+        self.workers = workers
+        self._index = HashIndex(index_path) if index_path else None
+        self._seen = BKTree()
+
+    def filter(self, paths: List[str]) -> Tuple[List[str], Dict[str, str]]:
+        """Представители пакета в исходном порядке и карта дубликат -> представитель"""
+        hashes = compute_hashes(paths, self._index, self.workers)
+        duplicates: Dict[str, str] = {}
+        for group in cluster_duplicates(hashes, self.radius):
+            earlier = self._seen.search(hashes[group[0]], self.radius)
+            if earlier:
+                representative = min(earlier, key=lambda found: found[0])[1]
+                members = group
+            else:
+                representative, members = group[0], group[1:]
+                self._seen.add(hashes[representative], representative)
+            for path in members:
+                duplicates[path] = representative
+        if duplicates:
+            logger.info("Найдено почти одинаковых изображений: %s", len(duplicates))
+        return [path for path in paths if path not in duplicates], duplicates
+
+    def close(self):
+        if self._index is not None:
+            self._index.close()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN JSON - быстрая сериализация JSON для горячих путей
+Используется orjson или ujson, если установлены, иначе стандартный json.
+dumps всегда возвращает UTF-8 байты (без экранирования кириллицы),
+loads принимает байты или строку, поэтому тела запросов, ответы опроса
+с base64 видео и отчеты пишутся и читаются без лишних перекодирований
+str <-> bytes. Бэкенд можно выбрать переменной окружения TURAN_JSON
+(orjson, ujson, json).
+
+Замер на типичных размерах данных: python turan_json.py
+"""
+
+import os
+import json
+import logging
+from typing import Any, Callable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("orjson", "ujson", "json")
+
+
+def _stdlib_dumps(obj: Any, indent: bool = False, default: Optional[Callable] = None) -> bytes:
+    return json.dumps(
+        obj, ensure_ascii=False, default=default, indent=2 if indent else None
+    ).encode('utf-8')
+
+
+def _stdlib_loads(data: Union[bytes, str]) -> Any:
+    return json.loads(data)
+
+
+def _orjson_backend():
+    import orjson
+
+    def dumps(obj: Any, indent: bool = False, default: Optional[Callable] = None) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except TypeError:
+            # Целые вне 64 бит и другие типы, которые orjson не поддерживает
+            return _stdlib_dumps(obj, indent, default)
+
+    return dumps, orjson.loads
+
+
+def _ujson_backend():
+    import ujson
+
+    def dumps(obj: Any, indent: bool = False, default: Optional[Callable] = None) -> bytes:
+        try:
+            text = ujson.dumps(obj, ensure_ascii=False, indent=2 if indent else 0, default=default)
+        except (TypeError, OverflowError):
+            return _stdlib_dumps(obj, indent, default)
+        return text.encode('utf-8')
+
+    return dumps, ujson.loads
+
+
+def _select_backend(preferred: Optional[str] = None):
+    """Первый доступный бэкенд, начиная с preferred"""
+    order = BACKENDS
+    if preferred:
+        if preferred not in BACKENDS:
+            logger.warning(f"Неизвестный JSON бэкенд {preferred}, поддерживаются: {', '.join(BACKENDS)}")
+        else:
+            order = BACKENDS[BACKENDS.index(preferred):]
+    for name in order:
+        if name == "json":
+            break
+        try:
+            factory = _orjson_backend if name == "orjson" else _ujson_backend
+            return (name, *factory())
+        except ImportError:
+            continue
+    return ("json", _stdlib_dumps, _stdlib_loads)
+
+
+BACKEND, _dumps, _loads = _select_backend(os.environ.get("TURAN_JSON"))
+
+
+def dumps(obj: Any, indent: bool = False, default: Optional[Callable] = None) -> bytes:
+    """JSON в UTF-8 байтах; indent - отступ 2 пробела, default - для несериализуемых значений"""
+    return _dumps(obj, indent, default)
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """Разбор JSON из байтов или строки (ValueError при ошибке формата)"""
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    return _loads(data)
+
+
+def dumps_line(obj: Any, default: Optional[Callable] = str) -> bytes:
+    """Строка JSONL: компактный JSON с переводом строки"""
+    return _dumps(obj, False, default) + b"\n"
+
+
+def load_file(path: Union[str, os.PathLike]) -> Any:
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def dump_file(obj: Any, path: Union[str, os.PathLike], indent: bool = True, default: Optional[Callable] = None):
+    """Запись JSON файла через временный файл с атомарной заменой"""
+    partial_path = f"{os.fspath(path)}.part"
+    with open(partial_path, 'wb') as f:
+        f.write(dumps(obj, indent, default))
+    os.replace(partial_path, path)
+
+
+def _benchmark_payloads():
+    """Данные типичных размеров: тело запроса, ответ опроса, файл сценариев, строка отчета"""
+    import base64
+
+    image = base64.b64encode(os.urandom(1536 * 1024)).decode('ascii')  # ~2 МБ base64 изображения
+    video = base64.b64encode(os.urandom(6 * 1024 * 1024)).decode('ascii')  # ~8 МБ base64 видео
+    prompt = "Кинематографический показ туалетного столика TURAN Lux, мягкий свет, " * 12
+    scenario = {
+        "scenario_id": "luxury_reveal", "focus": "детали", "enhanced_prompt": prompt,
+        "russian_voiceover": "Элегантность в каждой детали. TURAN Lux.", "cinematic_style": "luxury",
+        "lighting_mood": "warm", "timestamp": "2025-01-01 12:00:00", "prompt_type": "enhanced"
+    }
+    return {
+        "request": {
+            "instances": [{"prompt": prompt, "image": {"bytesBase64Encoded": image, "mimeType": "image/jpeg"}}],
+            "parameters": {"durationSeconds": 8, "aspectRatio": "16:9", "sampleCount": 1, "resolution": "1080p"}
+        },
+        "poll_response": {
+            "name": "projects/p/locations/us-central1/publishers/google/models/veo-3.0-generate-001/operations/1",
+            "done": True,
+            "response": {"videos": [{"bytesBase64Encoded": video, "mimeType": "video/mp4"}]}
+        },
+        "scenarios_file": {f"image_{index:04d}.jpg": dict(scenario) for index in range(2000)},
+        "result_line": {
+            "job_id": "sku/image_0001.jpg", "source_image": "images/sku/image_0001.jpg", "status": "success",
+            "scenario_id": "luxury_reveal", "local_path": "output/sku/turan_luxury_reveal_image_0001_v0.mp4",
+            "gcs_uri": "gs://turan-videos/output/1/sample_0.mp4", "russian_text": scenario["russian_voiceover"],
+            "timings": {"encode_seconds": 0.12, "queue_seconds": 3.4, "generate_seconds": 95.2, "download_seconds": 1.8}
+        }
+    }
+
+
+def benchmark(repeat: int = 5):
+    """Время dumps/loads каждого доступного бэкенда на типичных данных (лучшее из repeat)"""
+    import time
+
+    payloads = _benchmark_payloads()
+    backends = []
+    for name in BACKENDS:
+        selected = _select_backend(name)
+        if selected[0] == name:
+            backends.append(selected)
+
+    print(f"{'данные':<16}{'размер':>10}  " + "".join(f"{name + ' dumps':>14}{name + ' loads':>14}" for name, _, _ in backends))
+    for label, payload in payloads.items():
+        # Строка отчета маленькая: замеряется пакет из 10000 строк
+        count = 10000 if label == "result_line" else 1
+        encoded = _stdlib_dumps(payload)
+        size = len(encoded) * count
+        row = f"{label:<16}{size / 1024 ** 2:>8.1f}МБ  "
+        for name, backend_dumps, backend_loads in backends:
+            timings = []
+            for operation, argument in ((backend_dumps, payload), (backend_loads, encoded)):
+                best = float("inf")
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    for _ in range(count):
+                        if operation is backend_dumps:
+                            operation(argument, False, None)
+                        else:
+                            operation(argument)
+                    best = min(best, time.perf_counter() - started)
+                timings.append(best)
+            row += "".join(f"{seconds * 1000:>12.1f}мс" for seconds in timings)
+        print(row)
+    print(f"Активный бэкенд: {BACKEND}")
+
+
+if __name__ == "__main__":
+    benchmark()
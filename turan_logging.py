@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN Logging - неблокирующее логирование через очередь
+Запись в файл с ротацией по размеру и в консоль выполняется фоновым потоком,
+параметры берутся из секции logging YAML конфигурации.
+"""
+
+import re
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from typing import Optional
+
+DEFAULT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DEFAULT_LOG_FILE = 'turan_enhanced_generator.log'
+
+_SIZE_UNITS = {"": 1, "B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+_console_handler: Optional[logging.Handler] = None
+
+
+def parse_size(value) -> int:
+    """Размер из конфигурации ("10MB", "512KB", 1048576) в байтах"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?B?)\s*", str(value).upper())
+    if not match:
+        raise ValueError(f"Некорректный размер: {value}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+
+
+class JsonFormatter(logging.Formatter):
+    """Структурированный вывод: одна JSON запись на строку"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging(logging_config: Optional[dict] = None) -> logging.handlers.QueueListener:
+    """Настройка логирования через очередь и фоновый поток записи
+
+    Горячие пути только кладут запись в очередь; файл ротируется по
+    max_file_size с backup_count копиями. json: true включает структурированный вывод.
+    """
+    global _listener, _queue_handler, _console_handler
+
+    logging_config = logging_config or {}
+    level = getattr(logging, str(logging_config.get('level', 'INFO')).upper(), logging.INFO)
+
+    if logging_config.get('json', False):
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(logging_config.get('format', DEFAULT_FORMAT))
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        logging_config.get('file', DEFAULT_LOG_FILE),
+        maxBytes=parse_size(logging_config.get('max_file_size', '10MB')),
+        backupCount=int(logging_config.get('backup_count', 5)),
+        encoding='utf-8'
+    )
+    handlers = [file_handler]
+    _console_handler = None
+    if logging_config.get('console', True):
+        _console_handler = logging.StreamHandler()
+        handlers.append(_console_handler)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # Повторная настройка заменяет предыдущий слушатель
+    root = logging.getLogger()
+    if _listener is not None:
+        _listener.stop()
+        root.removeHandler(_queue_handler)
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def console_handler() -> Optional[logging.Handler]:
+    """Обработчик вывода в консоль (None, если консоль отключена или логирование не настроено)"""
+    return _console_handler
+
+
+def shutdown_logging():
+    """Остановка фонового потока с дозаписью очереди"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
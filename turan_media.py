@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN Media - локальное хранилище видео с дедупликацией и бюджетом диска
+Видео хранятся один раз по SHA-256 содержимого (objects/ab/<sha256>.mp4),
+в выходные папки попадают жесткими ссылками, поэтому одно видео в нескольких
+папках не занимает место повторно. Видео, уже скачанное по gcs_uri,
+повторно не скачивается. При превышении бюджета удаляются давно не
+использованные видео, у которых есть копия в GCS (вместе с их ссылками
+в выходных папках, если включено evict_outputs); при необходимости они
+скачиваются заново (ensure_local). Видео без копии в GCS не удаляются.
+"""
+
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FOLDER = "media_cache"
+HASH_CHUNK = 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    gcs_uri TEXT,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_objects_access ON objects (last_access);
+
+CREATE TABLE IF NOT EXISTS uris (
+    gcs_uri TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS links (
+    path TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_links_sha256 ON links (sha256);
+"""
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MediaStore:
+    """Хранилище видео по содержимому с LRU вытеснением (max_bytes=0 - без лимита)
+
+    Методы можно вызывать из потоков скачивания конвейера.
+    """
+
+    def __init__(self, folder: str = DEFAULT_FOLDER, max_bytes: int = 0, evict_outputs: bool = True):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.evict_outputs = evict_outputs
+        self._objects = os.path.join(folder, "objects")
+        self._tmp = os.path.join(folder, "tmp")
+        os.makedirs(self._objects, exist_ok=True)
+        # Незавершенные скачивания прошлого запуска
+        shutil.rmtree(self._tmp, ignore_errors=True)
+        os.makedirs(self._tmp, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(folder, "index.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._budget_warned = False
+        self.stats = {"hits": 0, "downloads": 0, "stored": 0, "linked": 0, "evicted": 0, "evicted_bytes": 0}
+
+    @classmethod
+    def from_config(cls, config_data: dict) -> Optional["MediaStore"]:
+        """Хранилище по секции storage.media_cache, None если отключено"""
+        from turan_logging import parse_size
+
+        storage = config_data.get('storage', {}) or {}
+        cache = storage.get('media_cache', {}) or {}
+        if not cache.get('enabled', False):
+            return None
+        return cls(
+            cache.get('folder', DEFAULT_FOLDER),
+            parse_size(cache.get('max_size', 0)),
+            bool(cache.get('evict_outputs', True))
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def object_path(self, sha256: str) -> str:
+        return os.path.join(self._objects, sha256[:2], f"{sha256}.mp4")
+
+    def _touch(self, sha256: str):
+        with self._conn:
+            self._conn.execute("UPDATE objects SET last_access = ? WHERE sha256 = ?", (time.time(), sha256))
+
+    def _adopt(self, tmp_path: str, gcs_uri: Optional[str]) -> str:
+        """Перенос временного файла в хранилище под именем хеша"""
+        sha256 = _file_sha256(tmp_path)
+        target = self.object_path(sha256)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with self._lock:
+            if os.path.exists(target):
+                os.remove(tmp_path)  # то же содержимое уже хранится
+            else:
+                os.replace(tmp_path, target)
+                self.stats["stored"] += 1
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO objects (sha256, size, gcs_uri, last_access) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(sha256) DO UPDATE SET last_access = excluded.last_access, "
+                    "gcs_uri = COALESCE(objects.gcs_uri, excluded.gcs_uri)",
+                    (sha256, os.path.getsize(target), gcs_uri, time.time())
+                )
+                if gcs_uri:
+                    self._conn.execute("INSERT OR REPLACE INTO uris (gcs_uri, sha256) VALUES (?, ?)", (gcs_uri, sha256))
+        return sha256
+
+    def _tmp_path(self) -> str:
+        return os.path.join(self._tmp, f"{threading.get_ident()}_{time.monotonic_ns()}.part")
+
+    def put_bytes(self, data: bytes) -> str:
+        """Видео из ответа API (без копии в GCS, не вытесняется)"""
+        tmp_path = self._tmp_path()
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        return self._adopt(tmp_path, None)
+
+    def fetch_gcs(self, gcs_uri: str, download: Callable[[str, str], object]) -> str:
+        """Видео по gcs_uri: из хранилища, если уже скачано, иначе download(uri, путь)"""
+        with self._lock:
+            row = self._conn.execute("SELECT sha256 FROM uris WHERE gcs_uri = ?", (gcs_uri,)).fetchone()
+            if row and os.path.exists(self.object_path(row[0])):
+                self.stats["hits"] += 1
+                self._touch(row[0])
+                return row[0]
+        tmp_path = self._tmp_path()
+        try:
+            download(gcs_uri, tmp_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self.stats["downloads"] += 1
+        return self._adopt(tmp_path, gcs_uri)
+
+    def materialize(self, sha256: str, dest_path: str) -> str:
+        """Видео в выходной папке: жесткая ссылка на объект (копия между файловыми системами)"""
+        source = self.object_path(sha256)
+        os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+        try:
+            if os.path.samefile(source, dest_path):
+                return dest_path
+        except OSError:
+            pass
+        partial_path = dest_path + ".part"
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        try:
+            os.link(source, partial_path)
+        except OSError:
+            shutil.copyfile(source, partial_path)
+        os.replace(partial_path, dest_path)
+        with self._lock:
+            self.stats["linked"] += 1
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO links (path, sha256) VALUES (?, ?)", (os.path.abspath(dest_path), sha256)
+                )
+            self._touch(sha256)
+        self.evict()
+        return dest_path
+
+    def ensure_local(self, result: Dict, download: Callable[[str, str], object]) -> Optional[str]:
+        """Локальный путь видео результата, вытесненное видео скачивается заново"""
+        local_path = result.get("local_path")
+        if local_path and os.path.exists(local_path):
+            return local_path
+        gcs_uri = result.get("gcs_uri")
+        if not local_path or not gcs_uri:
+            return None
+        return self.materialize(self.fetch_gcs(gcs_uri, download), local_path)
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    def _remove_object(self, sha256: str, size: int):
+        source = self.object_path(sha256)
+        links = [path for path, in self._conn.execute("SELECT path FROM links WHERE sha256 = ?", (sha256,))]
+        if self.evict_outputs:
+            for path in links:
+                # Удаляется только неизмененная ссылка на этот объект
+                try:
+                    if os.path.samefile(path, source):
+                        os.remove(path)
+                except OSError:
+                    pass
+        try:
+            os.remove(source)
+        except FileNotFoundError:
+            pass
+        with self._conn:
+            self._conn.execute("DELETE FROM links WHERE sha256 = ?", (sha256,))
+            self._conn.execute("DELETE FROM objects WHERE sha256 = ?", (sha256,))
+        self.stats["evicted"] += 1
+        self.stats["evicted_bytes"] += size
+
+    def evict(self) -> int:
+        """Вытеснение давно не использованных видео с копией в GCS до бюджета"""
+        if not self.max_bytes:
+            return 0
+        evicted = 0
+        with self._lock:
+            excess = self.total_bytes() - self.max_bytes
+            if excess <= 0:
+                return 0
+            candidates: List[tuple] = self._conn.execute(
+                "SELECT sha256, size FROM objects WHERE gcs_uri IS NOT NULL ORDER BY last_access"
+            ).fetchall()
+            for sha256, size in candidates:
+                if excess <= 0:
+                    break
+                self._remove_object(sha256, size)
+                excess -= size
+                evicted += 1
+            if excess > 0 and not self._budget_warned:
+                self._budget_warned = True
+                logger.warning("Бюджет хранилища видео превышен на %s байт: остальные видео без копии в GCS", excess)
+        if evicted:
+            logger.info("Из хранилища видео вытеснено: %s", evicted)
+        return evicted
+
+    def summary(self) -> Dict[str, int]:
+        with self._lock:
+            count, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM objects").fetchone()
+        return {"objects": count, "bytes": size, **self.stats}
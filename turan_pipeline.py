@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN Pipeline - конвейер обработки папки из стадий с ограниченными очередями
+scan -> encode -> submit/poll -> download [-> postprocess]: чтение списка заданий,
+кодирование изображений в base64 в пуле процессов, отправка и опрос операций
+планировщиком, скачивание и сохранение видео в пуле потоков, при необходимости
+миниатюры и экспорт через ffmpeg (turan_postprocess). Каждая очередь ограничена, поэтому
+медленная стадия тормозит предыдущие, и память не зависит от размера папки.
+Глубина очередей доступна через depths() и периодически пишется в лог.
+"""
+
+import time
+import queue
+import base64
+import logging
+import mimetypes
+import threading
+import multiprocessing
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from turan_scheduler import OperationScheduler, GenerationJob
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_MIME_TYPES = ('image/jpeg', 'image/png')
+
+_DONE = object()
+
+
+def encode_image_file(image_path: str) -> Tuple[str, str]:
+    """Кодирование изображения в base64: (строка, MIME тип)
+
+    Функция модульного уровня, чтобы выполняться в пуле процессов.
+    """
+    mime_type, _ = mimetypes.guess_type(image_path)
+    if mime_type not in SUPPORTED_MIME_TYPES:
+        raise ValueError(f"Неподдерживаемый формат изображения: {mime_type}")
+    with open(image_path, 'rb') as image_file:
+        return base64.b64encode(image_file.read()).decode('utf-8'), mime_type
+
+
+@dataclass
+class PipelineSettings:
+    """Параметры стадий конвейера
+
+    encode_workers = 0 - кодирование при отправке в потоке планировщика,
+    download_workers = 0 - скачивание в потоке планировщика (без отдельной стадии).
+    """
+    encode_workers: int = 2
+    download_workers: int = 4
+    queue_size: int = 8
+    report_interval: float = 30.0
+
+    @classmethod
+    def from_config(cls, config_data: dict) -> "PipelineSettings":
+        """Настройки из секции performance.pipeline YAML конфигурации"""
+        pipeline = (config_data.get('performance', {}) or {}).get('pipeline', {}) or {}
+        return cls(
+            encode_workers=int(pipeline.get('encode_workers', cls.encode_workers)),
+            download_workers=int(pipeline.get('download_workers', cls.download_workers)),
+            queue_size=max(1, int(pipeline.get('queue_size', cls.queue_size))),
+            report_interval=float(pipeline.get('report_interval', cls.report_interval))
+        )
+
+
+class _DeferredDownloadBackend:
+    """Бэкенд планировщика, передающий завершенные операции стадии скачивания
+
+    Очередь скачивания ограничена: пока загрузчики заняты, планировщик ждет
+    на put, и ответы с видео не накапливаются в памяти.
+    """
+
+    def __init__(self, inner, downloads: queue.Queue):
+        self.inner = inner
+        self.downloads = downloads
+
+    def submit(self, job: GenerationJob):
+        self.inner.submit(job)
+
+    def poll(self, job: GenerationJob) -> Optional[Dict]:
+        return self.inner.poll(job)
+
+    def cancel(self, job: GenerationJob):
+        self.inner.cancel(job)
+
+    def fail(self, job: GenerationJob, error: Exception) -> Dict:
+        return self.inner.fail(job, error)
+
+    def complete(self, job: GenerationJob, operation_result: Dict) -> None:
+        self.downloads.put((job, operation_result))
+        return None
+
+
+class StagedPipeline:
+    """Конвейер стадий вокруг OperationScheduler
+
+    Стадии работают в своих потоках: scan (1 поток), encode (пул процессов
+    на encode_workers), submit/poll (поток планировщика, параллелизм - число
+    операций Veo), download (download_workers потоков). Результаты собираются
+    в выходной очереди и выдаются вызывающему потоку по мере готовности.
+    Остановка планировщика (shutdown) останавливает и ранние стадии, а задания,
+    уже прочитанные из источника, но не дошедшие до отправки, выдаются со
+    статусом skipped; непрочитанная часть источника не перебирается.
+    """
+
+    def __init__(self, scheduler: OperationScheduler, settings: Optional[PipelineSettings] = None, postprocessor=None):
+        self.scheduler = scheduler
+        self.settings = settings or PipelineSettings()
+        self.postprocessor = postprocessor  # turan_postprocess.PostProcessor
+        size = self.settings.queue_size
+        self._scanned: queue.Queue = queue.Queue(maxsize=size)
+        self._encoded: queue.Queue = queue.Queue(maxsize=size)
+        self._downloads: queue.Queue = queue.Queue(maxsize=max(1, self.settings.download_workers))
+        self._output: queue.Queue = queue.Queue()
+        self._encoding = 0
+        self._downloading = 0
+        self._lock = threading.Lock()
+        self._abort = threading.Event()
+        self._encode_done = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._inner_backend = None
+        # Задания, снятые с ранних стадий при остановке (выдаются как skipped)
+        self._stranded: List[GenerationJob] = []
+        self._postprocessing: List = []
+        self._post_pending = 0
+        self._post_done = threading.Condition()
+        self.max_depths: Dict[str, int] = {}
+        # Заданий прочитано стадией scan; после scan_complete это размер пакета
+        self.scanned = 0
+        self.scan_complete = False
+
+    def _stopping(self) -> bool:
+        return self._abort.is_set() or self.scheduler.shutdown_mode is not None
+
+    def _put(self, target: queue.Queue, item) -> bool:
+        """Блокирующая постановка в ограниченную очередь с проверкой остановки"""
+        while not self._stopping():
+            try:
+                target.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def depths(self) -> Dict[str, int]:
+        """Текущая загрузка стадий: сколько заданий ждет или обрабатывается в каждой"""
+        scheduler_depths = self.scheduler.queue_depths
+        return {
+            "scan": self._scanned.qsize(),
+            "encode": self._encoding,
+            "submit": self._encoded.qsize() + scheduler_depths["pending"],
+            "in_flight": scheduler_depths["in_flight"],
+            "download": self._downloads.qsize() + self._downloading,
+            "postprocess": self.postprocessor.active if self.postprocessor is not None else 0
+        }
+
+    def _sample_depths(self) -> Dict[str, int]:
+        depths = self.depths()
+        for stage, depth in depths.items():
+            self.max_depths[stage] = max(self.max_depths.get(stage, 0), depth)
+        return depths
+
+    def report(self, result: Dict):
+        """Результат, полученный вне стадий (например, отклонен проверкой до кодирования)"""
+        self._output.put(result)
+
+    def _emit(self, result: Dict):
+        """Результат стадии: готовое видео сначала проходит постобработку"""
+        if self.postprocessor is not None and self.postprocessor.wants(result):
+            with self._post_done:
+                self._post_pending += 1
+            future = self.postprocessor.submit(result, self._postprocessed)
+            with self._lock:
+                self._postprocessing.append(future)
+        else:
+            self._output.put(result)
+
+    def _postprocessed(self, result: Dict):
+        self._output.put(result)
+        with self._post_done:
+            self._post_pending -= 1
+            self._post_done.notify_all()
+
+    def _finish_postprocessing(self):
+        """Ожидание постобработки перед концом выдачи (abort отменяет еще не начатые)"""
+        with self._lock:
+            futures, self._postprocessing = self._postprocessing, []
+        if self.scheduler.shutdown_mode == "abort":
+            for future in futures:
+                future.cancel()
+        with self._post_done:
+            self._post_done.wait_for(lambda: self._post_pending == 0)
+
+    # Стадии
+
+    def _scan(self, jobs: Iterable[GenerationJob]):
+        iterator = iter(jobs)
+        try:
+            for job in iterator:
+                if not self._put(self._scanned, job):
+                    # Остановка: источник больше не читается (обход каталога, проверка
+                    # и поиск дубликатов остальных файлов не нужны), в отчет - только это задание
+                    with self._lock:
+                        self._stranded.append(job)
+                    break
+                self.scanned += 1
+            else:
+                self.scan_complete = True
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                # Генератор закрывается в потоке, где работал (его ресурсы привязаны к потоку)
+                close()
+            self._put(self._scanned, _DONE)
+
+    def _encode(self):
+        """Кодирование в пуле процессов, не больше 2 * encode_workers изображений в работе"""
+        workers = self.settings.encode_workers
+        window: deque = deque()
+        pool = None
+        if workers > 0:
+            # spawn: дочерние процессы не наследуют потоки конвейера
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+        def release(job: GenerationJob, future) -> bool:
+            try:
+                job.encoded_image = future.result()
+            except Exception as e:
+                # Ошибка повторится и будет зафиксирована при отправке
+                logger.debug(f"Предварительное кодирование {job.image_path} не удалось: {e}")
+            with self._lock:
+                self._encoding -= 1
+            if self._put(self._encoded, job):
+                return True
+            with self._lock:
+                self._stranded.append(job)
+            return False
+
+        try:
+            exhausted = False
+            while not exhausted and not self._stopping():
+                try:
+                    job = self._scanned.get(timeout=0.5)
+                except queue.Empty:
+                    # Новых заданий нет (режим наблюдения): готовые не ждут следующего
+                    while window and window[0][1].done():
+                        if not release(*window.popleft()):
+                            break
+                    continue
+                if job is _DONE:
+                    exhausted = True
+                    break
+                if pool is None:
+                    if not self._put(self._encoded, job):
+                        with self._lock:
+                            self._stranded.append(job)
+                        break
+                    continue
+                with self._lock:
+                    self._encoding += 1
+                window.append((job, pool.submit(encode_image_file, job.image_path)))
+                while len(window) >= 2 * workers or (window and window[0][1].done()):
+                    if not release(*window.popleft()):
+                        break
+            while window and not self._stopping():
+                release(*window.popleft())
+        finally:
+            # Недокодированные задания попадут в отчет как skipped
+            for job, future in window:
+                future.cancel()
+                with self._lock:
+                    self._encoding -= 1
+                    self._stranded.append(job)
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+            self._encode_done.set()
+
+    def _download(self):
+        while True:
+            item = self._downloads.get()
+            if item is _DONE:
+                return
+            job, operation_result = item
+            with self._lock:
+                self._downloading += 1
+            try:
+                try:
+                    results = self._inner_backend.complete(job, operation_result)
+                except Exception as e:
+                    results = [self._inner_backend.fail(job, e)]
+                self.scheduler.deliver(job, results)
+                for result in results:
+                    self._emit(result)
+            finally:
+                with self._lock:
+                    self._downloading -= 1
+
+    def _submit_poll(self, download_threads: List[threading.Thread]):
+        try:
+            for result in self.scheduler.run(inbox=self._encoded, stop_event=self._encode_done, max_pending=self.settings.queue_size):
+                self._emit(result)
+        except Exception as e:
+            logger.error(f"Ошибка планировщика конвейера: {e}")
+            self._abort.set()
+        finally:
+            for _ in download_threads:
+                self._downloads.put(_DONE)
+            for thread in download_threads:
+                thread.join()
+            self._finish_postprocessing()
+            self._output.put(_DONE)
+
+    def _leftovers(self) -> Iterator[GenerationJob]:
+        """Задания, оставшиеся в очередях ранних стадий после остановки"""
+        with self._lock:
+            stranded, self._stranded = self._stranded, []
+        yield from stranded
+        for source in (self._encoded, self._scanned):
+            while True:
+                try:
+                    job = source.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not _DONE:
+                    yield job
+
+    def _start(self, name: str, target, *args) -> threading.Thread:
+        thread = threading.Thread(target=target, args=args, name=f"turan-{name}", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return thread
+
+    def run(self, jobs: Iterable[GenerationJob]) -> Iterator[Dict]:
+        """Выполнение заданий через стадии, результаты по мере готовности"""
+        settings = self.settings
+        download_threads: List[threading.Thread] = []
+        if settings.download_workers > 0:
+            self._inner_backend = self.scheduler.backend
+            self.scheduler.backend = _DeferredDownloadBackend(self._inner_backend, self._downloads)
+            download_threads = [
+                self._start(f"download-{index}", self._download) for index in range(settings.download_workers)
+            ]
+        early_stages = [self._start("scan", self._scan, jobs), self._start("encode", self._encode)]
+        self._start("scheduler", self._submit_poll, download_threads)
+
+        finished = False
+        next_report = time.monotonic() + settings.report_interval
+        try:
+            while True:
+                try:
+                    item = self._output.get(timeout=0.5)
+                except queue.Empty:
+                    item = None
+                depths = self._sample_depths()
+                if time.monotonic() >= next_report:
+                    next_report = time.monotonic() + settings.report_interval
+                    logger.info("Очереди конвейера: %s", depths)
+                if item is _DONE:
+                    break
+                if item is not None:
+                    yield item
+
+            # После остановки: ждем выхода ранних стадий и отчитываемся о невыполненных
+            self._abort.set()
+            for thread in early_stages:
+                thread.join()
+            for job in self._leftovers():
+                yield self.scheduler.skip(job)
+            finished = True
+        finally:
+            if not finished:
+                # Потребитель прекратил чтение: останавливаем все стадии
+                self._abort.set()
+                if self.scheduler.shutdown_mode is None:
+                    self.scheduler.shutdown("abort")
+            if self._inner_backend is not None:
+                self.scheduler.backend = self._inner_backend
+            logger.info("Максимальная глубина очередей конвейера: %s", self.max_depths)
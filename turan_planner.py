@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN Planner - план пакета для dry-run
+Оценка времени выполнения, числа операций Veo и вызовов API, пиковой памяти
+и места на диске по истории запусков, настройкам планировщика и квотам.
+"""
+
+import re
+import time
+import shutil
+import logging
+import datetime
+from typing import Dict, List, Optional
+from pathlib import Path
+from dataclasses import dataclass, field
+
+from turan_scheduler import SchedulerSettings
+from turan_pipeline import PipelineSettings
+from turan_simulator import SimulationModel, simulate, average_results
+
+logger = logging.getLogger(__name__)
+
+# Размер 8-секундного видео без истории (байт)
+VIDEO_SIZE_ESTIMATES = {"720p": 3 * 1024 ** 2, "1080p": 6 * 1024 ** 2}
+
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_deadline(value: str, now: Optional[float] = None) -> float:
+    """Срок в секундах epoch: "18:30", "2025-01-31 18:30" или длительность "90m", "2h", "1h30m"."""
+    now = time.time() if now is None else now
+    text = value.strip()
+
+    if re.fullmatch(r"(\d+\s*[smhd]\s*)+", text.lower()):
+        return now + sum(int(amount) * _DURATION_UNITS[unit] for amount, unit in re.findall(r"(\d+)\s*([smhd])", text.lower()))
+
+    current = datetime.datetime.fromtimestamp(now)
+    for fmt in ("%H:%M", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M"):
+        try:
+            parsed = datetime.datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        if fmt == "%H:%M":
+            parsed = current.replace(hour=parsed.hour, minute=parsed.minute, second=0, microsecond=0)
+            if parsed.timestamp() <= now:
+                parsed += datetime.timedelta(days=1)
+        return parsed.timestamp()
+
+    raise ValueError(f"Некорректный срок: {value} (ожидается 18:30, 2025-01-31 18:30 или 2h30m)")
+
+
+def estimate_video_size(output_folder: str, resolution: str) -> tuple:
+    """Средний размер уже сгенерированных видео или оценка по разрешению: (байты, источник)"""
+    folder = Path(output_folder)
+    sizes = []
+    if folder.is_dir():
+        for path in folder.rglob("turan_*.mp4"):
+            sizes.append(path.stat().st_size)
+            if len(sizes) >= 200:
+                break
+    if sizes:
+        return sum(sizes) // len(sizes), "history"
+    return VIDEO_SIZE_ESTIMATES.get(resolution, VIDEO_SIZE_ESTIMATES["1080p"]), "estimate"
+
+
+def _process_peak_rss() -> int:
+    """Пиковый RSS текущего процесса в байтах (0, если недоступно)"""
+    try:
+        import resource
+    except ImportError:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@dataclass
+class BatchPlan:
+    """Прогноз ресурсов и времени пакета"""
+    images: int
+    videos: int
+    operations: int
+    api_calls: Dict[str, int]
+    throttled: int
+    rejected: int
+    makespan_seconds: float
+    makespan_worst_seconds: float
+    history_samples: int
+    video_size_bytes: int
+    video_size_source: str
+    peak_memory_bytes: int
+    disk_bytes: int
+    disk_free_bytes: Optional[int]
+    settings: SchedulerSettings
+    finish_at: float
+    deadline: Optional[float] = None
+    memory_breakdown: Dict[str, int] = field(default_factory=dict)  # байты по стадиям конвейера
+
+    @property
+    def total_api_calls(self) -> int:
+        return sum(self.api_calls.values())
+
+    @property
+    def fits_deadline(self) -> Optional[bool]:
+        """Пессимистичная проверка: худший прогон должен уложиться в срок"""
+        if self.deadline is None:
+            return None
+        return self.finish_at - self.makespan_seconds + self.makespan_worst_seconds <= self.deadline
+
+    def warnings(self) -> List[str]:
+        messages = []
+        if self.deadline is not None and not self.fits_deadline:
+            expected_finish = time.strftime("%H:%M", time.localtime(self.finish_at))
+            deadline = time.strftime("%Y-%m-%d %H:%M", time.localtime(self.deadline))
+            if self.finish_at > self.deadline:
+                messages.append(f"Пакет не успеет к сроку {deadline}: ожидаемое завершение {expected_finish}")
+            else:
+                messages.append(f"Пакет может не успеть к сроку {deadline}: в худшем прогоне +{(self.makespan_worst_seconds - self.makespan_seconds) / 60:.0f} мин")
+        if self.disk_free_bytes is not None and self.disk_bytes > self.disk_free_bytes:
+            messages.append("Недостаточно свободного места на диске для результатов")
+        if self.rejected:
+            messages.append(f"Ожидаются отказы по квоте: {self.rejected} заданий (уменьшите параллелизм)")
+        return messages
+
+    def to_dict(self) -> Dict:
+        return {
+            "images": self.images,
+            "videos": self.videos,
+            "operations": self.operations,
+            "api_calls": self.api_calls,
+            "total_api_calls": self.total_api_calls,
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+            "makespan_seconds": round(self.makespan_seconds, 1),
+            "makespan_worst_seconds": round(self.makespan_worst_seconds, 1),
+            "history_samples": self.history_samples,
+            "video_size_bytes": self.video_size_bytes,
+            "video_size_source": self.video_size_source,
+            "peak_memory_bytes": self.peak_memory_bytes,
+            "memory_breakdown": self.memory_breakdown,
+            "disk_bytes": self.disk_bytes,
+            "disk_free_bytes": self.disk_free_bytes,
+            "max_concurrent_operations": self.settings.max_concurrent_operations,
+            "region_weights": self.settings.region_weights,
+            "finish_at": self.finish_at,
+            "deadline": self.deadline,
+            "fits_deadline": self.fits_deadline,
+            "warnings": self.warnings()
+        }
+
+
+def estimate_pipeline_memory(
+    largest_image: int,
+    response_size: int,
+    pipeline: PipelineSettings,
+    streaming_downloads: bool = False
+) -> Dict[str, int]:
+    """Пиковая память стадий конвейера (байты) по размерам их очередей
+
+    encode: окно пула (2 * encode_workers) и очередь encoded держат base64 изображений,
+    как и отложенные задания планировщика (max_pending = queue_size); после отправки
+    base64 освобождается, поэтому операции в полете памяти почти не занимают.
+    submit: один запрос за раз в потоке планировщика (изображение + base64 + JSON).
+    download: каждый загрузчик разбирает ответ с base64 видео (ответ + строка + байты),
+    очередь скачивания и ожидающий на put планировщик держат еще по ответу.
+    Очередь scan хранит только пути.
+    """
+    encoded_image = int(largest_image * 4 / 3)
+    if pipeline.encode_workers > 0:
+        encoded_jobs = 2 * pipeline.encode_workers + 2 * pipeline.queue_size
+    else:
+        encoded_jobs = 0  # кодирование при отправке, в очередях только пути
+    if streaming_downloads:
+        downloading = queued_responses = 0  # видео скачиваются из GCS потоково
+    else:
+        downloading = max(1, pipeline.download_workers)
+        queued_responses = max(1, pipeline.download_workers) + 1 if pipeline.download_workers > 0 else 0
+    return {
+        "encode": encoded_jobs * encoded_image,
+        "submit": int(largest_image * (1 + 4 / 3 + 4 / 3)),
+        "download": int(downloading * response_size * (4 / 3 + 4 / 3 + 1) + queued_responses * response_size * 4 / 3)
+    }
+
+
+def build_plan(
+    image_paths: List[str],
+    config,
+    settings: SchedulerSettings,
+    model: SimulationModel,
+    output_folder: str,
+    storage_uri: Optional[str] = None,
+    deadline: Optional[float] = None,
+    runs: int = 5,
+    pipeline: Optional[PipelineSettings] = None
+) -> BatchPlan:
+    """План пакета: симуляция реального планировщика плюс оценка памяти и диска
+
+    Память: стадии конвейера работают одновременно, поэтому пик - сумма их
+    очередей при самом большом изображении пакета (estimate_pipeline_memory).
+    """
+    pipeline = pipeline or PipelineSettings()
+    images = len(image_paths)
+    samples = [simulate(images, settings, model, seed=seed) for seed in range(runs)] if images else []
+    averaged = average_results(samples) if samples else None
+
+    sample_count = getattr(config, "sample_count", 1) or 1
+    resolution = getattr(getattr(config, "resolution", None), "value", "1080p")
+    video_size, video_size_source = estimate_video_size(output_folder, resolution)
+
+    image_sizes = []
+    for path in image_paths:
+        try:
+            image_sizes.append(Path(path).stat().st_size)
+        except OSError:
+            continue
+    largest_image = max(image_sizes, default=0)
+
+    memory_breakdown = estimate_pipeline_memory(
+        largest_image, sample_count * video_size, pipeline, streaming_downloads=bool(storage_uri)
+    )
+    peak_memory = _process_peak_rss() + sum(memory_breakdown.values())
+
+    videos = images * sample_count
+    disk_bytes = videos * video_size + video_size  # плюс один .part файл при записи
+
+    probe = Path(output_folder)
+    while not probe.exists() and probe != probe.parent:
+        probe = probe.parent
+    try:
+        disk_free = shutil.disk_usage(probe).free
+    except OSError:
+        disk_free = None
+
+    makespan = averaged.makespan_seconds if averaged else 0.0
+    return BatchPlan(
+        images=images,
+        videos=videos,
+        operations=averaged.operations if averaged else 0,
+        api_calls=dict(averaged.api_calls) if averaged else {},
+        throttled=averaged.throttled if averaged else 0,
+        rejected=averaged.rejected if averaged else 0,
+        makespan_seconds=makespan,
+        makespan_worst_seconds=max((s.makespan_seconds for s in samples), default=0.0),
+        history_samples=len(model.generation_times),
+        video_size_bytes=video_size,
+        video_size_source=video_size_source,
+        peak_memory_bytes=peak_memory,
+        disk_bytes=disk_bytes,
+        disk_free_bytes=disk_free,
+        settings=settings,
+        finish_at=time.time() + makespan,
+        deadline=deadline,
+        memory_breakdown=memory_breakdown
+    )
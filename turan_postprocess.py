@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN Postprocess - обработка готовых видео через ffmpeg параллельно с генерацией
+Для каждого сохраненного видео: миниатюра (monitoring.create_thumbnails),
+постер-кадр в полном разрешении и копии в других контейнерах
+(export_settings.formats). Видео Veo - H.264/AAC, поэтому MOV и MKV
+получаются перепаковкой без перекодирования (-c copy), перекодируются только
+форматы с другими кодеками (WEBM). Задания выполняются пулом ffmpeg процессов
+сразу после скачивания видео, пока остальные операции еще генерируются.
+"""
+
+import os
+import shutil
+import logging
+import threading
+import subprocess
+from typing import Callable, Dict, List, Optional
+from dataclasses import dataclass, field
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Контейнер -> аргументы кодеков ffmpeg (None - исходный формат, копия не нужна)
+EXPORT_CODECS = {
+    "MP4": None,
+    "MOV": ["-c", "copy", "-movflags", "+faststart"],
+    "MKV": ["-c", "copy"],
+    "WEBM": ["-c:v", "libvpx-vp9", "-b:v", "0", "-crf", "32", "-c:a", "libopus"],
+}
+
+
+@dataclass
+class PostProcessSettings:
+    """Параметры стадии постобработки"""
+    ffmpeg: str = "ffmpeg"
+    ffprobe: str = "ffprobe"
+    workers: int = 2
+    thumbnails: bool = True
+    thumbnail_width: int = 320
+    thumbnail_time: float = 1.0
+    posters: bool = True
+    poster_time: float = 4.0  # середина 8-секундного видео
+    formats: List[str] = field(default_factory=list)
+    timeout: float = 300.0
+
+    @classmethod
+    def from_config(cls, config_data: dict) -> "PostProcessSettings":
+        """Настройки из monitoring, export_settings и performance.postprocess"""
+        monitoring = config_data.get('monitoring', {}) or {}
+        export = config_data.get('export_settings', {}) or {}
+        post = (config_data.get('performance', {}) or {}).get('postprocess', {}) or {}
+        formats = [str(fmt).strip().upper() for fmt in export.get('formats') or []]
+        for fmt in formats:
+            if fmt not in EXPORT_CODECS:
+                logger.warning(f"Неизвестный формат экспорта {fmt}, поддерживаются: {', '.join(EXPORT_CODECS)}")
+        return cls(
+            ffmpeg=os.environ.get("TURAN_FFMPEG") or post.get('ffmpeg', cls.ffmpeg),
+            ffprobe=os.environ.get("TURAN_FFPROBE") or post.get('ffprobe', cls.ffprobe),
+            workers=max(1, int(post.get('workers', cls.workers))),
+            thumbnails=bool(monitoring.get('create_thumbnails', cls.thumbnails)),
+            thumbnail_width=int(post.get('thumbnail_width', cls.thumbnail_width)),
+            thumbnail_time=float(post.get('thumbnail_time', cls.thumbnail_time)),
+            posters=bool(post.get('posters', cls.posters)),
+            poster_time=float(post.get('poster_time', cls.poster_time)),
+            formats=[fmt for fmt in formats if EXPORT_CODECS.get(fmt, ())],
+            timeout=float(post.get('timeout', cls.timeout))
+        )
+
+    @property
+    def has_work(self) -> bool:
+        return self.thumbnails or self.posters or bool(self.formats)
+
+
+def run_ffmpeg(ffmpeg: str, args: List[str], output_path: str, timeout: float):
+    """Запуск ffmpeg с записью во временный файл и атомарной заменой"""
+    root, extension = os.path.splitext(output_path)
+    partial_path = f"{root}.part{extension}"
+    command = [ffmpeg, "-y", "-v", "error", *args, partial_path]
+    completed = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    if completed.returncode != 0:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else f"ffmpeg код {completed.returncode}")
+    os.replace(partial_path, output_path)
+
+
+def _is_fresh(output_path: str, video_path: str) -> bool:
+    """Производный файл уже создан для этой версии видео (повторный запуск)"""
+    try:
+        return os.stat(output_path).st_mtime >= os.stat(video_path).st_mtime
+    except OSError:
+        return False
+
+
+def postprocess_video(video_path: str, settings: PostProcessSettings) -> Dict:
+    """Миниатюра, постер и экспорты одного видео: пути созданных файлов и ошибки"""
+    root, _ = os.path.splitext(video_path)
+    tasks = []
+    if settings.thumbnails:
+        tasks.append(("thumbnail", f"{root}_thumb.jpg", [
+            "-ss", str(settings.thumbnail_time), "-i", video_path,
+            "-frames:v", "1", "-vf", f"scale={settings.thumbnail_width}:-2", "-q:v", "4"
+        ]))
+    if settings.posters:
+        tasks.append(("poster", f"{root}_poster.jpg", [
+            "-ss", str(settings.poster_time), "-i", video_path, "-frames:v", "1", "-q:v", "2"
+        ]))
+    for fmt in settings.formats:
+        tasks.append((fmt, f"{root}.{fmt.lower()}", ["-i", video_path, "-map", "0", *EXPORT_CODECS[fmt]]))
+
+    outputs: Dict[str, str] = {}
+    errors: Dict[str, str] = {}
+    for name, output_path, args in tasks:
+        try:
+            if not _is_fresh(output_path, video_path):
+                run_ffmpeg(settings.ffmpeg, args, output_path, settings.timeout)
+            outputs[name] = output_path
+        except (OSError, RuntimeError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"Постобработка {name} для {video_path} не удалась: {e}")
+            errors[name] = str(e)
+
+    record = {}
+    if "thumbnail" in outputs:
+        record["thumbnail"] = outputs.pop("thumbnail")
+    if "poster" in outputs:
+        record["poster"] = outputs.pop("poster")
+    if outputs:
+        record["exports"] = outputs
+    if errors:
+        record["postprocess_errors"] = errors
+    return record
+
+
+class PostProcessor:
+    """Пул ffmpeg процессов: каждое видео обрабатывается сразу после сохранения
+
+    Потоки пула только ждут дочерние процессы ffmpeg, поэтому параллелизм
+    равен числу одновременно работающих ffmpeg (workers).
+    """
+
+    def __init__(self, settings: PostProcessSettings):
+        self.settings = settings
+        self._pool = ThreadPoolExecutor(max_workers=settings.workers, thread_name_prefix="turan-post")
+        self._lock = threading.Lock()
+        self.active = 0
+
+    @classmethod
+    def from_config(cls, config_data: dict) -> Optional["PostProcessor"]:
+        """Постобработка по конфигурации, None если делать нечего или нет ffmpeg"""
+        settings = PostProcessSettings.from_config(config_data)
+        if not settings.has_work:
+            return None
+        if shutil.which(settings.ffmpeg) is None:
+            logger.warning("ffmpeg не найден (%s), миниатюры и экспорт в другие форматы отключены", settings.ffmpeg)
+            return None
+        return cls(settings)
+
+    @staticmethod
+    def wants(result: Dict) -> bool:
+        return result.get("status") == "success" and bool(result.get("local_path"))
+
+    def submit(self, result: Dict, deliver: Callable[[Dict], None]) -> Future:
+        """Постобработка видео результата, deliver(result) вызывается по завершении"""
+        with self._lock:
+            self.active += 1
+        future = self._pool.submit(postprocess_video, result["local_path"], self.settings)
+
+        def done(finished: Future):
+            with self._lock:
+                self.active -= 1
+            if finished.cancelled():
+                result["postprocess_errors"] = {"all": "Отменено при остановке"}
+            elif finished.exception() is not None:
+                result["postprocess_errors"] = {"all": str(finished.exception())}
+            else:
+                result.update(finished.result())
+            deliver(result)
+
+        future.add_done_callback(done)
+        return future
+
+    def close(self):
+        self._pool.shutdown(wait=True)
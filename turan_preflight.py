@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN Preflight - проверка входных изображений до вызовов API
+Заголовки JPEG/PNG разбираются без декодирования пикселей параллельно для всего
+набора: формат по сигнатуре, целостность файла, размер и размеры кадра,
+ориентация относительно выбранного соотношения сторон (с учетом EXIF).
+Отклоненные файлы попадают в отчет сразу, до отправки первой операции.
+"""
+
+import os
+import struct
+import logging
+import mimetypes
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, asdict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Форматы, которые принимает Veo (см. _encode_image_to_base64)
+SUPPORTED_MIME_TYPES = ("image/jpeg", "image/png")
+DEFAULT_MAX_FILE_SIZE = 50 * 1024 ** 2
+DEFAULT_MIN_DIMENSION = 256
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# SOF маркеры JPEG с размерами кадра (кроме DHT C4, JPG C8 и DAC CC)
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# EXIF ориентации 5-8 поворачивают кадр на 90 градусов
+_ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+class HeaderError(ValueError):
+    """Заголовок изображения поврежден или не распознан"""
+
+
+@dataclass
+class ImageCheck:
+    """Результат проверки одного изображения"""
+    path: str
+    ok: bool
+    reason: Optional[str] = None
+    mime_type: Optional[str] = None
+    size_bytes: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    orientation: int = 1
+
+    def to_result(self) -> Dict:
+        """Запись для отчета генерации (статус rejected)"""
+        return {
+            "source_image": self.path,
+            "status": "rejected",
+            "error": self.reason,
+            "preflight": {key: value for key, value in asdict(self).items() if key not in ("path", "ok", "reason")}
+        }
+
+
+def _exif_orientation(segment: bytes) -> int:
+    """Тег Orientation (0x0112) из APP1 Exif сегмента, 1 если его нет"""
+    if not segment.startswith(b"Exif\x00\x00") or len(segment) < 14:
+        return 1
+    tiff = segment[6:]
+    order = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if order is None:
+        return 1
+    offset = struct.unpack(order + "I", tiff[4:8])[0]
+    if offset + 2 > len(tiff):
+        return 1
+    entries = struct.unpack(order + "H", tiff[offset:offset + 2])[0]
+    for index in range(entries):
+        start = offset + 2 + index * 12
+        if start + 12 > len(tiff):
+            break
+        tag, _, _ = struct.unpack(order + "HHI", tiff[start:start + 8])
+        if tag == 0x0112:
+            return struct.unpack(order + "H", tiff[start + 8:start + 10])[0]
+    return 1
+
+
+def _jpeg_header(handle) -> Tuple[int, int, int]:
+    """Размеры и EXIF ориентация JPEG: проход по маркерам до SOF"""
+    handle.seek(2)
+    orientation = 1
+    while True:
+        byte = handle.read(1)
+        while byte == b"\xff":
+            byte = handle.read(1)
+        if not byte:
+            raise HeaderError("файл обрывается до заголовка кадра")
+        marker = byte[0]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            continue  # маркеры без длины
+        raw = handle.read(2)
+        if len(raw) != 2:
+            raise HeaderError("файл обрывается внутри маркера")
+        length = struct.unpack(">H", raw)[0]
+        if length < 2:
+            raise HeaderError(f"некорректная длина сегмента 0x{marker:02X}")
+        if marker in _JPEG_SOF_MARKERS:
+            data = handle.read(5)
+            if len(data) != 5:
+                raise HeaderError("поврежден заголовок кадра")
+            height, width = struct.unpack(">HH", data[1:5])
+            return width, height, orientation
+        if marker == 0xE1 and orientation == 1:
+            orientation = _exif_orientation(handle.read(length - 2))
+            continue
+        if marker in (0xD9, 0xDA):
+            raise HeaderError("нет заголовка кадра перед данными")
+        handle.seek(length - 2, os.SEEK_CUR)
+
+
+def _png_header(handle) -> Tuple[int, int, int]:
+    handle.seek(8)
+    chunk = handle.read(25)
+    if len(chunk) != 25 or chunk[4:8] != b"IHDR":
+        raise HeaderError("нет блока IHDR")
+    width, height = struct.unpack(">II", chunk[8:16])
+    return width, height, 1
+
+
+def _is_truncated(handle, kind: str, size: int) -> bool:
+    """Проверка окончания файла: EOI для JPEG, IEND для PNG"""
+    tail_size = 12 if kind == "png" else 2
+    if size < tail_size:
+        return True
+    handle.seek(size - tail_size)
+    tail = handle.read(tail_size)
+    if kind == "png":
+        return tail[4:8] != b"IEND"
+    # Некоторые камеры дописывают нули после EOI, ищем маркер в последнем килобайте
+    if tail == b"\xff\xd9":
+        return False
+    handle.seek(max(0, size - 1024))
+    return b"\xff\xd9" not in handle.read()
+
+
+def read_image_header(path: str) -> Tuple[str, int, int, int, bool]:
+    """(MIME по сигнатуре, ширина, высота, EXIF ориентация, обрезан ли файл)"""
+    size = os.path.getsize(path)
+    with open(path, "rb") as handle:
+        signature = handle.read(8)
+        if signature.startswith(b"\xff\xd8"):
+            kind, mime_type = "jpeg", "image/jpeg"
+            width, height, orientation = _jpeg_header(handle)
+        elif signature == _PNG_SIGNATURE:
+            kind, mime_type = "png", "image/png"
+            width, height, orientation = _png_header(handle)
+        elif signature[:4] == b"RIFF":
+            raise HeaderError("формат WebP не поддерживается Veo")
+        else:
+            raise HeaderError("неизвестная сигнатура файла")
+        truncated = _is_truncated(handle, kind, size)
+    return mime_type, width, height, orientation, truncated
+
+
+def check_image(
+    path: str,
+    aspect_ratio: Optional[str] = None,
+    max_file_size: int = DEFAULT_MAX_FILE_SIZE,
+    min_dimension: int = DEFAULT_MIN_DIMENSION
+) -> ImageCheck:
+    """Проверка одного изображения; aspect_ratio - значение AspectRatio ("16:9", "9:16")"""
+    check = ImageCheck(path=path, ok=False)
+    try:
+        check.size_bytes = os.path.getsize(path)
+    except OSError as e:
+        check.reason = f"Файл недоступен: {e}"
+        return check
+
+    if check.size_bytes == 0:
+        check.reason = "Пустой файл"
+        return check
+    if check.size_bytes > max_file_size:
+        check.reason = f"Файл больше лимита: {check.size_bytes} > {max_file_size} байт"
+        return check
+
+    guessed, _ = mimetypes.guess_type(path)
+    try:
+        mime_type, width, height, orientation, truncated = read_image_header(path)
+    except (HeaderError, struct.error) as e:
+        check.reason = f"Поврежденное или неподдерживаемое изображение: {e}"
+        return check
+    except OSError as e:
+        check.reason = f"Ошибка чтения: {e}"
+        return check
+
+    check.mime_type, check.orientation = mime_type, orientation
+    if orientation in _ROTATED_ORIENTATIONS:
+        width, height = height, width
+    check.width, check.height = width, height
+
+    if guessed not in SUPPORTED_MIME_TYPES:
+        check.reason = f"Неподдерживаемый тип по расширению: {guessed}"
+    elif guessed != mime_type:
+        # _encode_image_to_base64 берет тип из расширения, Veo отклонит несовпадение
+        check.reason = f"Расширение ({guessed}) не совпадает с содержимым ({mime_type})"
+    elif truncated:
+        check.reason = "Файл обрезан (нет маркера конца изображения)"
+    elif min(width, height) < min_dimension:
+        check.reason = f"Слишком маленькое изображение: {width}x{height} (минимум {min_dimension}px)"
+    elif aspect_ratio == "16:9" and height > width:
+        check.reason = f"Вертикальное изображение {width}x{height} для горизонтального видео 16:9"
+    elif aspect_ratio == "9:16" and width > height:
+        check.reason = f"Горизонтальное изображение {width}x{height} для вертикального видео 9:16"
+    else:
+        check.ok = True
+    return check
+
+
+def validate_images(
+    paths: List[str],
+    aspect_ratio: Optional[str] = None,
+    max_file_size: int = DEFAULT_MAX_FILE_SIZE,
+    min_dimension: int = DEFAULT_MIN_DIMENSION,
+    workers: int = 8
+) -> Tuple[List[str], List[ImageCheck]]:
+    """Параллельная проверка набора: (годные пути в исходном порядке, отклоненные)"""
+    if not paths:
+        return [], []
+
+    def run(path: str) -> ImageCheck:
+        return check_image(path, aspect_ratio, max_file_size, min_dimension)
+
+    # Чтение заголовков ограничено вводом-выводом, потоков достаточно
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(paths)))) as pool:
+        checks = list(pool.map(run, paths))
+
+    accepted = [check.path for check in checks if check.ok]
+    rejected = [check for check in checks if not check.ok]
+    for check in rejected:
+        logger.warning(f"Предварительная проверка отклонила {check.path}: {check.reason}")
+    if rejected:
+        logger.info("Предварительная проверка: %s годных, %s отклонено", len(accepted), len(rejected))
+    return accepted, rejected
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN Preview - двухуровневая генерация: дешевые превью, затем финальные видео
+Сначала для каждого изображения и каждого сценария-кандидата рендерится превью
+в 720p без звука. Финальные 1080p видео создаются только для одобренных превью
+с тем же сценарием и seed. Одобрение берется из файла (job_id или имена файлов
+превью по одному в строке) или из функции оценки, которая автоматически
+выбирает лучшие превью каждого изображения.
+"""
+
+import os
+import random
+import hashlib
+import logging
+import importlib
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_FOLDER = "previews"
+FINAL_FOLDER = "final"
+PREVIEW_REPORT = "preview_report.jsonl"
+
+
+@dataclass
+class TierSettings:
+    """Параметры двухуровневой генерации (секция tiered YAML конфигурации)"""
+    candidates: int = 3  # сценариев на изображение, 0 - все сценарии каталога
+    scenarios: List[str] = field(default_factory=list)  # явный список кандидатов
+    approval_file: str = "approved.txt"  # относительно папки превью
+    scoring_hook: Optional[str] = None  # "module:function", оценка результата превью
+    auto_select: int = 1  # лучших превью на изображение при выборе по оценке
+    min_score: float = 0.0
+
+    @classmethod
+    def from_config(cls, config_data: dict) -> "TierSettings":
+        tiered = config_data.get('tiered', {}) or {}
+        return cls(
+            candidates=int(tiered.get('candidates', cls.candidates)),
+            scenarios=list(tiered.get('scenarios') or []),
+            approval_file=tiered.get('approval_file', cls.approval_file),
+            scoring_hook=tiered.get('scoring_hook') or None,
+            auto_select=int(tiered.get('auto_select', cls.auto_select)),
+            min_score=float(tiered.get('min_score', cls.min_score))
+        )
+
+
+def preview_overrides() -> Dict:
+    """Параметры превью: HD без звука (быстрее и дешевле финального рендера)"""
+    return {"resolution": "720p", "generate_audio": False}
+
+
+def final_overrides() -> Dict:
+    """Параметры финального рендера одобренного превью"""
+    return {"resolution": "1080p"}
+
+
+def tier_seed(image_path: str, scenario_id: str) -> int:
+    """Seed, общий для превью и финала, если он не задан в конфигурации"""
+    digest = hashlib.sha256(f"{os.path.basename(image_path)}|{scenario_id}".encode('utf-8')).hexdigest()
+    return int(digest[:8], 16)
+
+
+def candidate_scenarios(image_path: str, scenario_ids: List[str], settings: TierSettings) -> List[str]:
+    """Сценарии-кандидаты изображения: явный список или устойчивая выборка каталога"""
+    if settings.scenarios:
+        return list(settings.scenarios)
+    if settings.candidates <= 0 or settings.candidates >= len(scenario_ids):
+        return list(scenario_ids)
+    # Выборка зависит только от имени файла, повторный запуск дает тех же кандидатов
+    rng = random.Random(os.path.basename(image_path))
+    return rng.sample(scenario_ids, settings.candidates)
+
+
+def read_approval_file(path: str) -> Set[str]:
+    """Одобренные превью: job_id, имя файла или путь в строке, # - комментарий"""
+    approved = set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                approved.add(line)
+                approved.add(os.path.basename(line))
+    return approved
+
+
+def is_approved(preview: Dict, approved: Set[str]) -> bool:
+    local_path = preview.get("local_path") or ""
+    return bool(
+        preview.get("job_id") in approved
+        or (local_path and (local_path in approved or os.path.basename(local_path) in approved))
+    )
+
+
+def load_scoring_hook(spec: str) -> Callable[[Dict], float]:
+    """Функция оценки превью по строке "module:function" """
+    module_name, _, function_name = spec.partition(':')
+    if not module_name or not function_name:
+        raise ValueError(f"Ожидается module:function, получено: {spec}")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def select_by_score(previews: Iterable[Dict], hook: Callable[[Dict], float], settings: TierSettings) -> List[Dict]:
+    """Лучшие превью каждого изображения по оценке hook (не ниже min_score)"""
+    scored: Dict[str, List[tuple]] = {}
+    for preview in previews:
+        try:
+            score = float(hook(preview))
+        except Exception as e:
+            logger.warning(f"Оценка превью {preview.get('job_id')} не удалась: {e}")
+            continue
+        preview["score"] = score
+        if score >= settings.min_score:
+            scored.setdefault(preview["source_image"], []).append((score, preview))
+    selected = []
+    for candidates in scored.values():
+        candidates.sort(key=lambda item: item[0], reverse=True)
+        selected.extend(preview for _, preview in candidates[:settings.auto_select])
+    return selected
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN Progress - живая панель прогресса пакета в терминале
+Панель получает события планировщика (listener) и глубину очередей конвейера
+(attach) и показывает операции в работе с их возрастом, очереди стадий,
+готовые и проваленные задания, видео в час и оценку времени до конца пакета.
+Обработчик событий только обновляет счетчики, отрисовка идет в отдельном
+потоке не чаще refresh_interval, поэтому панель не замедляет конвейер.
+Вне терминала вместо панели раз в plain_interval пишется одна строка.
+"""
+
+import os
+import sys
+import time
+import shutil
+import logging
+import threading
+from typing import Dict, List, Optional
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Окно для скорости и оценки времени: старт пакета медленнее установившегося режима
+RATE_WINDOW = 600.0
+MAX_ROWS = 8
+MAX_LOG_LINES = 4
+STAGE_LABELS = (
+    ("scan", "scan"), ("encode", "encode"), ("submit", "submit"),
+    ("in_flight", "генерация"), ("download", "download"), ("postprocess", "postprocess")
+)
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "--:--"
+    seconds = int(max(0, seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class ProgressDashboard:
+    """Панель прогресса по событиям OperationScheduler
+
+    listener подключается к планировщику (create_scheduler), attach(pipeline)
+    дает глубину очередей и число заданий и запускает отрисовку, close()
+    оставляет на экране итоговый кадр.
+    """
+
+    def __init__(self, stream=None, refresh_interval: float = 0.5, plain_interval: float = 30.0):
+        self.stream = stream or sys.stderr
+        self.refresh_interval = max(0.1, refresh_interval)
+        self.plain_interval = plain_interval
+        self.interactive = (
+            hasattr(self.stream, "isatty") and self.stream.isatty()
+            and os.environ.get("TERM") != "dumb" and os.name != "nt"
+        )
+        self._lock = threading.Lock()
+        self._pipeline = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._console = None
+        self._drawn_lines = 0
+        self._started = time.monotonic()
+        # job_id -> операции в работе (основная и дубликат хеджирования)
+        self._in_flight: Dict[str, Dict] = {}
+        self._finished: deque = deque()  # (время, успешных видео)
+        self._messages: deque = deque()  # строки для вывода над панелью
+        self._log_lines: deque = deque(maxlen=MAX_LOG_LINES)
+        self.counts = {"done": 0, "videos": 0, "errors": 0, "failed": 0, "interrupted": 0, "retries": 0, "hedged": 0}
+
+    @classmethod
+    def from_config(cls, config_data: dict) -> Optional["ProgressDashboard"]:
+        """Панель, если включен monitoring.enable_progress_bar"""
+        monitoring = config_data.get('monitoring', {}) or {}
+        if not monitoring.get('enable_progress_bar', False):
+            return None
+        return cls(
+            refresh_interval=float(monitoring.get('progress_refresh', 0.5)),
+            plain_interval=float(monitoring.get('progress_plain_interval', 30.0))
+        )
+
+    def listener(self, event: str, job, **data):
+        """Слушатель событий планировщика: только учет, без вывода"""
+        now = time.monotonic()
+        with self._lock:
+            if event in ("submitted", "hedge_submitted"):
+                entry = self._in_flight.setdefault(job.job_id, {"since": now, "jobs": []})
+                entry["jobs"].append(job)
+            elif event == "retry":
+                self.counts["retries"] += 1
+            elif event == "hedged":
+                self.counts["hedged"] += 1
+            elif event == "completed":
+                results = data.get("results") or []
+                videos = sum(1 for result in results if result.get("status") == "success")
+                self.counts["videos"] += videos
+                self.counts["errors"] += sum(1 for result in results if result.get("status") == "error")
+                self._finish(job, now, videos)
+            elif event == "failed":
+                self.counts["failed"] += 1
+                self._finish(job, now, 0)
+            elif event in ("skipped", "cancelled"):
+                # Прерванные остановкой (отмена операции в API - отдельное событие operation_cancelled)
+                self.counts["interrupted"] += 1
+                self._finish(job, now, 0)
+
+    def _finish(self, job, now: float, videos: int):
+        self._in_flight.pop(job.job_id, None)
+        self.counts["done"] += 1
+        self._finished.append((now, videos))
+        while self._finished and now - self._finished[0][0] > RATE_WINDOW:
+            self._finished.popleft()
+
+    def attach(self, pipeline):
+        """Источник глубины очередей и числа заданий, запуск отрисовки"""
+        with self._lock:
+            self._pipeline = pipeline
+            if self._thread is not None:
+                return
+            self._started = time.monotonic()
+        if self.interactive:
+            self._capture_console_log()
+        self._thread = threading.Thread(target=self._render_loop, name="turan-progress", daemon=True)
+        self._thread.start()
+
+    def message(self, text: str):
+        """Строка над панелью (вместо print, чтобы не разорвать кадр)"""
+        if self._thread is None or not self.interactive:
+            print(text)
+            return
+        with self._lock:
+            self._messages.append(text)
+
+    def _capture_console_log(self):
+        """Записи лога в консоль показываются внутри панели (в файл пишутся как обычно)"""
+        from turan_logging import console_handler
+
+        self._console = console_handler()
+        if self._console is not None:
+            self._console.addFilter(self._log_filter)
+
+    def _log_filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            self._log_lines.append(f"{record.levelname}: {record.getMessage()}")
+        return False
+
+    def rates(self, now: Optional[float] = None) -> Dict[str, Optional[float]]:
+        """Заданий в секунду и видео в час по окну последних RATE_WINDOW секунд"""
+        now = now or time.monotonic()
+        with self._lock:
+            finished = [item for item in self._finished if now - item[0] <= RATE_WINDOW]
+        span = min(RATE_WINDOW, now - self._started)
+        if not finished or span <= 0:
+            return {"jobs_per_second": None, "videos_per_hour": None}
+        return {
+            "jobs_per_second": len(finished) / span,
+            "videos_per_hour": sum(videos for _, videos in finished) * 3600 / span
+        }
+
+    def snapshot(self) -> Dict:
+        """Состояние панели для отрисовки"""
+        now = time.monotonic()
+        pipeline = self._pipeline
+        depths = pipeline.depths() if pipeline is not None else {}
+        total = pipeline.scanned if pipeline is not None else None
+        total_known = bool(pipeline is not None and pipeline.scan_complete)
+        with self._lock:
+            counts = dict(self.counts)
+            operations = []
+            for job_id, entry in self._in_flight.items():
+                jobs = entry["jobs"]
+                # Завершенная операция до события completed ждет скачивания
+                generating = any(job.completed_at is None for job in jobs)
+                region = next((job.region for job in jobs if not job.is_hedge), jobs[0].region)
+                operations.append({
+                    "job_id": job_id,
+                    "region": region or "",
+                    "state": "генерация" if generating else "скачивание",
+                    "hedged": len(jobs) > 1,
+                    "age": now - entry["since"]
+                })
+        operations.sort(key=lambda operation: operation["age"], reverse=True)
+        rates = self.rates(now)
+        eta = None
+        if total_known and rates["jobs_per_second"]:
+            eta = max(0, total - counts["done"]) / rates["jobs_per_second"]
+        return {
+            "elapsed": now - self._started,
+            "counts": counts,
+            "total": total,
+            "total_known": total_known,
+            "depths": depths,
+            "operations": operations,
+            "videos_per_hour": rates["videos_per_hour"],
+            "eta": eta
+        }
+
+    def render(self, snapshot: Optional[Dict] = None) -> List[str]:
+        """Строки кадра панели"""
+        snapshot = snapshot or self.snapshot()
+        counts = snapshot["counts"]
+        total = snapshot["total"]
+        if total is None:
+            progress = f"{counts['done']}"
+        else:
+            progress = f"{counts['done']}/{total}" + ("" if snapshot["total_known"] else "+")
+        rate = snapshot["videos_per_hour"]
+        lines = [
+            f"⏱️ {format_duration(snapshot['elapsed'])}  готово {progress}  "
+            f"видео {counts['videos']}  ошибок {counts['errors'] + counts['failed']}  "
+            f"{f'{rate:.1f}' if rate is not None else '--'} видео/ч  "
+            f"осталось {format_duration(snapshot['eta'])}"
+        ]
+        extra = []
+        if counts["retries"]:
+            extra.append(f"повторов {counts['retries']}")
+        if counts["hedged"]:
+            extra.append(f"дубликатов {counts['hedged']}")
+        if counts["interrupted"]:
+            extra.append(f"прервано {counts['interrupted']}")
+        depths = snapshot["depths"]
+        if depths:
+            lines.append("📦 " + " | ".join(f"{label} {depths.get(stage, 0)}" for stage, label in STAGE_LABELS)
+                         + (f"   {', '.join(extra)}" if extra else ""))
+        elif extra:
+            lines.append("📦 " + ", ".join(extra))
+
+        operations = snapshot["operations"]
+        lines.append(f"🎬 В работе: {len(operations)}")
+        for operation in operations[:MAX_ROWS]:
+            marker = " +дубликат" if operation["hedged"] else ""
+            lines.append(
+                f"   {format_duration(operation['age']):>8}  {operation['state']:<10}  "
+                f"{operation['region']:<14}  {operation['job_id']}{marker}"
+            )
+        if len(operations) > MAX_ROWS:
+            lines.append(f"   ... и еще {len(operations) - MAX_ROWS}")
+        lines.extend(f"⚠️ {line}" for line in list(self._log_lines))
+        return lines
+
+    def _draw(self, final: bool = False):
+        width = max(20, shutil.get_terminal_size((100, 20)).columns - 1)
+        with self._lock:
+            messages = list(self._messages)
+            self._messages.clear()
+        lines = [line[:width] for line in self.render()]
+        # Возврат к началу прошлого кадра и очистка до конца экрана
+        output = f"\x1b[{self._drawn_lines}F\x1b[J" if self._drawn_lines else ""
+        output += "".join(f"{message}\n" for message in messages)
+        output += "\n".join(lines) + "\n"
+        self.stream.write(output)
+        self.stream.flush()
+        self._drawn_lines = 0 if final else len(lines)
+
+    def _plain_line(self) -> str:
+        snapshot = self.snapshot()
+        counts = snapshot["counts"]
+        rate = snapshot["videos_per_hour"]
+        return (
+            f"Прогресс: готово {counts['done']}"
+            + (f"/{snapshot['total']}" if snapshot["total"] is not None else "")
+            + f", в работе {len(snapshot['operations'])}, ошибок {counts['errors'] + counts['failed']}, "
+            f"{f'{rate:.1f}' if rate is not None else '--'} видео/ч, осталось {format_duration(snapshot['eta'])}"
+        )
+
+    def _render_loop(self):
+        interval = self.refresh_interval if self.interactive else self.plain_interval
+        while not self._stop.wait(interval):
+            try:
+                if self.interactive:
+                    self._draw()
+                else:
+                    self.stream.write(self._plain_line() + "\n")
+                    self.stream.flush()
+            except Exception as e:
+                # Ошибка вывода не должна останавливать пакет
+                logger.debug(f"Отрисовка панели прогресса не удалась: {e}")
+
+    def close(self):
+        """Остановка отрисовки, итоговый кадр остается на экране"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        if self._console is not None:
+            self._console.removeFilter(self._log_filter)
+            self._console = None
+        if self.interactive:
+            self._draw(final=True)
+        else:
+            self.stream.write(self._plain_line() + "\n")
+            self.stream.flush()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN Results - потоковая запись и чтение результатов генерации
+Результаты пишутся в JSONL по одному по мере готовности, память не растет
+с размером пакета. Сценарий (длинный промпт, озвучка) записывается в файл один раз
+отдельной строкой, а результаты ссылаются на него по scenario_id.
+Служебные строки (сценарии, сборки роликов) отмечены полем record.
+"""
+
+import logging
+from typing import Callable, Dict, Iterator, List, Optional
+from pathlib import Path
+
+import turan_json
+
+logger = logging.getLogger(__name__)
+
+SCENARIO_RECORD = "scenario"
+COMPOSITION_RECORD = "composition"
+MAX_ERRORS_KEPT = 50
+
+
+class JsonlResultWriter:
+    """Запись результатов в JSONL, каждая строка сбрасывается на диск сразу
+
+    scenario_lookup(scenario_id) возвращает сценарий для однократной записи
+    перед первым результатом, который на него ссылается.
+    """
+
+    def __init__(self, path: str, scenario_lookup: Optional[Callable[[str], Optional[Dict]]] = None, append: bool = False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.scenario_lookup = scenario_lookup
+        self.count = 0
+        self._written_scenarios = set()
+        self._file = open(self.path, 'ab' if append else 'wb')
+
+    def __enter__(self) -> "JsonlResultWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write_line(self, record: Dict):
+        self._file.write(turan_json.dumps_line(record))
+
+    def write_record(self, record: Dict):
+        """Служебная строка отчета (поле record), не считается результатом генерации"""
+        self._write_line(record)
+        self._file.flush()
+
+    def write(self, result: Dict):
+        scenario_id = result.get("scenario_id")
+        if scenario_id and scenario_id not in self._written_scenarios and self.scenario_lookup is not None:
+            scenario = self.scenario_lookup(scenario_id)
+            if scenario is not None:
+                self._write_line({"record": SCENARIO_RECORD, "scenario_id": scenario_id, "scenario": scenario})
+            self._written_scenarios.add(scenario_id)
+        self._write_line(result)
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def _iter_records(path: str) -> Iterator[Dict]:
+    """Записи отчета: JSONL построчно или старый JSON список целиком"""
+    with open(path, 'rb') as f:
+        if str(path).endswith(".json"):
+            data = turan_json.loads(f.read())
+            yield from (data if isinstance(data, list) else [])
+            return
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield turan_json.loads(line)
+            except ValueError:
+                # Последняя строка может быть недописана при аварийной остановке
+                logger.warning(f"Пропущена поврежденная строка {number} в {path}")
+
+
+def iter_results(path: str) -> Iterator[Dict]:
+    """Результаты из отчета без служебных строк (сценарии, сборки роликов)"""
+    for record in _iter_records(path):
+        if "record" not in record:
+            yield record
+
+
+def iter_compositions(path: str) -> Iterator[Dict]:
+    """Записи о собранных роликах из отчета"""
+    for record in _iter_records(path):
+        if record.get("record") == COMPOSITION_RECORD:
+            yield record
+
+
+def load_scenarios(path: str) -> Dict[str, Dict]:
+    """Сценарии, записанные в отчет: {scenario_id: сценарий}"""
+    return {
+        record["scenario_id"]: record["scenario"]
+        for record in _iter_records(path)
+        if record.get("record") == SCENARIO_RECORD
+    }
+
+
+class ResultSummary:
+    """Счетчики для итоговой статистики без хранения самих результатов"""
+
+    def __init__(self):
+        self.total = 0
+        self.statuses: Dict[str, int] = {}
+        self.scenario_usage: Dict[str, int] = {}
+        self.errors: List[tuple] = []
+
+    def add(self, result: Dict):
+        status = result.get("status", "error")
+        self.total += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status == "success" and result.get("scenario_id"):
+            key = f"{result['scenario_id']} ({result.get('cinematic_style', 'Standard')})"
+            self.scenario_usage[key] = self.scenario_usage.get(key, 0) + 1
+        elif status == "error" and len(self.errors) < MAX_ERRORS_KEPT:
+            self.errors.append((result.get("source_image"), result.get("error", "Unknown error")))
+
+    @property
+    def successful(self) -> int:
+        return self.statuses.get("success", 0)
+
+    @property
+    def interrupted(self) -> int:
+        return self.statuses.get("skipped", 0) + self.statuses.get("cancelled", 0)
+
+    @property
+    def duplicates(self) -> int:
+        return self.statuses.get("duplicate", 0)
+
+    @property
+    def rejected(self) -> int:
+        return self.statuses.get("rejected", 0)
+
+    @property
+    def failed(self) -> int:
+        return self.total - self.successful - self.interrupted - self.duplicates - self.rejected
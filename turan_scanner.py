@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN Scanner - рекурсивный потоковый обход каталога изображений
+Обход через os.scandir без построения полного списка, вложенные папки SKU
+обрабатываются по мере чтения. Манифест в SQLite (путь, размер, mtime,
+SHA-256, статус) позволяет повторному запуску выдавать только новые
+и измененные файлы: папки с неизменным mtime не перечитываются, а файл,
+у которого изменился только mtime (touch, перезапись тем же содержимым),
+не ставится в очередь повторно. Копия обработанного файла по другому пути
+(то же фото в папке другого SKU) обрабатывается, если не включен match_content.
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+DEFAULT_MANIFEST = "turan_scan_manifest.db"
+# Статусы, после которых неизмененный файл больше не обрабатывается
+SETTLED_STATUSES = ("done", "duplicate", "rejected")
+HASH_CHUNK = 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_files_directory ON files (directory, status);
+CREATE INDEX IF NOT EXISTS idx_files_sha256 ON files (sha256, status);
+
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    subdirs TEXT NOT NULL
+);
+"""
+
+
+@dataclass
+class ScanEntry:
+    """Файл изображения, найденный при обходе"""
+    path: str
+    size: int
+    mtime_ns: int
+
+
+def _matches(name: str, extensions: Tuple[str, ...]) -> bool:
+    return not name.startswith('.') and os.path.splitext(name)[1].lower() in extensions
+
+
+def scan_images(root: str, extensions: Iterable[str] = DEFAULT_EXTENSIONS, recursive: bool = True) -> Iterator[ScanEntry]:
+    """Потоковый обход: файлы выдаются по мере чтения папок, скрытые пропускаются"""
+    extensions = tuple(ext.lower() for ext in extensions)
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                subdirs = []
+                for entry in entries:
+                    try:
+                        # Тип берется из d_type без отдельного stat на Linux
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive and not entry.name.startswith('.'):
+                                subdirs.append(entry.path)
+                        elif entry.is_file() and _matches(entry.name, extensions):
+                            stat = entry.stat()
+                            yield ScanEntry(entry.path, stat.st_size, stat.st_mtime_ns)
+                    except OSError as e:
+                        logger.warning(f"Пропущен {entry.path}: {e}")
+                stack.extend(sorted(subdirs, reverse=True))
+        except OSError as e:
+            logger.warning(f"Не удалось прочитать папку {directory}: {e}")
+
+
+def file_sha256(path: str) -> Optional[str]:
+    """SHA-256 содержимого файла (None, если файл недоступен)"""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                digest.update(chunk)
+    except OSError as e:
+        logger.warning(f"Не удалось прочитать {path} для хеша: {e}")
+        return None
+    return digest.hexdigest()
+
+
+class ScanManifest:
+    """Манифест каталога: что уже найдено и что уже обработано
+
+    scan() выдает пути файлов, которые нужно обработать: новые, измененные
+    и ранее не завершенные. mark() фиксирует исход обработки. Для папки
+    с неизменным mtime список файлов и подпапок берется из манифеста, поэтому
+    время повторного обхода зависит от числа изменений, а не от размера каталога.
+    Изменение файла на месте (без переименования) не меняет mtime папки,
+    для такого случая есть полный обход (trust_directory_mtime=False).
+    match_content=True пропускает и файлы по другим путям с уже обработанным
+    содержимым (переименованные и перемещенные); по умолчанию такой файл
+    обрабатывается, потому что видео нужно в его выходной подпапке.
+    Методы можно вызывать из разных потоков (обход в стадии scan, mark из потребителя).
+    """
+
+    def __init__(self, path: str = DEFAULT_MANIFEST, hash_workers: int = 4, match_content: bool = False):
+        self.path = path
+        self.hash_workers = hash_workers
+        self.match_content = match_content
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self.stats = {"directories": 0, "directories_cached": 0, "files_seen": 0, "files_hashed": 0, "candidates": 0}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _settled_hash(self, sha256: str) -> Optional[str]:
+        row = self._conn.execute(
+            f"SELECT status FROM files WHERE sha256 = ? AND status IN ({', '.join('?' * len(SETTLED_STATUSES))}) LIMIT 1",
+            (sha256, *SETTLED_STATUSES)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _inherited_status(self, sha256: Optional[str], previous: Optional[tuple]) -> str:
+        """Статус нового или измененного файла: previous - (sha256, статус) прошлой записи пути"""
+        if sha256 is None:
+            return "pending"
+        if previous is not None and previous[0] == sha256 and previous[1] in SETTLED_STATUSES:
+            # То же содержимое по тому же пути (touch или перезапись без изменений)
+            return previous[1]
+        if self.match_content:
+            return self._settled_hash(sha256) or "pending"
+        return "pending"
+
+    def _pending_in(self, directory: str) -> List[str]:
+        rows = self._conn.execute(
+            f"SELECT path FROM files WHERE directory = ? AND status NOT IN ({', '.join('?' * len(SETTLED_STATUSES))}) ORDER BY path",
+            (directory, *SETTLED_STATUSES)
+        ).fetchall()
+        return [path for path, in rows]
+
+    def _list_directory(self, directory: str, extensions: Tuple[str, ...], recursive: bool) -> Tuple[List[ScanEntry], List[str]]:
+        files, subdirs = [], []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive and not entry.name.startswith('.'):
+                            subdirs.append(entry.path)
+                    elif entry.is_file() and _matches(entry.name, extensions):
+                        stat = entry.stat()
+                        files.append(ScanEntry(entry.path, stat.st_size, stat.st_mtime_ns))
+                except OSError as e:
+                    logger.warning(f"Пропущен {entry.path}: {e}")
+        return sorted(files, key=lambda f: f.path), sorted(subdirs)
+
+    def _reconcile(self, directory: str, files: List[ScanEntry], reprocess: bool) -> List[str]:
+        """Сверка содержимого папки с манифестом, возвращает пути к обработке"""
+        known = {
+            path: (size, mtime_ns, status, sha256)
+            for path, size, mtime_ns, status, sha256 in self._conn.execute(
+                "SELECT path, size, mtime_ns, status, sha256 FROM files WHERE directory = ?", (directory,)
+            )
+        }
+        changed = [f for f in files if known.get(f.path, (None, None))[:2] != (f.size, f.mtime_ns)]
+
+        # Хеши только для новых и измененных файлов, чтение параллельно (сетевые диски)
+        if len(changed) > 1 and self.hash_workers > 1:
+            with ThreadPoolExecutor(max_workers=self.hash_workers) as pool:
+                hashes = list(pool.map(file_sha256, [f.path for f in changed]))
+        else:
+            hashes = [file_sha256(f.path) for f in changed]
+        self.stats["files_hashed"] += len(changed)
+
+        now = time.time()
+        candidates = []
+        rows = []
+        for entry, sha256 in zip(changed, hashes):
+            status = "pending"
+            if not reprocess:
+                previous = known.get(entry.path)
+                status = self._inherited_status(sha256, (previous[3], previous[2]) if previous else None)
+            rows.append((entry.path, directory, entry.size, entry.mtime_ns, sha256, status, now))
+            if status == "pending":
+                candidates.append(entry.path)
+
+        changed_paths = {f.path for f in changed}
+        for entry in files:
+            if entry.path in changed_paths:
+                continue
+            status = known[entry.path][2]
+            if reprocess or status not in SETTLED_STATUSES:
+                candidates.append(entry.path)
+
+        seen = {f.path for f in files}
+        removed = [(path,) for path in known if path not in seen]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO files (path, directory, size, mtime_ns, sha256, status, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            if removed:
+                self._conn.executemany("DELETE FROM files WHERE path = ?", removed)
+        return sorted(candidates)
+
+    def scan(
+        self,
+        root: str,
+        extensions: Iterable[str] = DEFAULT_EXTENSIONS,
+        recursive: bool = True,
+        trust_directory_mtime: bool = True,
+        reprocess: bool = False
+    ) -> Iterator[str]:
+        """Пути к обработке по мере обхода (reprocess - выдать все файлы каталога)"""
+        extensions = tuple(ext.lower() for ext in extensions)
+        stack = [os.path.normpath(root)]
+        while stack:
+            directory = stack.pop()
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+            except OSError as e:
+                logger.warning(f"Не удалось прочитать папку {directory}: {e}")
+                continue
+            self.stats["directories"] += 1
+
+            with self._lock:
+                cached = self._conn.execute(
+                    "SELECT mtime_ns, subdirs FROM directories WHERE path = ?", (directory,)
+                ).fetchone()
+                if cached and cached[0] == mtime_ns and trust_directory_mtime and not reprocess:
+                    # Папка не менялась: берем подпапки и незавершенные файлы из манифеста
+                    self.stats["directories_cached"] += 1
+                    candidates = self._pending_in(directory)
+                    subdirs = json.loads(cached[1])
+                else:
+                    try:
+                        files, subdirs = self._list_directory(directory, extensions, recursive)
+                    except OSError as e:
+                        logger.warning(f"Не удалось прочитать папку {directory}: {e}")
+                        continue
+                    self.stats["files_seen"] += len(files)
+                    candidates = self._reconcile(directory, files, reprocess)
+                    with self._conn:
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO directories (path, mtime_ns, subdirs) VALUES (?, ?, ?)",
+                            (directory, mtime_ns, json.dumps(subdirs))
+                        )
+
+            self.stats["candidates"] += len(candidates)
+            yield from candidates
+            stack.extend(reversed(subdirs))
+
+    def mark(self, paths: Iterable[str], status: str):
+        """Исход обработки: done, duplicate, rejected (не повторяются) или error"""
+        rows = [(status, time.time(), os.path.normpath(path)) for path in paths]
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE files SET status = ?, updated_at = ? WHERE path = ?", rows)
+
+    def admit(self, path: str) -> bool:
+        """Регистрация одного файла (режим наблюдения): True, если его нужно обработать"""
+        path = os.path.normpath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        with self._lock:
+            row = self._conn.execute("SELECT size, mtime_ns, status, sha256 FROM files WHERE path = ?", (path,)).fetchone()
+            if row and row[:2] == (stat.st_size, stat.st_mtime_ns):
+                return row[2] not in SETTLED_STATUSES
+        sha256 = file_sha256(path)
+        if sha256 is None:
+            return False
+        with self._lock, self._conn:
+            self.stats["files_hashed"] += 1
+            status = self._inherited_status(sha256, (row[3], row[2]) if row else None)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, directory, size, mtime_ns, sha256, status, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, os.path.dirname(path), stat.st_size, stat.st_mtime_ns, sha256, status, time.time())
+            )
+        return status == "pending"
+
+    def summary(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM files GROUP BY status").fetchall())
+        return {**counts, **self.stats}
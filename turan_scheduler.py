@@ -0,0 +1,674 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN Scheduler - планировщик операций генерации Veo
+Одновременные операции, опрос по расписанию, повторы и выбор региона.
+Одна и та же логика используется движком и симулятором (turan_simulator).
+"""
+
+import math
+import time
+import queue
+import random
+import signal
+import logging
+import threading
+from typing import Dict, List, Optional, Iterator, Any, Callable
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class RetryableError(Exception):
+    """Временная ошибка API (429/5xx) - задание можно повторить позже"""
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Перцентиль q (0-100) с линейной интерполяцией"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100.0
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+@dataclass
+class SchedulerSettings:
+    """Параметры планировщика операций"""
+    max_concurrent_operations: int = 2
+    poll_interval: float = 10.0
+    initial_poll_delay: float = 10.0
+    poll_error_delay: float = 5.0
+    operation_timeout: float = 600.0
+    retry_attempts: int = 3
+    retry_delay: float = 5.0
+    region_weights: Dict[str, float] = field(default_factory=lambda: {"us-central1": 1.0})
+    seed: Optional[int] = None
+    # Адаптивный параллелизм (turan_concurrency): max_concurrent_operations - начальное окно
+    adaptive_concurrency: bool = False
+    concurrency_min: int = 1
+    concurrency_max: int = 8
+    concurrency_increase: float = 1.0
+    concurrency_decrease: float = 0.5
+    submit_latency_threshold: Optional[float] = 5.0
+    # Хеджирование: дубликат операции, превысившей перцентиль наблюдаемой задержки
+    hedge_enabled: bool = False
+    hedge_percentile: float = 95.0
+    hedge_min_samples: int = 10
+    hedge_max_fraction: float = 0.1  # не больше этой доли дополнительных операций
+    hedge_other_region: bool = True
+    # Остановка по сигналу: drain - доработать начатое, abort - отменить операции
+    shutdown_mode: str = "drain"
+    drain_timeout: Optional[float] = 300.0
+
+    @classmethod
+    def from_config(cls, config_data: dict, default_location: str = "us-central1") -> "SchedulerSettings":
+        """Создание настроек из секций veo_api и performance YAML конфигурации"""
+        veo_api = config_data.get('veo_api', {}) or {}
+        performance = config_data.get('performance', {}) or {}
+        regions = veo_api.get('regions') or {default_location: 1.0}
+        adaptive = veo_api.get('adaptive_concurrency', {}) or {}
+        hedging = veo_api.get('hedging', {}) or {}
+        shutdown = performance.get('shutdown', {}) or {}
+        return cls(
+            max_concurrent_operations=veo_api.get('max_concurrent_operations', cls.max_concurrent_operations),
+            poll_interval=veo_api.get('poll_interval', cls.poll_interval),
+            initial_poll_delay=veo_api.get('initial_poll_delay', cls.initial_poll_delay),
+            operation_timeout=veo_api.get('operation_timeout', cls.operation_timeout),
+            retry_attempts=veo_api.get('retry_attempts', cls.retry_attempts),
+            retry_delay=performance.get('retry_delay', cls.retry_delay),
+            region_weights={str(region): float(weight) for region, weight in regions.items()},
+            adaptive_concurrency=adaptive.get('enabled', cls.adaptive_concurrency),
+            concurrency_min=adaptive.get('min', cls.concurrency_min),
+            concurrency_max=adaptive.get('max', cls.concurrency_max),
+            concurrency_increase=adaptive.get('increase', cls.concurrency_increase),
+            concurrency_decrease=adaptive.get('decrease', cls.concurrency_decrease),
+            submit_latency_threshold=adaptive.get('latency_threshold', cls.submit_latency_threshold),
+            hedge_enabled=hedging.get('enabled', cls.hedge_enabled),
+            hedge_percentile=hedging.get('percentile', cls.hedge_percentile),
+            hedge_min_samples=hedging.get('min_samples', cls.hedge_min_samples),
+            hedge_max_fraction=hedging.get('max_fraction', cls.hedge_max_fraction),
+            hedge_other_region=hedging.get('other_region', cls.hedge_other_region),
+            shutdown_mode=shutdown.get('mode', cls.shutdown_mode),
+            drain_timeout=shutdown.get('drain_timeout', cls.drain_timeout)
+        )
+
+
+@dataclass(eq=False)
+class GenerationJob:
+    """Задание генерации видео для одного изображения (сравнение по идентичности)"""
+    job_id: str
+    image_path: str
+    output_folder: str = ""
+    config: Any = None  # VideoGenerationConfig
+    custom_prompt: Optional[str] = None
+    storage_uri: Optional[str] = None
+    scenario_id: Optional[str] = None  # закрепленный сценарий (иначе случайный)
+
+    # Заполняется планировщиком
+    region: Optional[str] = None
+    operation_name: Optional[str] = None
+    scenario: Optional[dict] = None
+    attempts: int = 0
+    created_at: Optional[float] = None
+    submitted_at: Optional[float] = None
+    completed_at: Optional[float] = None
+    next_poll_at: float = 0.0
+    not_before: float = 0.0
+    # Хеджирование: пара основной операции и ее дубликата
+    is_hedge: bool = False
+    hedged: bool = False
+    partner: Optional["GenerationJob"] = field(default=None, repr=False)
+    # Заранее закодированное изображение (base64, MIME) от стадии кодирования конвейера
+    encoded_image: Optional[tuple] = field(default=None, repr=False)
+
+
+class SystemClock:
+    """Реальное время (паузы могут идти через транспорт)"""
+
+    realtime = True
+
+    def __init__(self, sleep_func=time.sleep):
+        self._sleep = sleep_func
+
+    def now(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            self._sleep(seconds)
+
+
+class VirtualClock:
+    """Виртуальное время: sleep мгновенно сдвигает часы
+
+    Для симуляции sleep_func не задается. При воспроизведении кассеты
+    sleep_func - пауза транспорта с масштабом времени (или без паузы при 0),
+    а часы идут по записанному времени, поэтому возраст операций, таймауты
+    и хеджирование не зависят от скорости воспроизведения.
+    """
+
+    def __init__(self, start: float = 0.0, sleep_func=None):
+        self._now = start
+        self._sleep = sleep_func
+        self._lock = threading.Lock()
+
+    @property
+    def realtime(self) -> bool:
+        return self._sleep is not None
+
+    def now(self) -> float:
+        return self._now
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            if self._sleep is not None:
+                self._sleep(seconds)
+            with self._lock:
+                self._now += seconds
+
+
+class OperationScheduler:
+    """Планировщик операций Veo
+
+    Бэкенд реализует submit(job), poll(job) -> результат операции или None,
+    complete(job, operation_result) -> список результатов и fail(job, error) -> результат.
+    complete может вернуть None: результаты (например, после скачивания в отдельной
+    стадии конвейера) передаются позже через deliver(job, results).
+    Слушатели (listeners) получают события жизненного цикла: listener(event, job, **data).
+    Итог задания - одно из событий completed, failed, skipped или cancelled (с result);
+    отмена отдельной операции в API (проигравшая копия, остановка) - operation_cancelled.
+    С adaptive_concurrency лимит операций задает AIMDController: RetryableError
+    при отправке или опросе сокращает окно, быстрые успешные отправки расширяют его.
+
+    С hedge_enabled операция, выполняющаяся дольше hedge_percentile наблюдаемой
+    задержки, дублируется (по возможности в другом регионе). Побеждает первый
+    результат, проигравшая операция отменяется через backend.cancel(job).
+
+    shutdown() останавливает работу: в режиме drain новые операции не отправляются,
+    начатые дорабатываются до истечения срока, в режиме abort начатые операции
+    отменяются. Неотправленные и отмененные задания выдаются как результаты
+    со статусами skipped и cancelled, поэтому попадают в отчет.
+    """
+
+    def __init__(self, backend, settings: Optional[SchedulerSettings] = None, clock=None, verbose: bool = True):
+        self.backend = backend
+        self.verbose = verbose
+        self.settings = settings or SchedulerSettings()
+        self.clock = clock or SystemClock()
+        self.rng = random.Random(self.settings.seed)
+        self.controller = None
+        if self.settings.adaptive_concurrency:
+            from turan_concurrency import AIMDController
+            self.controller = AIMDController.from_settings(self.settings, verbose=verbose)
+        self.listeners: List[Callable] = []
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "retried": 0,
+            "polls": 0,
+            "poll_errors": 0,
+            "max_in_flight": 0,
+            "concurrency_window": self.concurrency_limit(),
+            "hedged": 0,
+            "hedge_wins": 0,
+            "cancelled": 0,
+            "skipped": 0,
+            "aborted": 0
+        }
+        self.shutdown_mode: Optional[str] = None
+        self._shutdown_timeout: Optional[float] = None
+        self._drain_deadline: Optional[float] = None
+        # Наблюдаемое время генерации (основа порога хеджирования)
+        self.latencies: deque = deque(maxlen=500)
+        # Глубина очередей планировщика для наблюдения извне (обновляется каждый шаг)
+        self.queue_depths = {"pending": 0, "in_flight": 0}
+
+    def _emit(self, event: str, job: GenerationJob, **data):
+        for listener in self.listeners:
+            try:
+                listener(event, job, **data)
+            except Exception as e:
+                logger.error(f"Ошибка обработчика события {event}: {e}")
+
+    def concurrency_limit(self) -> int:
+        """Текущий лимит одновременных операций (фиксированный или окно AIMD)"""
+        if self.controller is not None:
+            return self.controller.limit
+        return self.settings.max_concurrent_operations
+
+    def _congestion(self, now: float):
+        if self.controller is not None:
+            self.controller.on_congestion(now)
+            self.stats["concurrency_window"] = self.controller.limit
+
+    def pick_region(self, exclude: Optional[str] = None) -> str:
+        """Выбор региона по весам из конфигурации (exclude - по возможности другой регион)"""
+        regions = [r for r in self.settings.region_weights if r != exclude] or list(self.settings.region_weights)
+        if len(regions) == 1:
+            return regions[0]
+        weights = [self.settings.region_weights[r] for r in regions]
+        return self.rng.choices(regions, weights=weights, k=1)[0]
+
+    def shutdown(self, mode: str = "drain", timeout: Optional[float] = None):
+        """Запрос остановки (можно вызывать из другого потока или обработчика сигнала)"""
+        if mode not in ("drain", "abort"):
+            raise ValueError(f"Неизвестный режим остановки: {mode}")
+        if self.shutdown_mode == "abort":
+            return
+        self.shutdown_mode = mode
+        self._shutdown_timeout = timeout
+        self._drain_deadline = None
+        logger.warning("Остановка планировщика: %s", "доработка начатых операций" if mode == "drain" else "отмена операций")
+
+    def _interrupted(self, job: GenerationJob, status: str, reason: str) -> Dict:
+        """Результат задания, прерванного остановкой"""
+        self.stats["skipped" if status == "skipped" else "aborted"] += 1
+        result = {
+            "job_id": job.job_id,
+            "source_image": job.image_path,
+            "status": status,
+            "operation_name": job.operation_name,
+            "region": job.region,
+            "error": reason
+        }
+        self._emit(status, job, result=result)
+        return result
+
+    def skip(self, job: GenerationJob, reason: str = "Остановка до отправки") -> Dict:
+        """Результат задания, которое не будет отправлено из-за остановки"""
+        return self._interrupted(job, "skipped", reason)
+
+    def deliver(self, job: GenerationJob, results: List[Dict]):
+        """Отложенные результаты завершенной операции (complete вернул None)"""
+        self._emit("completed", job, results=results)
+
+    def _stop_work(self, pending: deque, in_flight: List[GenerationJob]) -> Iterator[Dict]:
+        """Обработка запрошенной остановки на очередном шаге цикла"""
+        now = self.clock.now()
+        if self.shutdown_mode == "drain" and self._shutdown_timeout is not None:
+            if self._drain_deadline is None:
+                self._drain_deadline = now + self._shutdown_timeout
+            elif now >= self._drain_deadline and in_flight:
+                logger.warning("Срок доработки истек, отмена %s операций", len(in_flight))
+                self.shutdown_mode = "abort"
+
+        while pending:
+            job = pending.popleft()
+            if not job.is_hedge:
+                yield self.skip(job)
+            else:
+                self._unpair(job)
+
+        if self.shutdown_mode == "abort":
+            aborted = list(in_flight)
+            in_flight.clear()
+            for job in aborted:
+                self._cancel(job)
+                if job.is_hedge and job.partner is not None:
+                    continue  # результат выдает основная копия (она тоже в работе)
+                # Одиночный дубликат (основная уже провалилась) дает результат сам
+                yield self._interrupted(job, "cancelled", "Операция отменена при остановке")
+            for job in aborted:
+                self._unpair(job)
+
+    def observe_latencies(self, values):
+        """Предварительная история времени генерации (например, из хранилища аналитики)"""
+        self.latencies.extend(float(value) for value in values)
+
+    def hedge_threshold(self) -> Optional[float]:
+        """Порог хеджирования в секундах или None, если хеджирование недоступно"""
+        settings = self.settings
+        if not settings.hedge_enabled or len(self.latencies) < settings.hedge_min_samples:
+            return None
+        threshold = percentile(list(self.latencies), settings.hedge_percentile)
+        return threshold if threshold < settings.operation_timeout else None
+
+    def _should_hedge(self, job: GenerationJob, now: float) -> bool:
+        if job.is_hedge or job.hedged:
+            return False
+        threshold = self.hedge_threshold()
+        if threshold is None or now - job.submitted_at < threshold:
+            return False
+        # Ограничение дополнительных расходов
+        return self.stats["hedged"] + 1 <= self.settings.hedge_max_fraction * self.stats["submitted"]
+
+    def _make_hedge(self, job: GenerationJob) -> GenerationJob:
+        """Дубликат задания с тем же сценарием (имена файлов совпадают)"""
+        scenario_id = job.scenario_id
+        if scenario_id is None and job.scenario and not job.custom_prompt and getattr(job.config, "use_enhanced_prompts", False):
+            scenario_id = job.scenario.get("id")
+        region = self.pick_region(exclude=job.region) if self.settings.hedge_other_region else job.region
+        hedge = replace(
+            job,
+            scenario_id=scenario_id,
+            region=region,
+            operation_name=None,
+            scenario=None,
+            attempts=0,
+            submitted_at=None,
+            completed_at=None,
+            next_poll_at=0.0,
+            not_before=0.0,
+            is_hedge=True,
+            hedged=False,
+            partner=job
+        )
+        job.hedged = True
+        job.partner = hedge
+        self.stats["hedged"] += 1
+        if self.verbose:
+            logger.warning(
+                "Операция %s выполняется дольше порога, дубликат в регионе %s",
+                job.operation_name, region
+            )
+        self._emit("hedged", job, hedge=hedge)
+        return hedge
+
+    def _cancel(self, job: GenerationJob):
+        """Отмена операции на стороне API (ошибки отмены не прерывают работу)"""
+        cancel = getattr(self.backend, "cancel", None)
+        if cancel is None or job.operation_name is None:
+            return
+        try:
+            cancel(job)
+            self.stats["cancelled"] += 1
+            self._emit("operation_cancelled", job)
+        except Exception as e:
+            logger.warning(f"Не удалось отменить операцию {job.operation_name}: {e}")
+
+    @staticmethod
+    def _unpair(job: GenerationJob):
+        if job.partner is not None:
+            job.partner.partner = None
+            job.partner = None
+
+    def _drop_partner(self, job: GenerationJob, pending: deque, in_flight: List[GenerationJob]):
+        """Снятие второй копии задания: из очереди или с отменой операции"""
+        partner = job.partner
+        self._unpair(job)
+        if partner in pending:
+            pending.remove(partner)
+        elif partner in in_flight:
+            in_flight.remove(partner)
+            self._cancel(partner)
+
+    @staticmethod
+    def _partner_alive(job: GenerationJob, pending: deque, in_flight: List[GenerationJob]) -> bool:
+        return job.partner is not None and (job.partner in pending or job.partner in in_flight)
+
+    def _enqueue(self, pending: deque, job: GenerationJob):
+        job.created_at = self.clock.now()
+        pending.append(job)
+        self._emit("queued", job)
+
+    def _fail(self, job: GenerationJob, error: Exception) -> Dict:
+        self.stats["failed"] += 1
+        result = self.backend.fail(job, error)
+        self._emit("failed", job, error=error, result=result)
+        return result
+
+    def run(
+        self,
+        jobs=(),
+        inbox: Optional[queue.Queue] = None,
+        stop_event: Optional[threading.Event] = None,
+        max_pending: Optional[int] = None
+    ) -> Iterator[Dict]:
+        """Выполнение заданий, результаты выдаются по мере готовности
+
+        С inbox планировщик работает непрерывно: новые задания забираются из очереди
+        до установки stop_event, после чего оставшиеся задания дорабатываются.
+        max_pending ограничивает число заданий, забранных из inbox, но еще не
+        отправленных: остальные ждут в inbox (обратное давление на источник).
+        """
+        settings = self.settings
+        pending: deque = deque()
+        in_flight: List[GenerationJob] = []
+
+        for job in jobs:
+            self._enqueue(pending, job)
+
+        def accepting() -> bool:
+            if self.shutdown_mode is not None or inbox is None:
+                return False
+            # Задания, поставленные до stop_event, тоже забираются
+            return not (stop_event is not None and stop_event.is_set()) or not inbox.empty()
+
+        def has_room() -> bool:
+            return max_pending is None or len(pending) < max_pending
+
+        while pending or in_flight or accepting():
+            # Новые задания из входящей очереди
+            if inbox is not None:
+                while has_room():
+                    try:
+                        self._enqueue(pending, inbox.get_nowait())
+                    except queue.Empty:
+                        break
+
+            if self.shutdown_mode is not None:
+                yield from self._stop_work(pending, in_flight)
+                if not in_flight:
+                    break
+
+            now = self.clock.now()
+
+            # Отправка новых операций в пределах лимита
+            while pending and len(in_flight) < self.concurrency_limit() and pending[0].not_before <= now:
+                job = pending.popleft()
+                job.region = job.region or self.pick_region()
+                job.attempts += 1
+                submit_started = self.clock.now()
+                try:
+                    self.backend.submit(job)
+                except RetryableError as e:
+                    self._congestion(self.clock.now())
+                    if job.is_hedge:
+                        # Дубликат не повторяется: основная операция продолжает работу
+                        self._unpair(job)
+                        break
+                    if job.attempts < settings.retry_attempts:
+                        self.stats["retried"] += 1
+                        if self.verbose:
+                            logger.warning(f"Временная ошибка отправки {job.image_path}: {e}, повтор через {settings.retry_delay}s")
+                        job.region = None
+                        job.not_before = now + settings.retry_delay * job.attempts
+                        pending.append(job)
+                        self._emit("retry", job, error=e)
+                    else:
+                        yield self._fail(job, e)
+                    break
+                except Exception as e:
+                    if job.is_hedge:
+                        logger.warning(f"Не удалось отправить дубликат {job.image_path}: {e}")
+                        self._unpair(job)
+                        continue
+                    yield self._fail(job, e)
+                    continue
+
+                job.submitted_at = self.clock.now()
+                if self.controller is not None:
+                    self.controller.on_success(job.submitted_at - submit_started)
+                    self.stats["concurrency_window"] = self.controller.limit
+                job.next_poll_at = job.submitted_at + settings.initial_poll_delay
+                in_flight.append(job)
+                self.stats["max_in_flight"] = max(self.stats["max_in_flight"], len(in_flight))
+                if job.is_hedge:
+                    self._emit("hedge_submitted", job)
+                else:
+                    self.stats["submitted"] += 1
+                    self._emit("submitted", job)
+
+            # Опрос операций, для которых подошло время
+            for job in sorted(in_flight, key=lambda j: j.next_poll_at):
+                now = self.clock.now()
+                if job.next_poll_at > now:
+                    break
+                if job not in in_flight:
+                    continue  # снята как проигравшая копия в этом же проходе
+
+                self.stats["polls"] += 1
+                try:
+                    operation_result = self.backend.poll(job)
+                except Exception as e:
+                    self.stats["poll_errors"] += 1
+                    if isinstance(e, RetryableError):
+                        self._congestion(now)
+                    if self.verbose:
+                        logger.error(f"Ошибка при проверке статуса: {e}")
+                    operation_result = None
+                    job.next_poll_at = now + settings.poll_error_delay
+                    self._emit("poll_error", job, error=e)
+                else:
+                    job.next_poll_at = now + settings.poll_interval
+
+                if operation_result is not None:
+                    in_flight.remove(job)
+                    if "error" in operation_result and self._partner_alive(job, pending, in_flight):
+                        # Отказ одной копии: результат даст вторая
+                        self._unpair(job)
+                        continue
+                    if job.partner is not None:
+                        self._drop_partner(job, pending, in_flight)
+                    job.completed_at = self.clock.now()
+                    self.stats["completed"] += 1
+                    if "error" not in operation_result:
+                        self.latencies.append(job.completed_at - job.submitted_at)
+                    if job.is_hedge:
+                        self.stats["hedge_wins"] += 1
+                    results = self.backend.complete(job, operation_result)
+                    if results is not None:
+                        self._emit("completed", job, results=results)
+                        yield from results
+                elif now - job.submitted_at >= settings.operation_timeout:
+                    in_flight.remove(job)
+                    if self._partner_alive(job, pending, in_flight):
+                        self._unpair(job)
+                        self._cancel(job)
+                        continue
+                    yield self._fail(job, TimeoutError(f"Операция не завершилась за {settings.operation_timeout} секунд"))
+                elif self._should_hedge(job, now):
+                    pending.appendleft(self._make_hedge(job))
+
+            self.queue_depths = {"pending": len(pending), "in_flight": len(in_flight)}
+
+            # Ожидание ближайшего события
+            wake_times = [job.next_poll_at for job in in_flight]
+            if pending and len(in_flight) < self.concurrency_limit():
+                wake_times.append(min(job.not_before for job in pending))
+            wait = min(wake_times) - self.clock.now() if wake_times else None
+
+            virtual_wait = wait is not None and isinstance(self.clock, VirtualClock)
+            if accepting() and has_room() and not virtual_wait:
+                # Новое задание будит планировщик раньше срока
+                try:
+                    self._enqueue(pending, inbox.get(timeout=max(wait, 0) if wait is not None else 1.0))
+                except queue.Empty:
+                    pass
+            elif virtual_wait and accepting() and has_room() and not inbox.empty():
+                continue  # виртуальные часы: новые задания забираются в начале прохода
+            elif wait is not None or accepting():
+                wait = 1.0 if wait is None else wait
+                if self.clock.realtime:
+                    # Короткие паузы, чтобы запрос остановки обрабатывался без задержки
+                    wait = min(wait, 1.0)
+                self.clock.sleep(wait)
+
+
+@contextmanager
+def graceful_shutdown(scheduler: OperationScheduler, mode: str = "drain", timeout: Optional[float] = None, stop_event: Optional[threading.Event] = None):
+    """Обработка SIGINT/SIGTERM на время работы планировщика
+
+    Первый сигнал останавливает планировщик в режиме mode (drain ограничен timeout),
+    повторный сигнал переводит остановку в abort. Работает только в главном потоке.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield scheduler
+        return
+
+    def handler(signum, frame):
+        if scheduler.shutdown_mode is None:
+            scheduler.shutdown(mode, timeout)
+        else:
+            scheduler.shutdown("abort")
+        if stop_event is not None:
+            stop_event.set()
+
+    previous = {sig: signal.signal(sig, handler) for sig in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        yield scheduler
+    finally:
+        for sig, old_handler in previous.items():
+            signal.signal(sig, old_handler)
+
+
+class GeneratorBackend:
+    """Бэкенд планировщика поверх SimpleTuranGenerator"""
+
+    def __init__(self, generator, clock=None):
+        self.generator = generator
+        self.clock = clock or SystemClock()
+
+    @staticmethod
+    def _call(func, *args, **kwargs):
+        """Вызов API с преобразованием 429/5xx и сетевых ошибок в RetryableError"""
+        import requests
+        try:
+            return func(*args, **kwargs)
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if status == 429 or (status is not None and status >= 500):
+                raise RetryableError(str(e)) from e
+            raise
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            raise RetryableError(str(e)) from e
+
+    def submit(self, job: GenerationJob):
+        job.operation_name, job.scenario = self._call(
+            self.generator.generate_video_from_image,
+            job.image_path,
+            job.config,
+            custom_prompt=job.custom_prompt,
+            storage_uri=job.storage_uri,
+            location=job.region,
+            scenario_id=job.scenario_id,
+            encoded_image=job.encoded_image
+        )
+        job.encoded_image = None  # base64 больше не нужен, память освобождается сразу
+
+    def cancel(self, job: GenerationJob):
+        self._call(self.generator.cancel_operation, job.operation_name)
+
+    def poll(self, job: GenerationJob) -> Optional[Dict]:
+        result = self._call(self.generator.check_operation_status, job.operation_name)
+        if result is None:
+            elapsed = int(self.clock.now() - job.submitted_at)
+            logger.info("Операция в процессе выполнения... (%ss)", elapsed)
+        return result
+
+    def complete(self, job: GenerationJob, operation_result: Dict) -> List[Dict]:
+        timings = {
+            "region": job.region,
+            "attempts": job.attempts,
+            "generation_seconds": round(job.completed_at - job.submitted_at, 3)
+        }
+        results = self.generator.save_operation_videos(job, operation_result, timings)
+        for result in results:
+            result["job_id"] = job.job_id
+        return results
+
+    def fail(self, job: GenerationJob, error: Exception) -> Dict:
+        job.encoded_image = None
+        logger.error(f"Ошибка обработки {job.image_path}: {error}")
+        return {
+            "job_id": job.job_id,
+            "source_image": job.image_path,
+            "status": "error",
+            "error": str(error)
+        }
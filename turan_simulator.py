@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN Simulator - дискретно-событийная симуляция пакетной генерации
+Прогон реального OperationScheduler на виртуальных часах с моделью квот,
+времени генерации и отказов для подбора параллелизма, интервала опроса и весов регионов.
+"""
+
+import math
+import random
+import logging
+from typing import Dict, List, Optional
+from dataclasses import dataclass, field, replace
+
+from turan_scheduler import OperationScheduler, SchedulerSettings, GenerationJob, VirtualClock, RetryableError, percentile
+from turan_results import iter_results
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SimulationModel:
+    """Модель среды: квоты, распределения времени и вероятность отказов"""
+    generation_times: List[float] = field(default_factory=list)  # эмпирическая история, секунды
+    download_times: List[float] = field(default_factory=list)
+    generation_median: float = 75.0     # параметры логнормального распределения без истории
+    generation_sigma: float = 0.35
+    download_median: float = 3.0
+    api_latency: float = 0.3            # длительность одного блокирующего вызова API
+    failure_rate: float = 0.02          # доля операций, завершившихся ошибкой
+    straggler_rate: float = 0.0         # доля операций-"отстающих"
+    straggler_factor: float = 4.0       # во сколько раз дольше выполняется отстающая операция
+    quota_concurrent_per_region: int = 4
+    quota_requests_per_minute: int = 60  # на регион, считаются все вызовы API
+
+    @classmethod
+    def from_config(cls, config_data: dict) -> "SimulationModel":
+        """Параметры модели из секции simulation YAML конфигурации"""
+        section = config_data.get('simulation', {}) or {}
+        known = {name for name in cls.__dataclass_fields__ if name not in ('generation_times', 'download_times')}
+        return cls(**{key: value for key, value in section.items() if key in known})
+
+    def sample_generation(self, rng: random.Random) -> float:
+        if self.generation_times:
+            value = rng.choice(self.generation_times)
+        else:
+            value = rng.lognormvariate(math.log(self.generation_median), self.generation_sigma)
+        if self.straggler_rate and rng.random() < self.straggler_rate:
+            value *= self.straggler_factor
+        return value
+
+    def sample_download(self, rng: random.Random) -> float:
+        if self.download_times:
+            return rng.choice(self.download_times)
+        return rng.lognormvariate(math.log(self.download_median), 0.25)
+
+
+def load_history(paths: List[str]) -> Dict[str, List[float]]:
+    """Загрузка времени генерации и скачивания из отчетов прошлых запусков (JSONL или JSON)"""
+    history = {"generation_times": [], "download_times": []}
+    for path in paths:
+        try:
+            for result in iter_results(path):
+                timings = result.get("timings") or {}
+                if result.get("status") == "success" and "generation_seconds" in timings:
+                    history["generation_times"].append(float(timings["generation_seconds"]))
+                    if "download_seconds" in timings:
+                        history["download_times"].append(float(timings["download_seconds"]))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать историю {path}: {e}")
+    return history
+
+
+class SimulatedBackend:
+    """Бэкенд планировщика, имитирующий Vertex AI на виртуальных часах"""
+
+    def __init__(self, clock: VirtualClock, model: SimulationModel, rng: random.Random):
+        self.clock = clock
+        self.model = model
+        self.rng = rng
+        self.api_calls = {"submit": 0, "poll": 0, "download": 0, "cancel": 0}
+        self.throttled = 0
+        self.rejected = 0
+        self.latencies: List[float] = []
+        self._operations: Dict[str, tuple] = {}
+        self._in_flight_by_region: Dict[str, int] = {}
+        self._calls_by_region: Dict[str, List[float]] = {}
+        self._counter = 0
+
+    def _api_call(self, kind: str, region: str):
+        """Учет вызова API с проверкой квоты запросов в минуту"""
+        now = self.clock.now()
+        window = [t for t in self._calls_by_region.get(region, []) if now - t < 60.0]
+        window.append(now)
+        self._calls_by_region[region] = window
+        self.api_calls[kind] += 1
+        self.clock.sleep(self.model.api_latency)
+        if len(window) > self.model.quota_requests_per_minute:
+            self.throttled += 1
+            raise RetryableError("429 Too Many Requests (симуляция)")
+
+    def submit(self, job: GenerationJob):
+        self._api_call("submit", job.region)
+        if self._in_flight_by_region.get(job.region, 0) >= self.model.quota_concurrent_per_region:
+            self.throttled += 1
+            raise RetryableError("429 Quota exceeded (симуляция)")
+
+        self._counter += 1
+        job.operation_name = f"projects/sim/locations/{job.region}/publishers/google/models/sim/operations/{self._counter}"
+        job.scenario = {"id": "simulated"}
+        done_at = self.clock.now() + self.model.sample_generation(self.rng)
+        failed = self.rng.random() < self.model.failure_rate
+        self._operations[job.operation_name] = (done_at, failed)
+        self._in_flight_by_region[job.region] = self._in_flight_by_region.get(job.region, 0) + 1
+
+    def poll(self, job: GenerationJob) -> Optional[Dict]:
+        self._api_call("poll", job.region)
+        done_at, failed = self._operations[job.operation_name]
+        if self.clock.now() < done_at:
+            return None
+        self._in_flight_by_region[job.region] -= 1
+        if failed:
+            return {"done": True, "error": {"message": "Симулированный отказ"}}
+        return {"done": True, "response": {"videos": [{"gcsUri": "gs://sim"}]}}
+
+    def cancel(self, job: GenerationJob):
+        self._api_call("cancel", job.region)
+        done_at, _ = self._operations[job.operation_name]
+        if self.clock.now() < done_at:
+            self._in_flight_by_region[job.region] -= 1
+            self._operations[job.operation_name] = (self.clock.now(), True)
+
+    def complete(self, job: GenerationJob, operation_result: Dict) -> List[Dict]:
+        if "error" in operation_result:
+            return [self.fail(job, RuntimeError(operation_result["error"]["message"]))]
+        self.api_calls["download"] += 1
+        self.clock.sleep(self.model.sample_download(self.rng))
+        self.latencies.append(self.clock.now() - job.created_at)
+        return [{"source_image": job.image_path, "status": "success", "region": job.region}]
+
+    def fail(self, job: GenerationJob, error: Exception) -> Dict:
+        if isinstance(error, RetryableError):
+            self.rejected += 1
+        if job.operation_name in self._operations and job.region in self._in_flight_by_region:
+            done_at, _ = self._operations[job.operation_name]
+            if self.clock.now() < done_at:
+                self._in_flight_by_region[job.region] -= 1
+        return {"source_image": job.image_path, "status": "error", "error": str(error)}
+
+
+@dataclass
+class SimulationResult:
+    """Прогноз для одного набора настроек"""
+    settings: SchedulerSettings
+    images: int
+    makespan_seconds: float
+    videos_per_hour: float
+    latency_p50: float
+    latency_p95: float
+    api_calls: Dict[str, int]
+    operations: int  # созданные операции Veo (включая повторы после отказов)
+    throttled: int
+    failed: int
+    rejected: int  # задания, не прошедшие квоту после всех повторов
+    max_in_flight: int = 0
+
+    @property
+    def total_api_calls(self) -> int:
+        return sum(self.api_calls.values())
+
+    def to_dict(self) -> Dict:
+        return {
+            "max_concurrent_operations": self.settings.max_concurrent_operations,
+            "poll_interval": self.settings.poll_interval,
+            "region_weights": self.settings.region_weights,
+            "adaptive_concurrency": self.settings.adaptive_concurrency,
+            "concurrency_min": self.settings.concurrency_min,
+            "concurrency_max": self.settings.concurrency_max,
+            "max_in_flight": self.max_in_flight,
+            "images": self.images,
+            "makespan_seconds": round(self.makespan_seconds, 1),
+            "videos_per_hour": round(self.videos_per_hour, 1),
+            "latency_p50": round(self.latency_p50, 1),
+            "latency_p95": round(self.latency_p95, 1),
+            "api_calls": self.api_calls,
+            "total_api_calls": self.total_api_calls,
+            "operations": self.operations,
+            "throttled": self.throttled,
+            "failed": self.failed,
+            "rejected": self.rejected
+        }
+
+
+def simulate(images: int, settings: SchedulerSettings, model: SimulationModel, seed: int = 0) -> SimulationResult:
+    """Симуляция пакета из images изображений с реальным планировщиком"""
+    clock = VirtualClock()
+    rng = random.Random(seed)
+    backend = SimulatedBackend(clock, model, rng)
+    scheduler = OperationScheduler(backend, replace(settings, seed=seed), clock=clock, verbose=False)
+
+    jobs = [GenerationJob(job_id=str(i), image_path=f"sim_{i}.jpg") for i in range(images)]
+    results = list(scheduler.run(jobs))
+
+    makespan = clock.now()
+    successful = sum(1 for r in results if r["status"] == "success")
+    return SimulationResult(
+        settings=settings,
+        images=images,
+        makespan_seconds=makespan,
+        videos_per_hour=successful / makespan * 3600 if makespan > 0 else 0.0,
+        latency_p50=percentile(backend.latencies, 50),
+        latency_p95=percentile(backend.latencies, 95),
+        api_calls=dict(backend.api_calls),
+        operations=scheduler.stats["submitted"] + scheduler.stats["hedged"],
+        throttled=backend.throttled,
+        failed=len(results) - successful,
+        rejected=backend.rejected,
+        max_in_flight=scheduler.stats["max_in_flight"]
+    )
+
+
+def simulate_averaged(images: int, settings: SchedulerSettings, model: SimulationModel, runs: int = 3) -> SimulationResult:
+    """Среднее по нескольким прогонам с разными seed"""
+    return average_results([simulate(images, settings, model, seed=seed) for seed in range(runs)])
+
+
+def average_results(samples: List[SimulationResult]) -> SimulationResult:
+    """Усреднение прогонов одного пакета с одинаковыми настройками"""
+    count = len(samples)
+    return SimulationResult(
+        settings=samples[0].settings,
+        images=samples[0].images,
+        makespan_seconds=sum(s.makespan_seconds for s in samples) / count,
+        videos_per_hour=sum(s.videos_per_hour for s in samples) / count,
+        latency_p50=sum(s.latency_p50 for s in samples) / count,
+        latency_p95=sum(s.latency_p95 for s in samples) / count,
+        api_calls={kind: round(sum(s.api_calls[kind] for s in samples) / count) for kind in samples[0].api_calls},
+        operations=round(sum(s.operations for s in samples) / count),
+        throttled=round(sum(s.throttled for s in samples) / count),
+        failed=round(sum(s.failed for s in samples) / count),
+        rejected=round(sum(s.rejected for s in samples) / count),
+        max_in_flight=max(s.max_in_flight for s in samples)
+    )
+
+
+def recommend(
+    images: int,
+    base_settings: SchedulerSettings,
+    model: SimulationModel,
+    concurrency_options: Optional[List[int]] = None,
+    poll_options: Optional[List[float]] = None,
+    tolerance: float = 0.05
+) -> Dict:
+    """Подбор настроек: меньше отказов по квоте, затем минимальное время пакета,
+    при равенстве (в пределах tolerance) - меньше вызовов API
+
+    С адаптивным параллелизмом max_concurrent_operations - лишь начальное окно AIMD,
+    поэтому перебирается верхняя граница окна concurrency_max, а начальное окно
+    и нижняя граница прижимаются к ней.
+    """
+    concurrency_options = concurrency_options or [1, 2, 3, 4, 6, 8, 12, 16]
+    poll_options = poll_options or [5.0, 10.0, 15.0, 20.0, 30.0]
+    adaptive = base_settings.adaptive_concurrency
+    swept = "concurrency_max" if adaptive else "max_concurrent_operations"
+
+    region_options = [base_settings.region_weights]
+    if len(base_settings.region_weights) > 1:
+        uniform = {region: 1.0 for region in base_settings.region_weights}
+        if uniform != base_settings.region_weights:
+            region_options.append(uniform)
+
+    candidates = []
+    for region_weights in region_options:
+        for concurrency in concurrency_options:
+            if adaptive:
+                limits = dict(
+                    max_concurrent_operations=min(base_settings.max_concurrent_operations, concurrency),
+                    concurrency_min=min(base_settings.concurrency_min, concurrency),
+                    concurrency_max=concurrency
+                )
+            else:
+                limits = dict(max_concurrent_operations=concurrency)
+            for poll_interval in poll_options:
+                settings = replace(base_settings, poll_interval=poll_interval, region_weights=region_weights, **limits)
+                candidates.append(simulate_averaged(images, settings, model))
+
+    fewest_rejected = min(c.rejected for c in candidates)
+    reliable = [c for c in candidates if c.rejected == fewest_rejected]
+    best_makespan = min(c.makespan_seconds for c in reliable)
+    acceptable = [c for c in reliable if c.makespan_seconds <= best_makespan * (1 + tolerance)]
+    chosen = min(acceptable, key=lambda c: (c.total_api_calls, getattr(c.settings, swept)))
+
+    return {
+        "baseline": simulate_averaged(images, base_settings, model).to_dict(),
+        "recommended": chosen.to_dict(),
+        "candidates_evaluated": len(candidates),
+        "swept": swept
+    }
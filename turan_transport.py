@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN Transport - транспортный слой для Vertex AI и Google Cloud Storage
+Прямой режим, запись реальных обменов и детерминированное воспроизведение без сети
+"""
+
+import os
+import json
+import time
+import base64
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional
+from pathlib import Path
+from collections import defaultdict, deque
+
+import turan_json
+
+logger = logging.getLogger(__name__)
+
+# Ключи, значения которых никогда не попадают в кассету
+SECRET_KEYS = {"authorization", "access_token", "token", "id_token", "refresh_token", "api_key", "key", "client_secret"}
+
+# Ключи с base64 данными (изображения и видео)
+BASE64_KEYS = {"bytesBase64Encoded"}
+
+EXCHANGES_FILE = "exchanges.jsonl"
+BLOBS_FOLDER = "blobs"
+
+
+class ReplayMismatchError(LookupError):
+    """В кассете нет записи, соответствующей запросу"""
+
+
+class TransportResponse:
+    """Минимальный ответ, совместимый с requests.Response"""
+
+    def __init__(self, status_code: int, content: bytes, url: str = ""):
+        self.status_code = status_code
+        self.content = content
+        self.url = url
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return turan_json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} Error for url: {self.url}", response=self
+            )
+
+
+def endpoint_of(url: str) -> str:
+    """Имя метода API из URL (predictLongRunning, fetchPredictOperation, cancel)"""
+    return url.rsplit(":", 1)[-1] if ":" in url.rsplit("/", 1)[-1] else url.rsplit("/", 1)[-1]
+
+
+class HttpTransport:
+    """Прямой транспорт: requests для Vertex AI и gsutil для GCS"""
+
+    requires_auth = True
+
+    def __init__(self):
+        self._session = None
+
+    @property
+    def session(self):
+        """Общая HTTP сессия с пулом соединений (создается при первом запросе)"""
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    def post(self, url: str, headers: Dict, json_body: Dict, timeout: int = 30):
+        # Тело с base64 изображением кодируется сразу в байты (без json.dumps requests)
+        return self.session.post(
+            url,
+            headers={**headers, "Content-Type": "application/json"},
+            data=turan_json.dumps(json_body),
+            timeout=timeout
+        )
+
+    def download(self, gcs_uri: str, local_path: str) -> str:
+        import subprocess
+        subprocess.run(
+            ["gsutil", "cp", gcs_uri, local_path],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        return local_path
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+
+class _BlobStore:
+    """Хранилище base64 данных вне кассеты (по sha256)"""
+
+    def __init__(self, folder: Path):
+        self.folder = folder
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.folder / f"{digest}.bin"
+        if not path.exists():
+            self.folder.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        with open(self.folder / f"{digest}.bin", 'rb') as f:
+            return f.read()
+
+
+def redact(value, blobs: Optional[_BlobStore] = None):
+    """Удаление секретов и вынос base64 данных из JSON структуры
+
+    Если blobs не передан, base64 заменяется только размером (для запросов).
+    """
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            if key.lower() in SECRET_KEYS:
+                result[key] = "$redacted"
+            elif key in BASE64_KEYS and isinstance(item, str):
+                if blobs is not None:
+                    result[key] = {"$blob": blobs.put(base64.b64decode(item))}
+                else:
+                    result[key] = {"$redacted_bytes": len(item)}
+            else:
+                result[key] = redact(item, blobs)
+        return result
+    if isinstance(value, list):
+        return [redact(item, blobs) for item in value]
+    return value
+
+
+def restore(value, blobs: _BlobStore):
+    """Обратная подстановка base64 данных из хранилища"""
+    if isinstance(value, dict):
+        if set(value) == {"$blob"}:
+            return base64.b64encode(blobs.get(value["$blob"])).decode('ascii')
+        return {key: restore(item, blobs) for key, item in value.items()}
+    if isinstance(value, list):
+        return [restore(item, blobs) for item in value]
+    return value
+
+
+class RecordingTransport:
+    """Транспорт, записывающий реальные обмены в кассету
+
+    Секреты удаляются, base64 видео и скачанные файлы хранятся отдельно в blobs/,
+    изображения из запросов не сохраняются (только их размер).
+    """
+
+    requires_auth = True
+
+    def __init__(self, cassette_dir: str, inner: Optional[HttpTransport] = None):
+        self.inner = inner or HttpTransport()
+        self.cassette_dir = Path(cassette_dir)
+        self.cassette_dir.mkdir(parents=True, exist_ok=True)
+        self.blobs = _BlobStore(self.cassette_dir / BLOBS_FOLDER)
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._started = time.time()
+        logger.info(f"Запись обменов в кассету: {self.cassette_dir}")
+
+    def _append(self, entry: Dict):
+        with self._lock:
+            entry["seq"] = self._seq
+            self._seq += 1
+            with open(self.cassette_dir / EXCHANGES_FILE, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def post(self, url: str, headers: Dict, json_body: Dict, timeout: int = 30):
+        started = time.time()
+        response = self.inner.post(url, headers, json_body, timeout)
+        latency = time.time() - started
+
+        try:
+            response_body = redact(turan_json.loads(response.content), self.blobs)
+        except ValueError:
+            response_body = {"$text": response.content.decode('utf-8', errors='replace')}
+
+        self._append({
+            "kind": "http",
+            "url": url,
+            "endpoint": endpoint_of(url),
+            "request": redact(json_body),
+            "status": response.status_code,
+            "response": response_body,
+            "latency": latency,
+            "offset": started - self._started
+        })
+        return response
+
+    def download(self, gcs_uri: str, local_path: str) -> str:
+        started = time.time()
+        self.inner.download(gcs_uri, local_path)
+        latency = time.time() - started
+
+        with open(local_path, 'rb') as f:
+            digest = self.blobs.put(f.read())
+
+        self._append({
+            "kind": "gcs",
+            "uri": gcs_uri,
+            "blob": digest,
+            "latency": latency,
+            "offset": started - self._started
+        })
+        return local_path
+
+    def sleep(self, seconds: float):
+        self.inner.sleep(seconds)
+
+
+class ReplayTransport:
+    """Транспорт, воспроизводящий кассету без сети
+
+    Запросы сопоставляются по методу API, для опроса операций - по operationName,
+    для GCS - по URI. time_scale масштабирует записанные задержки и паузы опроса
+    (1.0 - реальное время, 0 - без задержек).
+    """
+
+    requires_auth = False
+
+    def __init__(self, cassette_dir: str, time_scale: float = 1.0, sleep_func=time.sleep):
+        self.cassette_dir = Path(cassette_dir)
+        self.blobs = _BlobStore(self.cassette_dir / BLOBS_FOLDER)
+        self.time_scale = time_scale
+        self._sleep = sleep_func
+        self._lock = threading.Lock()
+        self._queues: Dict[tuple, deque] = defaultdict(deque)
+        self._last: Dict[tuple, Dict] = {}
+
+        exchanges_path = self.cassette_dir / EXCHANGES_FILE
+        if not exchanges_path.exists():
+            raise FileNotFoundError(f"Кассета не найдена: {exchanges_path}")
+
+        count = 0
+        with open(exchanges_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._queues[self._key_of_entry(entry)].append(entry)
+                    count += 1
+
+        logger.info(f"Загружена кассета {self.cassette_dir}: {count} обменов")
+
+    @staticmethod
+    def _key_of_entry(entry: Dict) -> tuple:
+        if entry["kind"] == "gcs":
+            return ("gcs", entry["uri"])
+        return ("http", entry["endpoint"], entry["request"].get("operationName"))
+
+    def _next(self, key: tuple) -> Dict:
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue:
+                entry = queue.popleft()
+                self._last[key] = entry
+                return entry
+            if key in self._last and key[0] == "http" and key[2] is not None:
+                # Опрос завершенной операции повторяет последний ответ
+                return self._last[key]
+        raise ReplayMismatchError(f"Нет записанного обмена для {key}")
+
+    def post(self, url: str, headers: Dict, json_body: Dict, timeout: int = 30):
+        entry = self._next(("http", endpoint_of(url), json_body.get("operationName")))
+        self.sleep(entry["latency"])
+
+        body = entry["response"]
+        if set(body) == {"$text"}:
+            content = body["$text"].encode('utf-8')
+        else:
+            content = turan_json.dumps(restore(body, self.blobs))
+        return TransportResponse(entry["status"], content, url)
+
+    def download(self, gcs_uri: str, local_path: str) -> str:
+        entry = self._next(("gcs", gcs_uri))
+        self.sleep(entry["latency"])
+        with open(local_path, 'wb') as f:
+            f.write(self.blobs.get(entry["blob"]))
+        return local_path
+
+    def sleep(self, seconds: float):
+        if self.time_scale > 0 and seconds > 0:
+            self._sleep(seconds * self.time_scale)
+
+    def clock(self):
+        """Часы планировщика: идут по записанному времени, паузы - с масштабом time_scale"""
+        from turan_scheduler import VirtualClock
+        return VirtualClock(sleep_func=self.sleep)
+
+    def remaining(self) -> List[tuple]:
+        """Ключи обменов, которые еще не были воспроизведены"""
+        return [key for key, queue in self._queues.items() if queue]
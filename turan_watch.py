@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN Watch - непрерывный прием новых изображений из входной папки
+На Linux изменения приходят от inotify (через ctypes, без зависимостей),
+иначе папка периодически обходится заново. Файл выдается только после того,
+как его размер и mtime не менялись settle_seconds: частично записанные
+и еще загружаемые файлы не попадают в генерацию.
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import logging
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from turan_scanner import DEFAULT_EXTENSIONS, scan_images
+
+logger = logging.getLogger(__name__)
+
+# Маски inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _extension_ok(name: str, extensions: Tuple[str, ...]) -> bool:
+    return not name.startswith('.') and os.path.splitext(name)[1].lower() in extensions
+
+
+class InotifyWatcher:
+    """Рекурсивное наблюдение через inotify: новые папки добавляются на лету"""
+
+    def __init__(self, root: str, extensions: Tuple[str, ...]):
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._libc = libc
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.root = root
+        self.extensions = extensions
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 недоступен")
+        self._watches: Dict[int, str] = {}
+        self._buffer = b""
+        self._add_tree(root)
+
+    def _add_watch(self, directory: str) -> bool:
+        import ctypes
+
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOSPC:
+                logger.error("Исчерпан лимит inotify (fs.inotify.max_user_watches), папка не отслеживается: %s", directory)
+            return False
+        self._watches[wd] = directory
+        return True
+
+    def _add_tree(self, directory: str) -> List[str]:
+        """Наблюдение за папкой и всеми вложенными, возвращает уже лежащие в них файлы"""
+        found = []
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            if not self._add_watch(current):
+                continue
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.'):
+                            stack.append(entry.path)
+                        elif entry.is_file() and _extension_ok(entry.name, self.extensions):
+                            found.append(entry.path)
+            except OSError as e:
+                logger.warning(f"Не удалось прочитать папку {current}: {e}")
+        return found
+
+    def changes(self, timeout: float) -> Tuple[List[str], bool]:
+        """Измененные файлы за время ожидания и признак переполнения очереди событий"""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return [], False
+        try:
+            self._buffer += os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return [], False
+
+        paths, overflow = [], False
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(self._buffer):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(self._buffer, offset)
+            end = offset + _EVENT_HEADER.size + length
+            if end > len(self._buffer):
+                break
+            name = self._buffer[offset + _EVENT_HEADER.size:end].rstrip(b"\0")
+            offset = end
+
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            directory = self._watches.get(wd)
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and not os.path.basename(path).startswith('.'):
+                    # Файлы могли появиться до регистрации наблюдения за новой папкой
+                    paths.extend(self._add_tree(path))
+            elif _extension_ok(os.path.basename(path), self.extensions):
+                paths.append(path)
+        self._buffer = self._buffer[offset:]
+        return paths, overflow
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Запасной вариант: периодический обход с сравнением размера и mtime"""
+
+    def __init__(self, root: str, extensions: Tuple[str, ...], interval: float = 10.0):
+        self.root = root
+        self.extensions = extensions
+        self.interval = interval
+        self._known = self._snapshot()
+        self._next_scan = time.monotonic() + interval
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        return {entry.path: (entry.size, entry.mtime_ns) for entry in scan_images(self.root, self.extensions)}
+
+    def changes(self, timeout: float) -> Tuple[List[str], bool]:
+        wait = self._next_scan - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return [], False
+        time.sleep(max(wait, 0))
+        self._next_scan = time.monotonic() + self.interval
+        current = self._snapshot()
+        changed = [path for path, state in current.items() if self._known.get(path) != state]
+        self._known = current
+        return changed, False
+
+    def close(self):
+        pass
+
+
+def create_watcher(root: str, extensions: Iterable[str] = DEFAULT_EXTENSIONS, poll_interval: float = 10.0, use_inotify: bool = True):
+    """inotify на Linux, иначе (или при ошибке) опрос файловой системы"""
+    extensions = tuple(ext.lower() for ext in extensions)
+    if use_inotify and sys.platform.startswith("linux"):
+        try:
+            watcher = InotifyWatcher(root, extensions)
+            logger.info("Наблюдение за %s через inotify (%s папок)", root, len(watcher._watches))
+            return watcher
+        except (OSError, AttributeError) as e:
+            logger.warning(f"inotify недоступен ({e}), используется опрос каждые {poll_interval}s")
+    return PollingWatcher(root, extensions, poll_interval)
+
+
+class FileSettler:
+    """Отложенная выдача файлов: размер и mtime должны не меняться settle_seconds"""
+
+    def __init__(self, settle_seconds: float = 5.0):
+        self.settle_seconds = settle_seconds
+        self._candidates: Dict[str, Tuple[Optional[Tuple[int, int]], float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._candidates)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._candidates
+
+    def touch(self, path: str, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        self._candidates[path] = (None, now)
+
+    def ready(self, now: Optional[float] = None) -> List[str]:
+        now = time.monotonic() if now is None else now
+        settled = []
+        for path, (state, since) in list(self._candidates.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self._candidates[path]  # удален или переименован до завершения записи
+                continue
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current != state:
+                self._candidates[path] = (current, now)
+            elif now - since >= self.settle_seconds and stat.st_size > 0:
+                del self._candidates[path]
+                settled.append(path)
+        return sorted(settled)
+
+
+def watch_images(
+    root: str,
+    stop_event: threading.Event,
+    extensions: Iterable[str] = DEFAULT_EXTENSIONS,
+    settle_seconds: float = 5.0,
+    poll_interval: float = 10.0,
+    use_inotify: bool = True,
+    watcher=None
+) -> Iterator[str]:
+    """Пути новых и измененных изображений по мере их появления до stop_event"""
+    extensions = tuple(ext.lower() for ext in extensions)
+    watcher = watcher or create_watcher(root, extensions, poll_interval, use_inotify)
+    settler = FileSettler(settle_seconds)
+    try:
+        while not stop_event.is_set():
+            timeout = min(1.0, settle_seconds) if len(settler) else 1.0
+            paths, overflow = watcher.changes(timeout)
+            if overflow:
+                logger.warning("Переполнение очереди событий inotify, повторный обход папки")
+                paths = [entry.path for entry in scan_images(root, extensions)]
+            for path in paths:
+                settler.touch(path)
+            for path in settler.ready():
+                yield path
+    finally:
+        watcher.close()
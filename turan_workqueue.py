@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TURAN Work Queue - распределенная очередь заданий с арендой
+Несколько машин делят один набор изображений: задание арендуется воркером,
+аренда продлевается heartbeat, просроченные аренды возвращаются в очередь.
+Бэкенды: SQLite файл (локально и для тестов) и Redis-совместимый сервер.
+"""
+
+import json
+import time
+import uuid
+import queue
+import socket
+import sqlite3
+import hashlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+from pathlib import Path
+from dataclasses import dataclass
+
+from turan_scheduler import SchedulerSettings, GenerationJob, graceful_shutdown
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Lease:
+    """Аренда задания воркером"""
+    job_id: str
+    token: str
+    payload: Dict
+    attempts: int
+    expires_at: float
+
+
+def job_id_for_image(image_path: str, root: Optional[str] = None, chunk_size: int = 1 << 20) -> str:
+    """Стабильный id задания по содержимому и пути изображения
+
+    С root в id входит путь относительно root: один и тот же файл в папках
+    двух SKU дает два задания, а id не зависит от того, куда смонтирован каталог.
+    """
+    digest = hashlib.sha256()
+    path = Path(image_path)
+    name = path.relative_to(root).as_posix() if root is not None else path.name
+    digest.update(name.encode('utf-8'))
+    with open(image_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:20]
+
+
+class WorkQueueBackend(ABC):
+    """Интерфейс очереди заданий с арендой"""
+
+    @abstractmethod
+    def enqueue(self, job_id: str, payload: Dict) -> bool:
+        """Добавление задания; False, если задание с таким id уже есть"""
+
+    @abstractmethod
+    def lease(self, worker_id: str, ttl: float, max_attempts: Optional[int] = None) -> Optional[Lease]:
+        """Аренда следующего задания (просроченные аренды сначала возвращаются в очередь)"""
+
+    @abstractmethod
+    def heartbeat(self, lease: Lease, ttl: float) -> bool:
+        """Продление аренды; False, если аренда потеряна"""
+
+    @abstractmethod
+    def complete(self, lease: Lease, result: List[Dict]) -> bool:
+        """Фиксация результата; принимается только от действующего арендатора"""
+
+    @abstractmethod
+    def fail(self, lease: Lease, error: str, retry: bool) -> bool:
+        """Ошибка задания: retry возвращает его в очередь, иначе - в failed"""
+
+    @abstractmethod
+    def requeue_expired(self, max_attempts: Optional[int] = None) -> int:
+        """Возврат просроченных аренд в очередь; задания, исчерпавшие max_attempts, - в failed"""
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Число заданий по состояниям: pending, leased, done, failed"""
+
+
+class SQLiteWorkQueue(WorkQueueBackend):
+    """Очередь в SQLite файле (несколько процессов одной машины, тесты)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                token TEXT,
+                worker_id TEXT,
+                expires_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                updated_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_state_expires ON jobs (state, expires_at);
+        """)
+
+    def _transaction(self, statements):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, job_id: str, payload: Dict) -> bool:
+        def statements(conn):
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO jobs (job_id, payload, updated_at) VALUES (?, ?, ?)",
+                (job_id, json.dumps(payload, ensure_ascii=False), time.time())
+            )
+            return cursor.rowcount == 1
+        return self._transaction(statements)
+
+    def _requeue_expired(self, conn, max_attempts: Optional[int] = None) -> int:
+        now = time.time()
+        if max_attempts is not None:
+            # Задание, каждый раз роняющее воркер, не возвращается в очередь бесконечно
+            conn.execute(
+                "UPDATE jobs SET state = 'failed', error = ?, token = NULL, worker_id = NULL, expires_at = NULL, updated_at = ? "
+                "WHERE state = 'leased' AND expires_at < ? AND attempts >= ?",
+                (f"Аренда истекла, попыток: {max_attempts}", now, now, max_attempts)
+            )
+        return conn.execute(
+            "UPDATE jobs SET state = 'pending', token = NULL, worker_id = NULL, updated_at = ? "
+            "WHERE state = 'leased' AND expires_at < ?",
+            (now, now)
+        ).rowcount
+
+    def requeue_expired(self, max_attempts: Optional[int] = None) -> int:
+        return self._transaction(lambda conn: self._requeue_expired(conn, max_attempts))
+
+    def lease(self, worker_id: str, ttl: float, max_attempts: Optional[int] = None) -> Optional[Lease]:
+        def statements(conn):
+            self._requeue_expired(conn, max_attempts)
+            row = conn.execute(
+                "SELECT job_id, payload, attempts FROM jobs WHERE state = 'pending' ORDER BY rowid LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            job_id, payload, attempts = row
+            token = uuid.uuid4().hex
+            expires_at = time.time() + ttl
+            conn.execute(
+                "UPDATE jobs SET state = 'leased', token = ?, worker_id = ?, expires_at = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE job_id = ?",
+                (token, worker_id, expires_at, time.time(), job_id)
+            )
+            return Lease(job_id, token, json.loads(payload), attempts + 1, expires_at)
+        return self._transaction(statements)
+
+    def heartbeat(self, lease: Lease, ttl: float) -> bool:
+        def statements(conn):
+            expires_at = time.time() + ttl
+            updated = conn.execute(
+                "UPDATE jobs SET expires_at = ?, updated_at = ? WHERE job_id = ? AND token = ? AND state = 'leased'",
+                (expires_at, time.time(), lease.job_id, lease.token)
+            ).rowcount
+            if updated:
+                lease.expires_at = expires_at
+            return updated == 1
+        return self._transaction(statements)
+
+    def complete(self, lease: Lease, result: List[Dict]) -> bool:
+        def statements(conn):
+            return conn.execute(
+                "UPDATE jobs SET state = 'done', result = ?, token = NULL, expires_at = NULL, updated_at = ? "
+                "WHERE job_id = ? AND token = ? AND state = 'leased'",
+                (json.dumps(result, ensure_ascii=False, default=str), time.time(), lease.job_id, lease.token)
+            ).rowcount == 1
+        return self._transaction(statements)
+
+    def fail(self, lease: Lease, error: str, retry: bool) -> bool:
+        def statements(conn):
+            return conn.execute(
+                "UPDATE jobs SET state = ?, error = ?, token = NULL, worker_id = NULL, expires_at = NULL, updated_at = ? "
+                "WHERE job_id = ? AND token = ? AND state = 'leased'",
+                ('pending' if retry else 'failed', error, time.time(), lease.job_id, lease.token)
+            ).rowcount == 1
+        return self._transaction(statements)
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        counts.update(dict(rows))
+        return counts
+
+
+class RedisWorkQueue(WorkQueueBackend):
+    """Очередь на Redis-совместимом сервере
+
+    Используется только базовый набор команд (HSETNX, HGET, HSET, HDEL, HLEN, HINCRBY,
+    LPUSH, RPOP, LLEN, ZADD, ZREM, ZCARD, ZRANGEBYSCORE), поэтому клиент можно
+    заменить локальной заглушкой с тем же интерфейсом.
+    """
+
+    def __init__(self, client, prefix: str = "turan"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = "turan") -> "RedisWorkQueue":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("Для redis:// очереди установите пакет redis: pip install redis")
+        return cls(redis.Redis.from_url(url), prefix)
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}:{name}"
+
+    @staticmethod
+    def _text(value) -> Optional[str]:
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    def enqueue(self, job_id: str, payload: Dict) -> bool:
+        if not self.client.hsetnx(self._key("jobs"), job_id, json.dumps(payload, ensure_ascii=False)):
+            return False
+        self.client.lpush(self._key("pending"), job_id)
+        return True
+
+    def requeue_expired(self, max_attempts: Optional[int] = None) -> int:
+        requeued = 0
+        for job_id in self.client.zrangebyscore(self._key("leases"), "-inf", time.time()):
+            job_id = self._text(job_id)
+            # ZREM атомарен: возвращает задание в очередь только один воркер
+            if not self.client.zrem(self._key("leases"), job_id):
+                continue
+            self.client.hdel(self._key("tokens"), job_id)
+            attempts = int(self.client.hget(self._key("attempts"), job_id) or 0)
+            if max_attempts is not None and attempts >= max_attempts:
+                self.client.hset(self._key("failed"), job_id, f"Аренда истекла, попыток: {attempts}")
+            else:
+                self.client.lpush(self._key("pending"), job_id)
+                requeued += 1
+        return requeued
+
+    def lease(self, worker_id: str, ttl: float, max_attempts: Optional[int] = None) -> Optional[Lease]:
+        self.requeue_expired(max_attempts)
+        while True:
+            job_id = self._text(self.client.rpop(self._key("pending")))
+            if job_id is None:
+                return None
+            if self.client.hget(self._key("done"), job_id) is None:
+                break
+
+        token = uuid.uuid4().hex
+        expires_at = time.time() + ttl
+        self.client.hset(self._key("tokens"), job_id, token)
+        self.client.zadd(self._key("leases"), {job_id: expires_at})
+        attempts = int(self.client.hincrby(self._key("attempts"), job_id, 1))
+        payload = json.loads(self._text(self.client.hget(self._key("jobs"), job_id)))
+        return Lease(job_id, token, payload, attempts, expires_at)
+
+    def _owns(self, lease: Lease) -> bool:
+        return self._text(self.client.hget(self._key("tokens"), lease.job_id)) == lease.token
+
+    def heartbeat(self, lease: Lease, ttl: float) -> bool:
+        if not self._owns(lease):
+            return False
+        lease.expires_at = time.time() + ttl
+        self.client.zadd(self._key("leases"), {lease.job_id: lease.expires_at})
+        return True
+
+    def _release(self, lease: Lease):
+        self.client.zrem(self._key("leases"), lease.job_id)
+        self.client.hdel(self._key("tokens"), lease.job_id)
+
+    def complete(self, lease: Lease, result: List[Dict]) -> bool:
+        if not self._owns(lease):
+            return False
+        # HSETNX гарантирует единственную фиксацию результата
+        accepted = bool(self.client.hsetnx(self._key("done"), lease.job_id, json.dumps(result, ensure_ascii=False, default=str)))
+        self._release(lease)
+        return accepted
+
+    def fail(self, lease: Lease, error: str, retry: bool) -> bool:
+        if not self._owns(lease):
+            return False
+        self._release(lease)
+        if retry:
+            self.client.lpush(self._key("pending"), lease.job_id)
+        else:
+            self.client.hset(self._key("failed"), lease.job_id, error)
+        return True
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "pending": int(self.client.llen(self._key("pending"))),
+            "leased": int(self.client.zcard(self._key("leases"))),
+            "done": int(self.client.hlen(self._key("done"))),
+            "failed": int(self.client.hlen(self._key("failed")))
+        }
+
+
+def open_work_queue(url: str) -> WorkQueueBackend:
+    """Очередь по URL: sqlite:///path/queue.db или redis://host:6379/0"""
+    if url.startswith("sqlite:///"):
+        return SQLiteWorkQueue(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisWorkQueue.from_url(url)
+    raise ValueError(f"Неподдерживаемый URL очереди: {url}")
+
+
+class DistributedWorker:
+    """Воркер: арендует задания из общей очереди и выполняет их через планировщик
+
+    Сценарий закрепляется за заданием по его id, поэтому повторное выполнение
+    после истечения аренды дает то же имя выходного файла.
+    """
+
+    def __init__(
+        self,
+        generator,
+        work_queue: WorkQueueBackend,
+        base_config,
+        settings: Optional[SchedulerSettings] = None,
+        worker_id: Optional[str] = None,
+        lease_ttl: float = 120.0,
+        output_folder: str = "output/distributed",
+        max_attempts: int = 3,
+        exit_when_idle: bool = True,
+        idle_timeout: float = 5.0
+    ):
+        self.generator = generator
+        self.work_queue = work_queue
+        self.base_config = base_config
+        self.settings = settings or SchedulerSettings(region_weights={generator.location: 1.0})
+        self.worker_id = worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:6]}"
+        self.lease_ttl = lease_ttl
+        self.output_folder = output_folder
+        self.max_attempts = max_attempts
+        self.exit_when_idle = exit_when_idle
+        self.idle_timeout = idle_timeout
+
+        self.inbox: queue.Queue = queue.Queue()
+        self.stop_event = threading.Event()
+        self.scheduler = generator.create_scheduler(self.settings)
+        self.scheduler.listeners.append(self._on_event)
+        self._leases: Dict[str, Lease] = {}
+        self._results: Dict[str, List[Dict]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"leased": 0, "completed": 0, "failed": 0, "lost_leases": 0}
+
+    def _job_from_lease(self, lease: Lease) -> GenerationJob:
+        payload = lease.payload
+        config = self.base_config.with_overrides(payload.get("config"))
+        scenario_id = payload.get("scenario_id")
+        if scenario_id is None and config.use_enhanced_prompts and not payload.get("custom_prompt"):
+            scenarios = self.generator.get_all_scenarios()
+            index = int(hashlib.sha256(lease.job_id.encode('utf-8')).hexdigest()[:8], 16)
+            scenario_id = scenarios[index % len(scenarios)]['id']
+        output_folder = payload.get("output_folder") or self.output_folder
+        Path(output_folder).mkdir(parents=True, exist_ok=True)
+        return GenerationJob(
+            job_id=lease.job_id,
+            image_path=payload["image_path"],
+            output_folder=output_folder,
+            config=config,
+            custom_prompt=payload.get("custom_prompt"),
+            storage_uri=payload.get("storage_uri"),
+            scenario_id=scenario_id
+        )
+
+    def _on_event(self, event: str, job: GenerationJob, **data):
+        if event not in ("completed", "failed", "skipped", "cancelled"):
+            return
+        with self._lock:
+            lease = self._leases.pop(job.job_id, None)
+        if lease is None:
+            return
+
+        if event in ("skipped", "cancelled"):
+            # Остановка воркера: задание сразу возвращается в очередь другим воркерам
+            self.work_queue.fail(lease, data["result"]["error"], retry=True)
+            return
+
+        results = data.get("results") or [data.get("result")]
+        errors = [r.get("error") for r in results if r and r.get("status") == "error"]
+        if errors:
+            retry = lease.attempts < self.max_attempts
+            self.work_queue.fail(lease, "; ".join(str(e) for e in errors), retry=retry)
+            self.stats["failed"] += 1
+        elif self.work_queue.complete(lease, results):
+            self.stats["completed"] += 1
+        else:
+            self.stats["lost_leases"] += 1
+            logger.warning("Аренда %s потеряна, результат зафиксирован другим воркером", job.job_id)
+
+    def _feeder(self):
+        """Аренда новых заданий, пока есть свободные слоты, и продление текущих аренд"""
+        capacity = max(1, self.settings.max_concurrent_operations) * 2
+        last_heartbeat = time.time()
+        idle_since = None
+
+        while not self.stop_event.is_set():
+            with self._lock:
+                active = len(self._leases)
+
+            leased = False
+            if active < capacity:
+                lease = self.work_queue.lease(self.worker_id, self.lease_ttl, self.max_attempts)
+                if lease is not None:
+                    with self._lock:
+                        self._leases[lease.job_id] = lease
+                    self.stats["leased"] += 1
+                    self.inbox.put(self._job_from_lease(lease))
+                    leased = True
+                    idle_since = None
+
+            if time.time() - last_heartbeat >= self.lease_ttl / 3:
+                with self._lock:
+                    leases = list(self._leases.values())
+                for lease in leases:
+                    if not self.work_queue.heartbeat(lease, self.lease_ttl):
+                        logger.warning("Не удалось продлить аренду %s", lease.job_id)
+                last_heartbeat = time.time()
+
+            if not leased:
+                if active == 0 and self.exit_when_idle and self._queue_drained():
+                    idle_since = idle_since or time.time()
+                    if time.time() - idle_since >= self.idle_timeout:
+                        self.stop_event.set()
+                        break
+                else:
+                    # Аренды других воркеров еще могут истечь и вернуться в очередь
+                    idle_since = None
+                self.stop_event.wait(min(1.0, self.idle_timeout))
+
+    def _queue_drained(self) -> bool:
+        counts = self.work_queue.counts()
+        return counts["pending"] == 0 and counts["leased"] == 0
+
+    def run(self) -> Dict[str, int]:
+        """Работа до опустошения очереди (или до stop_event)"""
+        logger.info("Воркер %s запущен (аренда %ss)", self.worker_id, self.lease_ttl)
+        feeder = threading.Thread(target=self._feeder, name="turan-lease-feeder", daemon=True)
+        feeder.start()
+        with graceful_shutdown(self.scheduler, self.settings.shutdown_mode, self.settings.drain_timeout, self.stop_event):
+            for _ in self.scheduler.run(inbox=self.inbox, stop_event=self.stop_event):
+                pass
+        feeder.join()
+        logger.info("Воркер %s завершен: %s", self.worker_id, self.stats)
+        return self.stats